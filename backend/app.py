@@ -7,84 +7,124 @@ from datetime import timedelta
 # Import database
 from database import init_db, db
 
-# Import routes
-from routes.auth_routes import auth_bp
-from routes.stock_routes import stock_bp
-from routes.analysis_routes import analysis_bp
-from config import JWT_SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES, JWT_REFRESH_TOKEN_EXPIRES
-
-
-# Create Flask app
-app = Flask(__name__)
-
-# Enable CORS with credentials support
-CORS(app, supports_credentials=True)
-
 # Import configuration
+from config import JWT_SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES, JWT_REFRESH_TOKEN_EXPIRES
+from utils.metrics import init_metrics
+from utils.profiling import init_profiling
+from services.note_search import init_note_search
+from services.job_queue import init_jobs
+from services.scheduled_tasks import init_scheduler
+
+
+def register_jwt_handlers(jwt):
+    """JWT error handlers"""
+    @jwt.expired_token_loader
+    def expired_token_callback(jwt_header, jwt_payload):
+        return jsonify({
+            'message': 'The token has expired',
+            'error': 'token_expired'
+        }), 401
+
+    @jwt.invalid_token_loader
+    def invalid_token_callback(error):
+        return jsonify({
+            'message': 'Signature verification failed',
+            'error': 'invalid_token'
+        }), 401
+
+    @jwt.unauthorized_loader
+    def missing_token_callback(error):
+        return jsonify({
+            'message': 'Request does not contain an access token',
+            'error': 'authorization_required'
+        }), 401
+
+
+def register_blueprints(app):
+    """Import and register the route blueprints"""
+    from routes.auth_routes import auth_bp
+    from routes.stock_routes import stock_bp
+    from routes.analysis_routes import analysis_bp
+    from routes.profile_routes import profile_bp
+    from routes.job_routes import job_bp
+
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(stock_bp, url_prefix='/api/stocks')
+    app.register_blueprint(analysis_bp, url_prefix='/api/analysis')
+    app.register_blueprint(profile_bp, url_prefix='/api/profiles')
+    app.register_blueprint(job_bp, url_prefix='/api/jobs')
+
+
+def create_app():
+    """
+    Create the Flask app
+    Heavy libraries (numpy, pandas, yfinance) are not imported here; they
+    load on the first request that needs them, or up front via wsgi.py
+    """
+    # Create Flask app
+    app = Flask(__name__)
+
+    # Enable CORS with credentials support
+    CORS(app, supports_credentials=True)
+
+    # Configure app
+    app.config['JWT_SECRET_KEY'] = JWT_SECRET_KEY
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = JWT_ACCESS_TOKEN_EXPIRES
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = JWT_REFRESH_TOKEN_EXPIRES
+    app.config['JWT_TOKEN_LOCATION'] = ['headers']
+    app.config['JWT_HEADER_NAME'] = 'Authorization'
+    app.config['JWT_HEADER_TYPE'] = 'Bearer'
+    # Initialize database
+    init_db(app)
+
+    # Full-text search over saved notes
+    init_note_search(app)
+
+    # Background job queue
+    init_jobs(app)
+
+    # Cache warming and maintenance in the background
+    init_scheduler(app)
+
+    # Initialize JWT
+    jwt = JWTManager(app)
+    register_jwt_handlers(jwt)
+
+    # Initialize request metrics and the /metrics endpoint
+    init_metrics(app)
+
+    # Initialize on-demand request profiling
+    init_profiling(app)
+
+    # Register blueprints
+    register_blueprints(app)
+
+    # Root route
+    @app.route('/')
+    def index():
+        return jsonify({
+            'message': 'Stock Trend Causality + AI Investment Advisor API',
+            'status': 'running'
+        })
+
+    # Error handlers
+    @app.errorhandler(404)
+    def not_found(error):
+        return jsonify({
+            'message': 'Resource not found',
+            'error': str(error)
+        }), 404
+
+    @app.errorhandler(500)
+    def server_error(error):
+        return jsonify({
+            'message': 'Internal server error',
+            'error': str(error)
+        }), 500
+
+    return app
 
-# Configure app
-app.config['JWT_SECRET_KEY'] = JWT_SECRET_KEY
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = JWT_ACCESS_TOKEN_EXPIRES
-app.config['JWT_REFRESH_TOKEN_EXPIRES'] = JWT_REFRESH_TOKEN_EXPIRES
-app.config['JWT_TOKEN_LOCATION'] = ['headers']
-app.config['JWT_HEADER_NAME'] = 'Authorization'
-app.config['JWT_HEADER_TYPE'] = 'Bearer'
-# Initialize database
-init_db(app)
-
-# Initialize JWT
-jwt = JWTManager(app)
-
-# JWT error handlers
-@jwt.expired_token_loader
-def expired_token_callback(jwt_header, jwt_payload):
-    return jsonify({
-        'message': 'The token has expired',
-        'error': 'token_expired'
-    }), 401
-
-@jwt.invalid_token_loader
-def invalid_token_callback(error):
-    return jsonify({
-        'message': 'Signature verification failed',
-        'error': 'invalid_token'
-    }), 401
-
-@jwt.unauthorized_loader
-def missing_token_callback(error):
-    return jsonify({
-        'message': 'Request does not contain an access token',
-        'error': 'authorization_required'
-    }), 401
-
-# Register blueprints
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(stock_bp, url_prefix='/api/stocks')
-app.register_blueprint(analysis_bp, url_prefix='/api/analysis')
-
-# Root route
-@app.route('/')
-def index():
-    return jsonify({
-        'message': 'Stock Trend Causality + AI Investment Advisor API',
-        'status': 'running'
-    })
-
-# Error handlers
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({
-        'message': 'Resource not found',
-        'error': str(error)
-    }), 404
-
-@app.errorhandler(500)
-def server_error(error):
-    return jsonify({
-        'message': 'Internal server error',
-        'error': str(error)
-    }), 500
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5002))
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=port, debug=True)
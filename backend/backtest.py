@@ -0,0 +1,47 @@
+"""
+Backtest script
+Run this script to replay the recommendation logic over stored history
+
+    python backtest.py --fetch AAPL MSFT   # store history (needs network)
+    python backtest.py --buy-threshold 0.25
+"""
+import argparse
+import json
+from config import (
+    PRICE_HISTORY_DIR,
+    POPULAR_STOCKS,
+    BENCHMARK_SYMBOL,
+    BACKTEST_WINDOW,
+    BACKTEST_HORIZON,
+    BACKTEST_HOLD_BAND
+)
+from services.analysis_service import BUY_THRESHOLD, SELL_THRESHOLD
+from services.backtest_service import save_price_history, backtest_from_store
+
+parser = argparse.ArgumentParser(description='Backtest BUY/SELL/HOLD recommendations on stored price history')
+parser.add_argument('symbols', nargs='*', help='Symbols to backtest (default: every stored symbol)')
+parser.add_argument('--data-dir', default=PRICE_HISTORY_DIR, help='Directory with <SYMBOL>.csv history files')
+parser.add_argument('--fetch', action='store_true', help='Download and store history before running')
+parser.add_argument('--window', type=int, default=BACKTEST_WINDOW)
+parser.add_argument('--horizon', type=int, default=BACKTEST_HORIZON)
+parser.add_argument('--buy-threshold', type=float, default=BUY_THRESHOLD)
+parser.add_argument('--sell-threshold', type=float, default=SELL_THRESHOLD)
+parser.add_argument('--hold-band', type=float, default=BACKTEST_HOLD_BAND)
+args = parser.parse_args()
+
+if args.fetch:
+    symbols = args.symbols or [stock['symbol'] for stock in POPULAR_STOCKS]
+    print(f"Storing history for {len(symbols)} symbols...")
+    save_price_history(symbols + [BENCHMARK_SYMBOL], args.data_dir)
+
+report = backtest_from_store(
+    args.symbols or None,
+    args.data_dir,
+    window=args.window,
+    horizon=args.horizon,
+    buy_threshold=args.buy_threshold,
+    sell_threshold=args.sell_threshold,
+    hold_band=args.hold_band
+)
+
+print(json.dumps(report, indent=2))
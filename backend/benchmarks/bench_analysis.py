@@ -0,0 +1,97 @@
+"""
+Benchmarks for the analysis routes, sentiment scoring and auth
+"""
+import itertools
+
+from benchmarks.support import BENCH_EMAIL, BENCH_PASSWORD
+
+ARTICLES = [
+    {
+        'title': f"Company {i} shares rise as profits beat expectations",
+        'summary': 'Growth was strong although some analysts warned of a weaker quarter and falling margins.'
+    }
+    for i in range(50)
+]
+
+
+def test_get_causal_factors(benchmark, app):
+    from services.stock_analysis import get_causal_factors
+    with app.app_context():
+        analysis = benchmark(get_causal_factors, 'AAPL')
+    assert analysis['factors']
+
+
+def test_calculate_sentiment(benchmark):
+    from services.news_service import calculate_sentiment
+    sentiment = benchmark(calculate_sentiment, ARTICLES)
+    assert 0 <= sentiment <= 1
+
+
+def test_recommendation_route(benchmark, client):
+    from services.analysis_cache import causal_cache, recommendation_cache
+
+    def request():
+        causal_cache.clear()
+        recommendation_cache.clear()
+        return client.get('/api/analysis/recommendation/AAPL')
+
+    response = benchmark(request)
+    assert response.status_code == 200
+
+
+def test_recommendation_route_cached(benchmark, client):
+    response = benchmark(client.get, '/api/analysis/recommendation/AAPL')
+    assert response.status_code == 200
+
+
+def test_login(benchmark, client, auth_headers):
+    response = benchmark(client.post, '/api/auth/login', json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+    assert response.status_code == 200
+
+
+def test_save_analysis(benchmark, client, auth_headers):
+    symbols = itertools.cycle([f"SYM{i}" for i in range(100)])
+
+    def save():
+        return client.post('/api/analysis/save', headers=auth_headers, json={
+            'symbol': next(symbols),
+            'recommendation': 'BUY',
+            'notes': 'Benchmark note',
+            'factors': [{'name': 'Market Trend', 'impact': 0.5}]
+        })
+
+    response = benchmark(save)
+    assert response.status_code in (200, 201)
+
+
+def test_get_saved_analyses(benchmark, client, auth_headers):
+    response = benchmark(client.get, '/api/analysis/saved', headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_get_saved_analyses_page(benchmark, client, auth_headers):
+    response = benchmark(client.get, '/api/analysis/saved?limit=20&summary=true', headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_update_note(benchmark, client, auth_headers):
+    saved = client.post('/api/analysis/save', headers=auth_headers, json={'symbol': 'NOTE'}).get_json()
+    analysis_id = saved['analysis']['id']
+    response = benchmark(client.put, f"/api/analysis/notes/{analysis_id}", headers=auth_headers,
+                         json={'notes': 'Updated benchmark note'})
+    assert response.status_code == 200
+
+
+def test_delete_saved_analysis(benchmark, client, auth_headers):
+    counter = itertools.count()
+
+    def setup():
+        saved = client.post('/api/analysis/save', headers=auth_headers,
+                            json={'symbol': f"DEL{next(counter)}"}).get_json()
+        return (saved['analysis']['id'],), {}
+
+    def delete(analysis_id):
+        return client.delete(f"/api/analysis/saved/{analysis_id}", headers=auth_headers)
+
+    response = benchmark.pedantic(delete, setup=setup, rounds=50)
+    assert response.status_code == 200
@@ -0,0 +1,55 @@
+"""
+Benchmarks for the stock routes
+"""
+import pytest
+
+
+@pytest.fixture(scope='module')
+def max_history():
+    from services.price_cache import get_series
+    return get_series('AAPL', 'max')
+
+
+def test_format_prices_max(benchmark, max_history):
+    from routes.stock_routes import _format_prices
+    prices = benchmark(_format_prices, max_history)
+    assert len(prices) == len(max_history)
+
+
+def test_get_stock_data_max(benchmark, client):
+    response = benchmark(client.get, '/api/stocks/AAPL?timeframe=max')
+    assert response.status_code == 200
+
+
+def test_get_stock_data_max_arrow(benchmark, client):
+    pytest.importorskip('pyarrow')
+    response = benchmark(client.get, '/api/stocks/AAPL?timeframe=max',
+                         headers={'Accept': 'application/vnd.apache.arrow.stream'})
+    assert response.mimetype == 'application/vnd.apache.arrow.stream'
+
+
+def test_get_stock_data_intraday(benchmark, client):
+    response = benchmark(client.get, '/api/stocks/AAPL?timeframe=5d&interval=15m')
+    assert response.status_code == 200
+
+
+def test_get_stock_data_downsampled(benchmark, client):
+    from routes.stock_routes import _downsampled_cache
+
+    def request():
+        _downsampled_cache.clear()
+        return client.get('/api/stocks/AAPL?timeframe=max&points=500')
+
+    response = benchmark(request)
+    assert len(response.get_json()['prices']) == 500
+
+
+def test_get_stock_details(benchmark, client):
+    from services.details_service import _details_cache
+
+    def request():
+        _details_cache.clear()
+        return client.get('/api/stocks/details/AAPL')
+
+    response = benchmark(request)
+    assert response.status_code == 200
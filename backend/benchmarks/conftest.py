@@ -0,0 +1,35 @@
+"""
+Microbenchmarks for the API hot paths
+
+Run from the backend directory (other directories work with the path adjusted):
+    pip install -r benchmarks/requirements.txt
+    python -m pytest benchmarks --benchmark-autosave
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:15%
+
+The first command stores a baseline in .benchmarks; the second fails when
+any benchmark's mean is more than 15% slower than the stored baseline
+"""
+import os
+import sys
+
+import pytest
+
+# Importable as a package however pytest is started
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.support import get_app, login
+
+
+@pytest.fixture(scope='session')
+def app():
+    return get_app()
+
+
+@pytest.fixture(scope='session')
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def auth_headers(client):
+    return login(client)
@@ -0,0 +1,218 @@
+"""
+Load test driver reporting latency percentiles and throughput per endpoint
+
+Without --url the app is started in-process on a free port against the
+synthetic data provider and a scratch database:
+
+    python benchmarks/load_test.py --duration 20 --concurrency 16
+    python benchmarks/load_test.py --save-baseline benchmarks/load_baseline.json
+    python benchmarks/load_test.py --baseline benchmarks/load_baseline.json --tolerance 0.2
+
+With --baseline the script exits with status 1 when an endpoint's p95
+latency grows, or its requests/sec drops, by more than the tolerance
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.support import configure_environment, BENCH_EMAIL, BENCH_PASSWORD
+
+# (name, method, path, body, needs auth, weight)
+SCENARIOS = [
+    ('stock_data_max', 'GET', '/api/stocks/AAPL?timeframe=max', None, False, 4),
+    ('stock_data_1mo', 'GET', '/api/stocks/MSFT?timeframe=1mo', None, False, 4),
+    ('stock_details', 'GET', '/api/stocks/details/AAPL', None, False, 2),
+    ('causal', 'GET', '/api/analysis/causal/AAPL', None, False, 2),
+    ('recommendation', 'GET', '/api/analysis/recommendation/MSFT', None, False, 2),
+    ('save_analysis', 'POST', '/api/analysis/save', {'symbol': 'LOAD', 'notes': 'Load test'}, True, 1),
+    ('saved_analyses', 'GET', '/api/analysis/saved', None, True, 2),
+    ('login', 'POST', '/api/auth/login', {'email': BENCH_EMAIL, 'password': BENCH_PASSWORD}, False, 1)
+]
+
+
+def percentile(values, q):
+    """Percentile of an already sorted list"""
+    if not values:
+        return None
+    index = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def start_server():
+    """Run the app in a background thread and return its base URL"""
+    configure_environment()
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    # Per-request access logs would dominate the output
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def call(base_url, method, path, body=None, headers=None):
+    """Make one request; returns (status, seconds)"""
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method)
+    request.add_header('Content-Type', 'application/json')
+    for key, value in (headers or {}).items():
+        request.add_header(key, value)
+
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def authenticate(base_url):
+    """Register and log in the load test user"""
+    call(base_url, 'POST', '/api/auth/register',
+         {'email': BENCH_EMAIL, 'password': BENCH_PASSWORD, 'name': 'Bench User'})
+    request = urllib.request.Request(
+        base_url + '/api/auth/login',
+        data=json.dumps({'email': BENCH_EMAIL, 'password': BENCH_PASSWORD}).encode(),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    with urllib.request.urlopen(request) as response:
+        token = json.loads(response.read())['access_token']
+    return {'Authorization': f"Bearer {token}"}
+
+
+def run_load(base_url, duration, concurrency, warmup):
+    """Drive the weighted scenario mix and collect latencies per scenario"""
+    auth_headers = authenticate(base_url)
+
+    # Warm caches so the measurement reflects steady state
+    for name, method, path, body, needs_auth, _ in SCENARIOS:
+        for _ in range(warmup):
+            call(base_url, method, path, body, auth_headers if needs_auth else None)
+
+    schedule = [scenario for scenario in SCENARIOS for _ in range(scenario[5])]
+    latencies = {scenario[0]: [] for scenario in SCENARIOS}
+    errors = {scenario[0]: 0 for scenario in SCENARIOS}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(offset):
+        for name, method, path, body, needs_auth, _ in itertools.islice(itertools.cycle(schedule), offset, None):
+            if time.perf_counter() >= deadline:
+                return
+            status, seconds = call(base_url, method, path, body, auth_headers if needs_auth else None)
+            with lock:
+                latencies[name].append(seconds)
+                if status == 0 or status >= 400:
+                    errors[name] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    report = {}
+    for name, values in latencies.items():
+        values.sort()
+        report[name] = {
+            'requests': len(values),
+            'errors': errors[name],
+            'rps': round(len(values) / elapsed, 2),
+            'p50_ms': round(percentile(values, 50) * 1000, 2) if values else None,
+            'p95_ms': round(percentile(values, 95) * 1000, 2) if values else None,
+            'p99_ms': round(percentile(values, 99) * 1000, 2) if values else None
+        }
+
+    total = sum(len(values) for values in latencies.values())
+    report['_total'] = {
+        'requests': total,
+        'errors': sum(errors.values()),
+        'rps': round(total / elapsed, 2),
+        'seconds': round(elapsed, 2),
+        'concurrency': concurrency
+    }
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """List the endpoints that regressed against the baseline"""
+    regressions = []
+    for name, stats in report.items():
+        expected = baseline.get(name)
+        if name.startswith('_') or not expected or stats['p95_ms'] is None:
+            continue
+        if expected.get('p95_ms') and stats['p95_ms'] > expected['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {stats['p95_ms']}ms > baseline {expected['p95_ms']}ms")
+        if expected.get('rps') and stats['rps'] < expected['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: {stats['rps']} req/s < baseline {expected['rps']} req/s")
+        if stats['errors'] > expected.get('errors', 0):
+            regressions.append(f"{name}: {stats['errors']} errors > baseline {expected.get('errors', 0)}")
+    return regressions
+
+
+def print_report(report):
+    print(f"{'endpoint':<18}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in report.items():
+        if name.startswith('_'):
+            continue
+        print(f"{name:<18}{stats['requests']:>10}{stats['errors']:>8}{stats['rps']:>10}"
+              f"{stats['p50_ms']!s:>10}{stats['p95_ms']!s:>10}{stats['p99_ms']!s:>10}")
+    total = report['_total']
+    print(f"\n{total['requests']} requests, {total['errors']} errors, {total['rps']} req/s "
+          f"over {total['seconds']}s with {total['concurrency']} workers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the Stock Advisor API')
+    parser.add_argument('--url', help='Base URL of a running server (default: start one in-process)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds to run')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent workers')
+    parser.add_argument('--warmup', type=int, default=2, help='Warmup requests per endpoint')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression')
+    parser.add_argument('--save-baseline', help='Write the report as a new baseline')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/') if args.url else start_server()
+    report = run_load(base_url, args.duration, args.concurrency, args.warmup)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Shared setup for the benchmarks and the load test
+The app runs against the synthetic data provider and a scratch SQLite
+database, so results only measure our own code
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCH_EMAIL = 'bench@example.com'
+BENCH_PASSWORD = 'bench-password'
+
+
+def configure_environment():
+    """Point the app at stubbed data and a scratch database; call before importing it"""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    os.environ.setdefault('DATA_PROVIDER', 'synthetic')
+    os.environ.setdefault('MOCK_FALLBACK', 'False')
+    os.environ.setdefault('REQUEST_LOGGING', 'False')
+    # The benchmarks log in far more often than the auth rate limits allow
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'False')
+    # Background cache warming would skew the timings
+    os.environ.setdefault('SCHEDULER_ENABLED', 'False')
+    if 'DATABASE_URL' not in os.environ:
+        scratch = tempfile.mkdtemp(prefix='stock-advisor-bench-')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+
+
+def get_app():
+    """Import the Flask app after configuring the environment"""
+    configure_environment()
+    from app import create_app
+    return create_app()
+
+
+def login(client, email=BENCH_EMAIL, password=BENCH_PASSWORD):
+    """Register (if needed) and log in a benchmark user; returns auth headers"""
+    client.post('/api/auth/register', json={'email': email, 'password': password, 'name': 'Bench User'})
+    response = client.post('/api/auth/login', json={'email': email, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
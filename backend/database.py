@@ -1,41 +1,71 @@
-import os
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool, StaticPool
 
-# Get the directory of this file
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+from config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, SQLITE_BUSY_TIMEOUT_MS
 
-# SQLite database file path
-DATABASE_URI = f"sqlite:///{os.path.join(BASE_DIR, 'stock_advisor.db')}"
+# Database URI, the SQLite file next to this module unless DATABASE_URL is set
+DATABASE_URI = DATABASE_URL
+if DATABASE_URI.startswith('postgres://'):
+    # SQLAlchemy only accepts the postgresql:// scheme
+    DATABASE_URI = 'postgresql://' + DATABASE_URI[len('postgres://'):]
 
-# Create database engine
-engine = create_engine(DATABASE_URI, connect_args={"check_same_thread": False})
-
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQLAlchemy database instance, the single engine and session stack
+db = SQLAlchemy()
 
-# Create declarative base
-Base = declarative_base()
+def engine_options(uri):
+    """Engine and pool settings for a database URI"""
+    if not uri.startswith('sqlite'):
+        return {
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            'pool_pre_ping': True,
+            'pool_recycle': 30 * 60
+        }
+    
+    # Connections are shared by the worker threads; an in-memory database
+    # only exists on its one connection
+    connect_args = {'check_same_thread': False, 'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}
+    if uri in ('sqlite://', 'sqlite:///:memory:'):
+        return {'connect_args': connect_args, 'poolclass': StaticPool}
+    return {
+        'connect_args': connect_args,
+        'poolclass': QueuePool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT
+    }
 
-# SQLAlchemy database instance
-db = SQLAlchemy()
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite(dbapi_connection, connection_record):
+    """
+    WAL lets readers run alongside a writer, NORMAL sync is safe with WAL,
+    and writers wait for the lock instead of failing with "database is locked"
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    cursor.close()
 
 # Initialize database
 def init_db(app):
     app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URI
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(DATABASE_URI)
     db.init_app(app)
     
     # Create all tables
     with app.app_context():
         db.create_all()
         
-def get_db_session():
-    """Get a database session"""
-    db_session = SessionLocal()
-    try:
-        yield db_session
-    finally:
-        db_session.close()
\ No newline at end of file
+        # create_all skips existing tables, so add indexes introduced since
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
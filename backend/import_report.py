@@ -0,0 +1,63 @@
+"""
+Import time report for app startup
+
+    python import_report.py              # slowest imports while creating the app
+    python import_report.py --limit 40
+    python import_report.py --forbid numpy pandas yfinance
+
+Runs python -X importtime in a fresh interpreter, so numbers reflect a
+cold worker start. With --forbid the script exits with status 1 when any
+of the listed modules is imported during startup
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STARTUP = "from app import create_app; create_app()"
+
+
+def measure():
+    """Per-module (self, cumulative) import times in microseconds"""
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report module import times during app startup')
+    parser.add_argument('--limit', type=int, default=25, help='Modules to list')
+    parser.add_argument('--forbid', nargs='*', default=[], help='Modules that must not be imported at startup')
+    args = parser.parse_args()
+
+    timings = measure()
+    total = sum(self_us for self_us, _ in timings.values())
+
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    ranked = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in ranked[:args.limit]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {name}")
+    print(f"\n{len(timings)} modules imported in {total / 1000:.1f} ms")
+
+    loaded = [name for name in args.forbid if name in timings]
+    if loaded:
+        print(f"Imported at startup but expected to load lazily: {', '.join(loaded)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
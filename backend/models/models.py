@@ -1,7 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Float, ForeignKey, DateTime, Text, JSON, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from database import Base, db
+from database import db
+
+# SQLite's CURRENT_TIMESTAMP has whole seconds; bound datetimes are written
+# the same way so they compare equal to server-stamped rows
+SQLITE_TIMESTAMP = sqlite.DATETIME(
+    storage_format='%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d'
+)
 
 class User(db.Model):
     """User model for authentication and profile"""
@@ -37,7 +44,10 @@ class SavedAnalysis(db.Model):
     recommendation = Column(String(50))
     notes = Column(Text)
     factors = Column(JSON)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
+    timestamp = Column(
+        DateTime(timezone=True).with_variant(SQLITE_TIMESTAMP, 'sqlite'),
+        server_default=func.now(), onupdate=func.now(), index=True
+    )
     
     # Relationship with User
     user = relationship("User", back_populates="saved_analyses")
@@ -45,6 +55,25 @@ class SavedAnalysis(db.Model):
     # Remove the unique constraint to allow multiple notes per stock
     # __table_args__ = (db.UniqueConstraint('user_id', 'symbol', name='uix_user_symbol'),)
     
+    # Per-user listings are served newest first straight from these indexes
+    __table_args__ = (
+        Index('ix_saved_analyses_user_timestamp', 'user_id', 'timestamp'),
+        Index('ix_saved_analyses_user_symbol_timestamp', 'user_id', 'symbol', 'timestamp'),
+    )
+    
+    # Columns needed for summary listings, without the notes and factors
+    SUMMARY_COLUMNS = ('id', 'symbol', 'name', 'recommendation', 'timestamp')
+    
+    def to_summary_dict(self):
+        """Convert saved analysis object to a dictionary without notes and factors"""
+        return {
+            "id": self.id,
+            "symbol": self.symbol,
+            "name": self.name,
+            "recommendation": self.recommendation,
+            "timestamp": self.timestamp.isoformat() if self.timestamp else None
+        }
+    
     def to_dict(self):
         """Convert saved analysis object to dictionary"""
         return {
@@ -55,4 +84,95 @@ class SavedAnalysis(db.Model):
             "notes": self.notes,
             "factors": self.factors,
             "timestamp": self.timestamp.isoformat() if self.timestamp else None
-        }
\ No newline at end of file
+        }
+
+class PriceBar(db.Model):
+    """Locally stored OHLCV bar, one row per (symbol, interval, timestamp)"""
+    __tablename__ = "price_bars"
+    
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String(20), nullable=False)
+    interval = Column(String(5), nullable=False)
+    timestamp = Column(DateTime, nullable=False)  # Bar start in UTC
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    volume = Column(BigInteger)
+    
+    __table_args__ = (
+        Index('ix_price_bars_symbol_interval_timestamp', 'symbol', 'interval', 'timestamp', unique=True),
+    )
+
+class PriceCoverage(db.Model):
+    """Time range of stored bars per (symbol, interval)"""
+    __tablename__ = "price_coverage"
+    
+    symbol = Column(String(20), primary_key=True)
+    interval = Column(String(5), primary_key=True)
+    start = Column(DateTime, nullable=False)
+    end = Column(DateTime, nullable=False)
+    fetched_at = Column(DateTime, nullable=False)
+
+class EarningsEvent(db.Model):
+    """Earnings report date per symbol, past and upcoming"""
+    __tablename__ = "earnings_events"
+    
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String(20), nullable=False)
+    date = Column(DateTime, nullable=False)  # Report time in UTC
+    eps_estimate = Column(Float)
+    reported_eps = Column(Float)
+    surprise_pct = Column(Float)
+    
+    __table_args__ = (
+        Index('ix_earnings_events_symbol_date', 'symbol', 'date', unique=True),
+    )
+
+class EarningsCoverage(db.Model):
+    """When the earnings calendar of a symbol was last fetched"""
+    __tablename__ = "earnings_coverage"
+    
+    symbol = Column(String(20), primary_key=True)
+    fetched_at = Column(DateTime, nullable=False)
+
+class Job(db.Model):
+    """Long-running analysis queued by a user"""
+    __tablename__ = "jobs"
+    
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String(50), nullable=False)
+    params = Column(JSON)
+    status = Column(String(20), nullable=False, default='queued')
+    progress = Column(Float, nullable=False, default=0.0)
+    message = Column(String(255))
+    result = Column(JSON)
+    error = Column(Text)
+    worker = Column(String(255))  # host:pid of the process running the job
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index('ix_jobs_user_created', 'user_id', 'created_at'),
+        Index('ix_jobs_status', 'status'),
+    )
+    
+    def to_dict(self, include_result=True):
+        """Convert job object to dictionary"""
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
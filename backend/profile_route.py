@@ -0,0 +1,86 @@
+"""
+Profile a single API route locally under cProfile
+
+Runs against the replay data provider by default, so results are
+repeatable and free of network time:
+
+    python profile_route.py /api/analysis/causal/AAPL
+    python profile_route.py /api/analysis/recommendation/MSFT --repeat 5 --sort tottime
+    python profile_route.py /api/analysis/save --method POST --data '{"symbol": "AAPL"}' --auth
+    python profile_route.py /api/stocks/AAPL --output causal.prof
+
+The saved .prof file can be opened with snakeviz or pstats
+"""
+import argparse
+import cProfile
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('DATA_PROVIDER', 'replay')
+os.environ.setdefault('MOCK_FALLBACK', 'False')
+os.environ.setdefault('REQUEST_LOGGING', 'False')
+if 'DATABASE_URL' not in os.environ:
+    scratch = tempfile.mkdtemp(prefix='stock-advisor-profile-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch, 'profile.db')}"
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from utils.profiling import format_stats
+
+PROFILE_EMAIL = 'profiler@example.com'
+PROFILE_PASSWORD = 'profile-password'
+
+
+def auth_headers(client):
+    """Register and log in a local profiling user"""
+    client.post('/api/auth/register', json={'email': PROFILE_EMAIL, 'password': PROFILE_PASSWORD, 'name': 'Profiler'})
+    response = client.post('/api/auth/login', json={'email': PROFILE_EMAIL, 'password': PROFILE_PASSWORD})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile an API route under cProfile')
+    parser.add_argument('path', help='Route path including query string, e.g. /api/analysis/causal/AAPL')
+    parser.add_argument('--method', default='GET', help='HTTP method')
+    parser.add_argument('--data', help='JSON request body')
+    parser.add_argument('--auth', action='store_true', help='Send a JWT for a local user')
+    parser.add_argument('--warmup', type=int, default=1, help='Unprofiled requests to warm caches first')
+    parser.add_argument('--repeat', type=int, default=1, help='Profiled requests')
+    parser.add_argument('--sort', default='cumulative', help='pstats sort key')
+    parser.add_argument('--limit', type=int, default=40, help='Rows to print')
+    parser.add_argument('--output', help='Save the raw stats to this .prof file')
+    args = parser.parse_args()
+
+    client = create_app().test_client()
+    headers = auth_headers(client) if args.auth else {}
+    body = json.loads(args.data) if args.data else None
+
+    def send():
+        return client.open(args.path, method=args.method.upper(), json=body, headers=headers)
+
+    for _ in range(args.warmup):
+        send()
+
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    for _ in range(args.repeat):
+        response = send()
+    profiler.disable()
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.method.upper()} {args.path} -> {response.status_code}, "
+          f"{elapsed / args.repeat * 1000:.1f} ms per request over {args.repeat} run(s)\n")
+    print(format_stats(profiler, args.sort, args.limit))
+
+    if args.output:
+        profiler.dump_stats(args.output)
+        print(f"Stats saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
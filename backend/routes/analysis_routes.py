@@ -1,355 +1,236 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-import yfinance as yf
-import pandas as pd
-import numpy as np
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required
+import base64
 from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import load_only
+from config import (
+    SAVED_PAGE_MAX,
+    SECTOR_UNIVERSES,
+    CORRELATION_WINDOW,
+    CORRELATION_MAX_WINDOW,
+    CORRELATION_MAX_SYMBOLS,
+    RISK_MC_PATHS,
+    RISK_MC_MAX_PATHS
+)
 from database import db
-from models.models import User, SavedAnalysis
-from services.news_service import get_stock_news
+from models.models import SavedAnalysis
+from services.analysis_context import AnalysisContext
+from services.analysis_cache import causal_cache, recommendation_cache, sector_cache, risk_cache
+from services.correlation_service import get_correlation
+from services.risk_service import portfolio_risk
+from services.stock_analysis import get_causal_factors, get_investment_recommendation, get_sector_analysis
+from services.note_search import search_notes
+from services.saved_analysis_service import parse_import, import_analyses, export_rows, iter_ndjson, iter_csv
+from utils.auth import current_user_id
+from utils.resilience import mark_stale, upstream_error_response
 
 # Create blueprint
 analysis_bp = Blueprint('analysis', __name__)
 
-def get_causal_factors(symbol):
-    """
-    Analyze causal factors affecting a stock
-    This is a simplified implementation for demo purposes
-    In a real application, you would use more sophisticated analysis
-    """
+def _encode_cursor(analysis):
+    """Opaque cursor pointing just after an analysis in newest-first order"""
+    # Always microsecond precision, keeping the UTC offset where there is one
+    raw = f"{analysis.timestamp.isoformat(timespec='microseconds')}|{analysis.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    """(timestamp, id) from a cursor; raises ValueError when malformed"""
     try:
-        # Get stock data
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period='6mo')
-        
-        # Calculate simple metrics
-        returns = hist['Close'].pct_change().dropna()
-        volatility = returns.std() * np.sqrt(252)  # Annualized volatility
-        
-        # Get market data (S&P 500)
-        market = yf.Ticker('^GSPC')
-        market_hist = market.history(period='6mo')
-        market_returns = market_hist['Close'].pct_change().dropna()
-        
-        # Calculate correlation with market
-        correlation = returns.corr(market_returns)
-        
-        # Get news sentiment (from our service)
-        news = get_stock_news(symbol)
-        news_sentiment = 0.5  # Neutral by default
-        
-        # Determine if there were any recent earnings
-        had_recent_earnings = False
-        try:
-            earnings = stock.earnings_dates
-            if not earnings.empty:
-                latest_earnings = earnings.index[0]
-                days_since_earnings = (datetime.now() - latest_earnings).days
-                had_recent_earnings = days_since_earnings < 30
-        except:
-            pass
-        
-        # Create factors
-        factors = [
-            {
-                "name": "Market Trend",
-                "impact": round(correlation * 0.8, 2),
-                "description": f"Stock has a {abs(correlation):.2f} correlation with the overall market"
-            },
-            {
-                "name": "Volatility",
-                "impact": round(min(volatility * 2, 1.0) * (0.5 if volatility > 0.2 else 0.8), 2),
-                "description": f"Stock has {volatility:.2f} annualized volatility"
-            }
-        ]
-        
-        # Add earnings factor if recent
-        if had_recent_earnings:
-            last_price = hist['Close'].iloc[-1]
-            pre_earnings_price = hist['Close'].iloc[-min(days_since_earnings + 5, len(hist) - 1)]
-            earnings_impact = (last_price - pre_earnings_price) / pre_earnings_price
-            
-            factors.append({
-                "name": "Earnings Report",
-                "impact": round(min(abs(earnings_impact) * 2, 1.0) * (0.9 if earnings_impact > 0 else -0.9), 2),
-                "description": f"Recent earnings report {'exceeded' if earnings_impact > 0 else 'missed'} expectations"
-            })
-        
-        # Add sector performance factor
-        try:
-            sector = stock.info.get('sector')
-            if sector:
-                # This is simplified - in a real app, you'd compare with sector ETFs
-                sector_impact = np.random.uniform(0.3, 0.7) * (1 if np.random.random() > 0.5 else -1)
-                
-                factors.append({
-                    "name": "Sector Performance",
-                    "impact": round(sector_impact, 2),
-                    "description": f"{sector} sector is showing {'strong' if sector_impact > 0 else 'weak'} performance"
-                })
-        except:
-            pass
-        
-        # Add news sentiment factor
-        factors.append({
-            "name": "News Sentiment",
-            "impact": round((news_sentiment - 0.5) * 1.6, 2),
-            "description": f"Recent news sentiment is {'positive' if news_sentiment > 0.5 else 'negative' if news_sentiment < 0.5 else 'neutral'}"
-        })
-        
-        # Add analyst ratings factor (simplified)
-        analyst_impact = np.random.uniform(0.4, 0.8) * (1 if np.random.random() > 0.4 else -1)
-        factors.append({
-            "name": "Analyst Ratings",
-            "impact": round(analyst_impact, 2),
-            "description": f"Recent analyst ratings are {'generally positive' if analyst_impact > 0 else 'generally negative'}"
-        })
-        
-        return {
-            "symbol": symbol,
-            "name": stock.info.get('shortName', symbol),
-            "factors": factors,
-            "sentiment": {
-                "news": round(news_sentiment, 2),
-                "social": round(0.4 + np.random.random() * 0.3, 2),  # Random for demo
-                "overall": round((news_sentiment * 0.6) + (0.4 + np.random.random() * 0.3) * 0.4, 2)
-            }
-        }
-    
-    except Exception as e:
-        # Fallback to mock data
-        return {
-            "symbol": symbol,
-            "name": f"{symbol} Inc.",
-            "factors": [
-                {
-                    "name": "Market Trend",
-                    "impact": 0.6,
-                    "description": "Stock has a 0.75 correlation with the overall market"
-                },
-                {
-                    "name": "Earnings Report",
-                    "impact": 0.8,
-                    "description": "Recent earnings report exceeded expectations"
-                },
-                {
-                    "name": "Sector Performance",
-                    "impact": 0.4,
-                    "description": "Technology sector is showing strong performance"
-                },
-                {
-                    "name": "News Sentiment",
-                    "impact": 0.3,
-                    "description": "Recent news sentiment is positive"
-                },
-                {
-                    "name": "Analyst Ratings",
-                    "impact": 0.7,
-                    "description": "Recent analyst ratings are generally positive"
-                }
-            ],
-            "sentiment": {
-                "news": 0.7,
-                "social": 0.6,
-                "overall": 0.65
-            }
-        }
+        timestamp, analysis_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        timestamp = datetime.fromisoformat(timestamp)
+        return timestamp, int(analysis_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
 
-def get_investment_recommendation(symbol, causal_analysis=None):
+def _list_analyses(query):
     """
-    Generate investment recommendation based on causal analysis
-    This is a simplified implementation for demo purposes
+    Serve a user's analyses newest first
+    With limit=<n> returns one page (keyset pagination on timestamp, id)
+    and the X-Next-Cursor header to pass back as cursor=<...>; with
+    summary=true the notes and factors columns are not loaded
     """
-    if not causal_analysis:
-        causal_analysis = get_causal_factors(symbol)
-    
-    # Calculate overall score from factors
-    factor_scores = [factor["impact"] for factor in causal_analysis["factors"]]
-    overall_score = sum(factor_scores) / len(factor_scores)
-    
-    # Determine recommendation
-    if overall_score > 0.3:
-        recommendation = "BUY"
-        confidence = min(0.5 + overall_score, 0.95)
-        reasoning = "Based on positive market conditions, favorable news sentiment, and strong analyst ratings."
-    elif overall_score < -0.3:
-        recommendation = "SELL"
-        confidence = min(0.5 + abs(overall_score), 0.95)
-        reasoning = "Based on negative market conditions, unfavorable news sentiment, and weak analyst ratings."
-    else:
-        recommendation = "HOLD"
-        confidence = 0.5 + (0.5 - abs(overall_score))
-        reasoning = "Based on mixed signals and moderate market conditions."
+    summary = request.args.get('summary', 'false').lower() in ('1', 'true')
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
     
-    # Add specific reasoning from factors
-    positive_factors = [f["name"] for f in causal_analysis["factors"] if f["impact"] > 0.4]
-    negative_factors = [f["name"] for f in causal_analysis["factors"] if f["impact"] < -0.4]
-    
-    if positive_factors:
-        reasoning += f" Positive factors include {', '.join(positive_factors)}."
+    if limit is not None and not 1 <= limit <= SAVED_PAGE_MAX:
+        return jsonify({
+            'message': f'limit must be between 1 and {SAVED_PAGE_MAX}'
+        }), 400
     
-    if negative_factors:
-        reasoning += f" Negative factors include {', '.join(negative_factors)}."
+    if summary:
+        query = query.options(load_only(*(getattr(SavedAnalysis, column) for column in SavedAnalysis.SUMMARY_COLUMNS)))
     
-    # Get stock data for price targets
-    try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period='1mo')
-        current_price = hist['Close'].iloc[-1]
-        
-        # Simple price targets based on volatility
-        volatility = hist['Close'].pct_change().std() * np.sqrt(252)
+    if cursor:
+        try:
+            timestamp, analysis_id = _decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({
+                'message': str(e)
+            }), 400
         
-        price_target = {
-            "low": round(current_price * (1 - volatility * 1.5), 2),
-            "median": round(current_price * (1 + overall_score * 0.2), 2),
-            "high": round(current_price * (1 + volatility * 1.5), 2)
-        }
-    except:
-        # Fallback
-        price_target = {
-            "low": 100,
-            "median": 120,
-            "high": 140
-        }
-    
-    return {
-        "symbol": symbol,
-        "name": causal_analysis["name"],
-        "recommendation": recommendation,
-        "confidence": round(confidence, 2),
-        "reasoning": reasoning,
-        "priceTarget": price_target,
-        "timeHorizon": "Medium-term (3-6 months)"
-    }
+        query = query.filter(or_(
+            SavedAnalysis.timestamp < timestamp,
+            and_(SavedAnalysis.timestamp == timestamp, SavedAnalysis.id < analysis_id)
+        ))
+    
+    query = query.order_by(SavedAnalysis.timestamp.desc(), SavedAnalysis.id.desc())
+    
+    if limit is None:
+        analyses = query.all()
+        next_cursor = None
+    else:
+        # One extra row tells whether another page exists
+        analyses = query.limit(limit + 1).all()
+        next_cursor = _encode_cursor(analyses[limit - 1]) if len(analyses) > limit else None
+        analyses = analyses[:limit]
+    
+    # Convert to dict
+    analyses_dict = [analysis.to_summary_dict() if summary else analysis.to_dict() for analysis in analyses]
+    
+    response = jsonify(analyses_dict)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
 
 # Routes
 @analysis_bp.route('/causal/<symbol>', methods=['GET'])
 def causal_analysis(symbol):
     """Get causal analysis for a stock"""
     try:
-        analysis = get_causal_factors(symbol)
-        return jsonify(analysis), 200
+        analysis, age = causal_cache.get(symbol.upper(), lambda: get_causal_factors(symbol, AnalysisContext()))
+        return mark_stale(jsonify(analysis), age), 200
     except Exception as e:
-        return jsonify({
-            'message': f'Error generating causal analysis: {str(e)}'
-        }), 500
+        return upstream_error_response('Error generating causal analysis', e)
 
 @analysis_bp.route('/recommendation/<symbol>', methods=['GET'])
 def recommendation(symbol):
     """Get investment recommendation for a stock"""
-    try:
+    def load():
+        # One context, so the causal analysis and the recommendation share their data
+        context = AnalysisContext()
+        
         # Get causal analysis first
-        causal = get_causal_factors(symbol)
+        causal, _ = causal_cache.get(symbol.upper(), lambda: get_causal_factors(symbol, context))
         
         # Generate recommendation
-        rec = get_investment_recommendation(symbol, causal)
-        
-        return jsonify(rec), 200
+        return get_investment_recommendation(symbol, causal, context)
+    
+    try:
+        rec, age = recommendation_cache.get(symbol.upper(), load)
+        return mark_stale(jsonify(rec), age), 200
     except Exception as e:
-        return jsonify({
-            'message': f'Error generating recommendation: {str(e)}'
-        }), 500
+        return upstream_error_response('Error generating recommendation', e)
 
 @analysis_bp.route('/sector/<sector>', methods=['GET'])
 def sector_analysis(sector):
     """Get analysis for a sector"""
-    # This is a simplified implementation
-    # In a real app, you'd analyze sector ETFs and component stocks
-    
-    # Map of sample sectors to ETFs
-    sector_etfs = {
-        'technology': 'XLK',
-        'healthcare': 'XLV',
-        'financials': 'XLF',
-        'energy': 'XLE',
-        'consumer': 'XLY',
-        'utilities': 'XLU',
-        'materials': 'XLB',
-        'industrials': 'XLI',
-        'real-estate': 'XLRE',
-        'communication': 'XLC'
-    }
+    try:
+        analysis, age = sector_cache.get(sector.lower(), lambda: get_sector_analysis(sector))
+        return mark_stale(jsonify(analysis), age), 200
+    except Exception as e:
+        return upstream_error_response('Error generating sector analysis', e)
+
+@analysis_bp.route('/correlation', methods=['GET'])
+def correlation_matrix():
+    """
+    Pairwise correlation matrix and hierarchical clusters of a universe
+    Pass symbols=AAPL,MSFT,... or sector=<name>, with optional
+    window=<trading days> and threshold=<cluster distance, 0..1>
+    """
+    sector = request.args.get('sector', '').lower()
+    if sector:
+        if sector not in SECTOR_UNIVERSES:
+            return jsonify({
+                'message': f'Unknown sector: {sector}'
+            }), 404
+        symbols = SECTOR_UNIVERSES[sector]
+    else:
+        symbols = [symbol.strip().upper() for symbol in request.args.get('symbols', '').split(',') if symbol.strip()]
     
-    etf = sector_etfs.get(sector.lower(), 'SPY')
+    window = request.args.get('window', CORRELATION_WINDOW, type=int)
+    threshold = request.args.get('threshold', 0.5, type=float)
+    
+    if not 2 <= len(set(symbols)) <= CORRELATION_MAX_SYMBOLS:
+        return jsonify({
+            'message': f'Between 2 and {CORRELATION_MAX_SYMBOLS} symbols are required'
+        }), 400
+    
+    if not 2 <= window <= CORRELATION_MAX_WINDOW:
+        return jsonify({
+            'message': f'window must be between 2 and {CORRELATION_MAX_WINDOW}'
+        }), 400
+    
+    if not 0 <= threshold <= 1:
+        return jsonify({
+            'message': 'threshold must be between 0 and 1'
+        }), 400
     
     try:
-        # Get ETF data
-        ticker = yf.Ticker(etf)
-        hist = ticker.history(period='6mo')
-        
-        # Calculate performance
-        start_price = hist['Close'].iloc[0]
-        end_price = hist['Close'].iloc[-1]
-        performance = ((end_price - start_price) / start_price) * 100
-        
-        # Calculate volatility
-        returns = hist['Close'].pct_change().dropna()
-        volatility = returns.std() * np.sqrt(252)
-        
-        # Get market comparison
-        market = yf.Ticker('^GSPC')
-        market_hist = market.history(period='6mo')
-        market_start = market_hist['Close'].iloc[0]
-        market_end = market_hist['Close'].iloc[-1]
-        market_performance = ((market_end - market_start) / market_start) * 100
-        
-        # Generate outlook
-        relative_performance = performance - market_performance
-        
-        if relative_performance > 5:
-            outlook = "Strong outperformance compared to the overall market"
-        elif relative_performance > 0:
-            outlook = "Slight outperformance compared to the overall market"
-        elif relative_performance > -5:
-            outlook = "Comparable performance to the overall market"
-        else:
-            outlook = "Underperformance compared to the overall market"
-        
-        # Mock stocks in sector
-        stocks = [
-            {"symbol": "AAPL", "name": "Apple Inc.", "performance": 12.5, "recommendation": "BUY"},
-            {"symbol": "MSFT", "name": "Microsoft Corporation", "performance": 15.2, "recommendation": "BUY"},
-            {"symbol": "GOOGL", "name": "Alphabet Inc.", "performance": 8.7, "recommendation": "HOLD"},
-            {"symbol": "AMZN", "name": "Amazon.com, Inc.", "performance": 10.1, "recommendation": "BUY"},
-            {"symbol": "META", "name": "Meta Platforms, Inc.", "performance": 6.3, "recommendation": "HOLD"}
-        ]
-        
+        return jsonify(get_correlation(symbols, window, threshold)), 200
+    except Exception as e:
+        return upstream_error_response('Error computing correlation matrix', e)
+
+def _risk_response(symbols):
+    """Risk report of an equally weighted set of symbols"""
+    paths = request.args.get('paths', RISK_MC_PATHS, type=int)
+    
+    if not 100 <= paths <= RISK_MC_MAX_PATHS:
         return jsonify({
-            "sector": sector.capitalize(),
-            "etf": etf,
-            "performance": round(performance, 2),
-            "volatility": round(volatility, 2),
-            "marketPerformance": round(market_performance, 2),
-            "relativePerformance": round(relative_performance, 2),
-            "outlook": outlook,
-            "topStocks": stocks
-        }), 200
+            'message': f'paths must be between 100 and {RISK_MC_MAX_PATHS}'
+        }), 400
+    
+    try:
+        report, age = risk_cache.get((tuple(symbols), paths), lambda: portfolio_risk(symbols, paths=paths))
+        return mark_stale(jsonify(report), age), 200
+    except ValueError as e:
+        return jsonify({
+            'message': str(e)
+        }), 400
     except Exception as e:
-        # Fallback to mock data
+        return upstream_error_response('Error computing risk', e)
+
+@analysis_bp.route('/risk/portfolio', methods=['GET'])
+@jwt_required()
+def portfolio_risk_report():
+    """
+    Risk of the portfolio of a user's saved analyses, equally weighted:
+    volatility, risk contributions, VaR/CVaR and simulated price targets
+    """
+    user_id = current_user_id()
+    
+    # Token must belong to a known user
+    if user_id is None:
         return jsonify({
-            "sector": sector.capitalize(),
-            "etf": etf,
-            "performance": 8.5,
-            "volatility": 0.22,
-            "marketPerformance": 5.2,
-            "relativePerformance": 3.3,
-            "outlook": "Slight outperformance compared to the overall market",
-            "topStocks": [
-                {"symbol": "AAPL", "name": "Apple Inc.", "performance": 12.5, "recommendation": "BUY"},
-                {"symbol": "MSFT", "name": "Microsoft Corporation", "performance": 15.2, "recommendation": "BUY"},
-                {"symbol": "GOOGL", "name": "Alphabet Inc.", "performance": 8.7, "recommendation": "HOLD"},
-                {"symbol": "AMZN", "name": "Amazon.com, Inc.", "performance": 10.1, "recommendation": "BUY"},
-                {"symbol": "META", "name": "Meta Platforms, Inc.", "performance": 6.3, "recommendation": "HOLD"}
-            ]
-        }), 200
+            'message': 'User not found'
+        }), 404
+    
+    # Saved symbols may differ in case; each is one position
+    symbol = func.upper(SavedAnalysis.symbol)
+    symbols = [
+        row[0] for row in db.session.query(symbol)
+        .filter_by(user_id=user_id).distinct().order_by(symbol)
+    ][:CORRELATION_MAX_SYMBOLS]
+    
+    if not symbols:
+        return jsonify({
+            'message': 'No saved analyses to build a portfolio from'
+        }), 404
+    
+    return _risk_response(symbols)
+
+@analysis_bp.route('/risk/<symbol>', methods=['GET'])
+def symbol_risk_report(symbol):
+    """Risk of a single stock: volatility, VaR/CVaR and simulated price targets"""
+    return _risk_response([symbol.upper()])
 
 @analysis_bp.route('/save', methods=['POST'])
 @jwt_required()
 def save_analysis():
     """Save an analysis for a user"""
     try:
-        current_user_email = get_jwt_identity()
+        user_id = current_user_id()
         data = request.get_json()
         
         # Validate input
@@ -358,16 +239,15 @@ def save_analysis():
                 'message': 'Missing required fields'
             }), 400
         
-        # Get user
-        user = User.query.filter_by(email=current_user_email).first()
-        if not user:
+        # Token must belong to a known user
+        if user_id is None:
             return jsonify({
                 'message': 'User not found'
             }), 404
         
         # Check if analysis already exists for this user and stock
         existing_analysis = SavedAnalysis.query.filter_by(
-            user_id=user.id,
+            user_id=user_id,
             symbol=data.get('symbol')
         ).first()
         
@@ -391,7 +271,7 @@ def save_analysis():
         else:
             # Create new analysis
             new_analysis = SavedAnalysis(
-                user_id=user.id,
+                user_id=user_id,
                 symbol=data.get('symbol'),
                 name=data.get('name', data.get('symbol')),
                 recommendation=data.get('recommendation', 'HOLD'),
@@ -417,24 +297,18 @@ def save_analysis():
 @analysis_bp.route('/saved', methods=['GET'])
 @jwt_required()
 def get_saved_analyses():
-    """Get all saved analyses for a user"""
+    """Get saved analyses for a user, optionally paginated (see _list_analyses)"""
     try:
-        current_user_email = get_jwt_identity()
+        user_id = current_user_id()
         
-        # Get user
-        user = User.query.filter_by(email=current_user_email).first()
-        if not user:
+        # Token must belong to a known user
+        if user_id is None:
             return jsonify({
                 'message': 'User not found'
             }), 404
         
         # Get saved analyses
-        analyses = SavedAnalysis.query.filter_by(user_id=user.id).order_by(SavedAnalysis.timestamp.desc()).all()
-        
-        # Convert to dict
-        analyses_dict = [analysis.to_dict() for analysis in analyses]
-        
-        return jsonify(analyses_dict), 200
+        return _list_analyses(SavedAnalysis.query.filter_by(user_id=user_id))
     
     except Exception as e:
         print(f"Get saved analyses error: {str(e)}")
@@ -447,17 +321,16 @@ def get_saved_analyses():
 def delete_saved_analysis(analysis_id):
     """Delete a saved analysis"""
     try:
-        current_user_email = get_jwt_identity()
+        user_id = current_user_id()
         
-        # Get user
-        user = User.query.filter_by(email=current_user_email).first()
-        if not user:
+        # Token must belong to a known user
+        if user_id is None:
             return jsonify({
                 'message': 'User not found'
             }), 404
         
         # Find analysis
-        analysis = SavedAnalysis.query.filter_by(id=analysis_id, user_id=user.id).first()
+        analysis = SavedAnalysis.query.filter_by(id=analysis_id, user_id=user_id).first()
         if not analysis:
             return jsonify({
                 'message': 'Analysis not found'
@@ -478,32 +351,101 @@ def delete_saved_analysis(analysis_id):
             'message': f'Error deleting analysis: {str(e)}'
         }), 500
 
+@analysis_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_saved_analyses():
+    """
+    Bulk import saved analyses in one transaction
+    The body is a JSON array, NDJSON (application/x-ndjson) or CSV
+    (text/csv) as produced by /export; mode=append inserts every row
+    instead of updating the analysis per symbol
+    """
+    try:
+        user_id = current_user_id()
+        mode = request.args.get('mode', 'upsert')
+        
+        if mode not in ('upsert', 'append'):
+            return jsonify({
+                'message': f'Unsupported mode: {mode}'
+            }), 400
+        
+        # Token must belong to a known user
+        if user_id is None:
+            return jsonify({
+                'message': 'User not found'
+            }), 404
+        
+        try:
+            rows = parse_import(request.get_data(as_text=True), request.content_type)
+        except ValueError as e:
+            return jsonify({
+                'message': str(e)
+            }), 400
+        
+        created, updated = import_analyses(user_id, rows, mode)
+        
+        return jsonify({
+            'message': 'Analyses imported successfully',
+            'created': created,
+            'updated': updated
+        }), 200
+    
+    except Exception as e:
+        print(f"Import analyses error: {str(e)}")
+        return jsonify({
+            'message': f'Error importing analyses: {str(e)}'
+        }), 500
+
+@analysis_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_saved_analyses():
+    """Stream all saved analyses of a user as NDJSON (default) or CSV"""
+    export_format = request.args.get('format', 'ndjson')
+    formats = {
+        'ndjson': (iter_ndjson, 'application/x-ndjson'),
+        'csv': (iter_csv, 'text/csv')
+    }
+    
+    if export_format not in formats:
+        return jsonify({
+            'message': f'Unsupported format: {export_format}'
+        }), 400
+    
+    user_id = current_user_id()
+    if user_id is None:
+        return jsonify({
+            'message': 'User not found'
+        }), 404
+    
+    encode, mimetype = formats[export_format]
+    rows = export_rows(user_id, request.args.get('symbol'))
+    
+    return Response(
+        stream_with_context(encode(rows)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=saved_analyses.{export_format}'}
+    )
+
 # Add these routes to your analysis_routes.py file
 
 @analysis_bp.route('/notes/stock/<symbol>', methods=['GET'])
 @jwt_required()
 def get_stock_notes(symbol):
-    """Get all notes for a specific stock"""
+    """Get notes for a specific stock, optionally paginated (see _list_analyses)"""
     try:
-        current_user_email = get_jwt_identity()
+        user_id = current_user_id()
         
-        # Get user
-        user = User.query.filter_by(email=current_user_email).first()
-        if not user:
+        # Token must belong to a known user
+        if user_id is None:
             return jsonify({
                 'message': 'User not found'
             }), 404
         
         # Get saved analyses for this symbol
-        analyses = SavedAnalysis.query.filter_by(
-            user_id=user.id, 
+        return _list_analyses(SavedAnalysis.query.filter_by(
+            user_id=user_id, 
             symbol=symbol.upper()
-        ).order_by(SavedAnalysis.timestamp.desc()).all()
-        
-        # Convert to dict
-        analyses_dict = [analysis.to_dict() for analysis in analyses]
-        
-        return jsonify(analyses_dict), 200
+        ))
     
     except Exception as e:
         print(f"Get stock notes error: {str(e)}")
@@ -512,12 +454,64 @@ def get_stock_notes(symbol):
         }), 500
 
 
+@analysis_bp.route('/notes/search', methods=['GET'])
+@jwt_required()
+def search_stock_notes():
+    """
+    Full-text search over a user's notes, names and symbols
+    Results are ranked best match first, with a highlighted snippet; pass
+    limit=<n> and the X-Next-Cursor header back as cursor=<...> to page
+    """
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 20, type=int)
+    cursor = request.args.get('cursor', '0')
+    
+    if not query:
+        return jsonify([]), 200
+    
+    if not 1 <= limit <= SAVED_PAGE_MAX:
+        return jsonify({
+            'message': f'limit must be between 1 and {SAVED_PAGE_MAX}'
+        }), 400
+    
+    if not cursor.isdigit():
+        return jsonify({
+            'message': 'Invalid cursor'
+        }), 400
+    offset = int(cursor)
+    
+    try:
+        user_id = current_user_id()
+        
+        # Token must belong to a known user
+        if user_id is None:
+            return jsonify({
+                'message': 'User not found'
+            }), 404
+        
+        # One extra row tells whether another page exists
+        results = search_notes(user_id, query, limit + 1, offset)
+        
+        response = jsonify([
+            dict(analysis.to_dict(), snippet=snippet)
+            for analysis, snippet in results[:limit]
+        ])
+        if len(results) > limit:
+            response.headers['X-Next-Cursor'] = str(offset + limit)
+        return response, 200
+    
+    except Exception as e:
+        print(f"Search notes error: {str(e)}")
+        return jsonify({
+            'message': f'Error searching notes: {str(e)}'
+        }), 500
+
 @analysis_bp.route('/notes/<analysis_id>', methods=['PUT'])
 @jwt_required()
 def update_note(analysis_id):
     """Update an existing note"""
     try:
-        current_user_email = get_jwt_identity()
+        user_id = current_user_id()
         data = request.get_json()
         
         # Validate input
@@ -526,15 +520,14 @@ def update_note(analysis_id):
                 'message': 'Missing notes field'
             }), 400
         
-        # Get user
-        user = User.query.filter_by(email=current_user_email).first()
-        if not user:
+        # Token must belong to a known user
+        if user_id is None:
             return jsonify({
                 'message': 'User not found'
             }), 404
         
         # Find analysis
-        analysis = SavedAnalysis.query.filter_by(id=analysis_id, user_id=user.id).first()
+        analysis = SavedAnalysis.query.filter_by(id=analysis_id, user_id=user_id).first()
         if not analysis:
             return jsonify({
                 'message': 'Analysis not found'
@@ -5,16 +5,35 @@ from flask_jwt_extended import (
     get_jwt_identity,
     jwt_required
 )
-from werkzeug.security import generate_password_hash, check_password_hash
+from config import LOGIN_IP_LIMIT, LOGIN_ACCOUNT_LIMIT, REGISTER_IP_LIMIT, PASSWORD_HASH_TIMEOUT
 from database import db
 from models.models import User
+from utils.auth import user_claims, current_user_id, get_cached_user
+from utils.hashing import hash_password, verify_password, HashingBusyError, HashingTimeoutError
+from utils.rate_limit import RateLimiter, check_rate_limits, client_ip
 
 # Create blueprint
 auth_bp = Blueprint('auth', __name__)
 
+# Rate limits per client IP and per account
+login_ip_limiter = RateLimiter('login_ip', *LOGIN_IP_LIMIT)
+login_account_limiter = RateLimiter('login_account', *LOGIN_ACCOUNT_LIMIT)
+register_ip_limiter = RateLimiter('register_ip', *REGISTER_IP_LIMIT)
+
+def busy_response(retry_after=1):
+    """503 for when the password hashing queue is full or a hash timed out"""
+    response = jsonify({'message': 'Server busy, please try again shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
 # Routes
 @auth_bp.route('/register', methods=['POST'])
 def register():
+    limited = check_rate_limits((register_ip_limiter, client_ip()))
+    if limited:
+        return limited
+    
     try:
         data = request.get_json()
         
@@ -31,7 +50,7 @@ def register():
         new_user = User(
             email=data['email'],
             name=data['name'],
-            password=generate_password_hash(data['password'])
+            password=hash_password(data['password'])
         )
         
         # Save to database
@@ -40,6 +59,12 @@ def register():
         
         return jsonify({'message': 'User registered successfully'}), 201
     
+    except HashingTimeoutError:
+        return busy_response(PASSWORD_HASH_TIMEOUT)
+    
+    except HashingBusyError:
+        return busy_response()
+    
     except Exception as e:
         db.session.rollback()
         print(f"Registration error: {str(e)}")
@@ -54,16 +79,23 @@ def login():
         if not data or not data.get('email') or not data.get('password'):
             return jsonify({'message': 'Missing email or password'}), 400
         
+        limited = check_rate_limits(
+            (login_ip_limiter, client_ip()),
+            (login_account_limiter, str(data['email']).lower())
+        )
+        if limited:
+            return limited
+        
         # Find user
         user = User.query.filter_by(email=data['email']).first()
         
         # Check if user exists and password is correct
-        if not user or not check_password_hash(user.password, data['password']):
+        if not user or not verify_password(user.password, data['password']):
             return jsonify({'message': 'Invalid credentials'}), 401
         
         # Create tokens
-        access_token = create_access_token(identity=data['email'])
-        refresh_token = create_refresh_token(identity=data['email'])
+        access_token = create_access_token(identity=data['email'], additional_claims=user_claims(user.id))
+        refresh_token = create_refresh_token(identity=data['email'], additional_claims=user_claims(user.id))
         
         return jsonify({
             'message': 'Login successful',
@@ -72,6 +104,12 @@ def login():
             'user': user.to_dict()
         }), 200
     
+    except HashingTimeoutError:
+        return busy_response(PASSWORD_HASH_TIMEOUT)
+    
+    except HashingBusyError:
+        return busy_response()
+    
     except Exception as e:
         print(f"Login error: {str(e)}")
         return jsonify({'message': f'Server error: {str(e)}'}), 500
@@ -80,13 +118,13 @@ def login():
 @jwt_required()
 def get_user():
     try:
-        current_user_email = get_jwt_identity()
-        user = User.query.filter_by(email=current_user_email).first()
+        user_id = current_user_id()
+        user = get_cached_user(user_id) if user_id is not None else None
         
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
-        return jsonify(user.to_dict()), 200
+        return jsonify(user), 200
     
     except Exception as e:
         print(f"Get user error: {str(e)}")
@@ -97,7 +135,11 @@ def get_user():
 def refresh():
     try:
         current_user = get_jwt_identity()
-        access_token = create_access_token(identity=current_user)
+        user_id = current_user_id()
+        if user_id is None:
+            return jsonify({'message': 'User not found'}), 404
+        
+        access_token = create_access_token(identity=current_user, additional_claims=user_claims(user_id))
         
         return jsonify({
             'access_token': access_token
@@ -0,0 +1,264 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required
+import json
+import time
+from config import (
+    SECTOR_ETFS,
+    CORRELATION_MAX_SYMBOLS,
+    RISK_MC_PATHS,
+    RISK_MC_MAX_PATHS,
+    SAVED_PAGE_MAX,
+    JOB_STREAM_POLL_SECONDS,
+    JOB_STREAM_TIMEOUT
+)
+from database import db
+from models.models import Job
+from services.analysis_cache import causal_cache, recommendation_cache, sector_cache
+from services.stock_analysis import get_causal_factors, get_investment_recommendation, get_sector_analysis
+from services.analysis_context import AnalysisContext
+from services.backtest_service import backtest_from_store
+from services.job_queue import register_job, job_kinds, enqueue, cancel, JobQueueFullError, ACTIVE_STATUSES
+from services.risk_service import portfolio_risk
+from utils.auth import current_user_id
+
+# Create blueprint
+job_bp = Blueprint('jobs', __name__)
+
+# Seconds between comments on an event stream with no news
+KEEPALIVE_SECONDS = 15
+
+# Job kinds
+def _symbols(params, required=True):
+    """Validated, upper-cased symbols list of job params"""
+    symbols = params.get('symbols')
+    if symbols is None and not required:
+        return None
+    if isinstance(symbols, list):
+        symbols = sorted({str(symbol).strip().upper() for symbol in symbols if str(symbol).strip()})
+    if not isinstance(symbols, list) or not 1 <= len(symbols) <= CORRELATION_MAX_SYMBOLS:
+        raise ValueError(f'symbols must be a list of 1 to {CORRELATION_MAX_SYMBOLS} symbols')
+    return symbols
+
+def _validate_symbols(params):
+    return {'symbols': _symbols(params)}
+
+def _validate_risk(params):
+    paths = params.get('paths', RISK_MC_PATHS)
+    if not isinstance(paths, int) or not 100 <= paths <= RISK_MC_MAX_PATHS:
+        raise ValueError(f'paths must be between 100 and {RISK_MC_MAX_PATHS}')
+    return {'symbols': _symbols(params), 'paths': paths}
+
+def _validate_backtest(params):
+    validated = {'symbols': _symbols(params, required=False)}
+    for name in ('window', 'horizon'):
+        if name in params:
+            if not isinstance(params[name], int) or params[name] < 2:
+                raise ValueError(f'{name} must be an integer of at least 2')
+            validated[name] = params[name]
+    return validated
+
+@register_job('recommendations', validate=_validate_symbols)
+def recommendations_job(params, progress):
+    """Recommendations for many symbols, refreshing the per-symbol caches"""
+    symbols = params['symbols']
+    # Shared by every symbol, so the benchmark is fetched once
+    context = AnalysisContext()
+    recommendations = {}
+    errors = {}
+
+    for i, symbol in enumerate(symbols):
+        try:
+            causal = causal_cache.refresh(symbol, lambda: get_causal_factors(symbol, context))
+            recommendations[symbol] = recommendation_cache.refresh(
+                symbol, lambda: get_investment_recommendation(symbol, causal, context)
+            )
+        except Exception as e:
+            errors[symbol] = str(e)
+        progress((i + 1) / len(symbols), f"Analyzed {symbol}")
+
+    return {'recommendations': recommendations, 'errors': errors}
+
+@register_job('risk', validate=_validate_risk)
+def risk_job(params, progress):
+    """Risk report of an equally weighted portfolio"""
+    progress(0.0, 'Simulating')
+    return portfolio_risk(params['symbols'], paths=params['paths'])
+
+@register_job('sectors')
+def sectors_job(params, progress):
+    """Rebuild the analysis of every sector"""
+    context = AnalysisContext()
+    sectors = {}
+    errors = {}
+
+    for i, sector in enumerate(SECTOR_ETFS):
+        try:
+            sectors[sector] = sector_cache.refresh(sector, lambda: get_sector_analysis(sector, context))
+        except Exception as e:
+            errors[sector] = str(e)
+        progress((i + 1) / len(SECTOR_ETFS), f"Analyzed {sector}")
+
+    return {'sectors': sectors, 'errors': errors}
+
+@register_job('backtest', validate=_validate_backtest)
+def backtest_job(params, progress):
+    """Backtest of the recommendation logic on the stored price history"""
+    progress(0.0, 'Replaying history')
+    options = {name: params[name] for name in ('window', 'horizon') if name in params}
+    return backtest_from_store(params.get('symbols'), **options)
+
+def _user_job(job_id):
+    """The current user's job, or None"""
+    user_id = current_user_id()
+    job = db.session.get(Job, job_id)
+    if job is None or user_id is None or job.user_id != user_id:
+        return None
+    return job
+
+# Routes
+@job_bp.route('', methods=['POST'])
+@jwt_required()
+def create_job():
+    """
+    Queue a long-running analysis and return its id straight away
+    Body: {"kind": ..., "params": {...}}; poll GET /api/jobs/<id> or stream
+    GET /api/jobs/<id>/events for progress and the result
+    """
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind')
+    params = data.get('params') or {}
+
+    if kind not in job_kinds():
+        return jsonify({
+            'message': f"kind must be one of {', '.join(job_kinds())}"
+        }), 400
+
+    if not isinstance(params, dict):
+        return jsonify({
+            'message': 'params must be an object'
+        }), 400
+
+    user_id = current_user_id()
+
+    # Token must belong to a known user
+    if user_id is None:
+        return jsonify({
+            'message': 'User not found'
+        }), 404
+
+    try:
+        job = enqueue(kind, params, user_id)
+    except ValueError as e:
+        return jsonify({
+            'message': str(e)
+        }), 400
+    except JobQueueFullError as e:
+        response = jsonify({'message': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+
+    response = jsonify(job.to_dict(include_result=False))
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response
+
+@job_bp.route('', methods=['GET'])
+@jwt_required()
+def list_jobs():
+    """The current user's jobs, newest first, without results"""
+    user_id = current_user_id()
+    limit = request.args.get('limit', 20, type=int)
+    status = request.args.get('status')
+
+    if not 1 <= limit <= SAVED_PAGE_MAX:
+        return jsonify({
+            'message': f'limit must be between 1 and {SAVED_PAGE_MAX}'
+        }), 400
+
+    jobs = Job.query.filter_by(user_id=user_id)
+    if status:
+        jobs = jobs.filter_by(status=status)
+    jobs = jobs.order_by(Job.created_at.desc()).limit(limit)
+
+    return jsonify([job.to_dict(include_result=False) for job in jobs]), 200
+
+@job_bp.route('/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Status, progress and, once finished, the result of a job"""
+    job = _user_job(job_id)
+    if job is None:
+        return jsonify({
+            'message': 'Job not found'
+        }), 404
+
+    return jsonify(job.to_dict()), 200
+
+@job_bp.route('/<job_id>', methods=['DELETE'])
+@jwt_required()
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    job = _user_job(job_id)
+    if job is None:
+        return jsonify({
+            'message': 'Job not found'
+        }), 404
+
+    if not cancel(job):
+        return jsonify({
+            'message': f'Job already {job.status}'
+        }), 409
+
+    return jsonify({
+        'message': 'Job cancelled'
+    }), 200
+
+@job_bp.route('/<job_id>/events', methods=['GET'])
+@jwt_required()
+def stream_job(job_id):
+    """
+    Server-sent events for a job: a progress event whenever it changes and
+    a final done event carrying the finished job with its result
+    """
+    job = _user_job(job_id)
+    if job is None:
+        return jsonify({
+            'message': 'Job not found'
+        }), 404
+
+    def events():
+        last = None
+        idle_since = time.monotonic()
+        deadline = time.monotonic() + JOB_STREAM_TIMEOUT
+
+        while time.monotonic() < deadline:
+            current = db.session.get(Job, job_id, populate_existing=True)
+            data = current.to_dict() if current is not None else None
+            # End the read transaction so the next poll sees new commits
+            db.session.rollback()
+            if data is None:
+                return
+
+            if data['status'] not in ACTIVE_STATUSES:
+                yield f"event: done\ndata: {json.dumps(data)}\n\n"
+                return
+
+            state = (data['status'], data['progress'], data['message'])
+            if state != last:
+                last = state
+                idle_since = time.monotonic()
+                data.pop('result')
+                yield f"event: progress\ndata: {json.dumps(data)}\n\n"
+            elif time.monotonic() - idle_since >= KEEPALIVE_SECONDS:
+                # Keep proxies from closing an idle stream
+                idle_since = time.monotonic()
+                yield ": keepalive\n\n"
+
+            time.sleep(JOB_STREAM_POLL_SECONDS)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
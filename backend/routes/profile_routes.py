@@ -0,0 +1,43 @@
+from flask import Blueprint, request, jsonify, send_file
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import os
+from utils.profiling import is_admin, list_profiles, profile_path, format_stats
+
+# Create blueprint
+profile_bp = Blueprint('profiles', __name__)
+
+# Routes
+@profile_bp.route('', methods=['GET'])
+@jwt_required()
+def get_profiles():
+    """List stored request profiles (admins only)"""
+    if not is_admin(get_jwt_identity()):
+        return jsonify({'message': 'Admin access required'}), 403
+    
+    return jsonify(list_profiles()), 200
+
+@profile_bp.route('/<profile_id>', methods=['GET'])
+@jwt_required()
+def get_profile(profile_id):
+    """
+    Download a stored profile (admins only)
+    Returns the raw cProfile file, or a text report with format=text
+    """
+    if not is_admin(get_jwt_identity()):
+        return jsonify({'message': 'Admin access required'}), 403
+    
+    path = profile_path(profile_id)
+    if not path or not os.path.exists(path):
+        return jsonify({'message': 'Profile not found'}), 404
+    
+    if request.args.get('format') == 'text':
+        sort = request.args.get('sort', 'cumulative')
+        limit = request.args.get('limit', 40, type=int)
+        try:
+            report = format_stats(path, sort, limit)
+        except KeyError:
+            return jsonify({'message': f'Unsupported sort key: {sort}'}), 400
+        return report, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f"{profile_id}.prof")
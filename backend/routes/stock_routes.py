@@ -1,9 +1,23 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from flask_jwt_extended import jwt_required
-import yfinance as yf
-import pandas as pd
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from config import STALE_MAX_AGE_SECONDS, SCREENER_PAGE_MAX, SCREENER_BUILD_RETRY_SECONDS, HISTORY_BATCH_MAX_SYMBOLS, UPSTREAM_FETCH_WORKERS
+from services.data_provider import get_data_provider
+from services.indicator_service import get_indicators, PERIOD_DAYS
+from services.details_service import get_details
+from services.screener_service import get_table, TableBuildingError, NUMERIC_FIELDS
+from utils.cache import TTLCache
+from services.price_cache import get_series
+from services.price_series import PriceSeries
+from services.price_store import get_bars, INTRADAY_INTERVALS
+from utils.downsample import lttb_indices, ohlc_buckets
+from utils.lazy import lazy_import
+from utils.wire import JSON, ARROW, MSGPACK, FORMAT_NAMES, available_formats, negotiate, arrow_stream, msgpack_payload
+from utils.resilience import StaleCache, mark_stale, upstream_error_response
+
+np = lazy_import('numpy')
 
 # Create blueprint
 stock_bp = Blueprint('stocks', __name__)
@@ -22,47 +36,185 @@ POPULAR_STOCKS = [
     {"symbol": "JNJ", "name": "Johnson & Johnson"}
 ]
 
+# Downsampled histories per (symbol, period, interval, points, resolution)
+_downsampled_cache = TTLCache(maxsize=512, ttl=5 * 60, name='downsampled_history')
+
+# Last good search results, served marked stale while they refresh or
+# while the upstream is down
+_search_cache = StaleCache('stock_search', fresh_ttl=60 * 60, stale_ttl=STALE_MAX_AGE_SECONDS, maxsize=1024)
+
+# Timeframes of the history endpoints and the period each loads
+PERIODS = {
+    '1d': '1d',
+    '5d': '5d',
+    '1mo': '1mo',
+    '3mo': '3mo',
+    '6mo': '6mo',
+    '1y': '1y',
+    '2y': '2y',
+    '5y': '5y',
+    'max': 'max'
+}
+
+# Short timeframes default to intraday bars
+DEFAULT_INTERVALS = {
+    '1d': '5m',
+    '5d': '15m'
+}
+
+def _columns(hist):
+    """Dates and float64 OHLC / int64 volume arrays of a PriceSeries or history frame"""
+    if isinstance(hist, PriceSeries):
+        return (hist.dates, hist.open.astype(float), hist.high.astype(float), hist.low.astype(float),
+                hist.close.astype(float), hist.volume.astype('int64'))
+    return (hist.index, hist['Open'].to_numpy(dtype=float), hist['High'].to_numpy(dtype=float),
+            hist['Low'].to_numpy(dtype=float), hist['Close'].to_numpy(dtype=float),
+            hist['Volume'].to_numpy(dtype='int64'))
+
+def _downsample(dates, opens, highs, lows, closes, volumes, points, resolution):
+    """
+    Reduce bars to points: line charts keep the bars picked by LTTB on the
+    close and candle charts aggregate the bars into points OHLC candles
+    """
+    if not points or points >= len(closes):
+        return dates, opens, highs, lows, closes, volumes
+    if resolution == 'candle':
+        starts, opens, highs, lows, closes, volumes = ohlc_buckets(opens, highs, lows, closes, volumes, points)
+    else:
+        starts = lttb_indices(closes, points)
+        opens, highs, lows, closes, volumes = opens[starts], highs[starts], lows[starts], closes[starts], volumes[starts]
+    return (dates[starts], opens, highs, lows, closes, volumes)
+
+def _format_prices(hist, points=None, resolution='line', date_format='%Y-%m-%d'):
+    """Format a daily PriceSeries or an intraday history frame as a list of bars"""
+    dates, opens, highs, lows, closes, volumes = _downsample(*_columns(hist), points, resolution)
+    
+    return [
+        {
+            'date': date,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': volume
+        }
+        for date, open_, high, low, close, volume in zip(
+            dates.strftime(date_format),
+            opens.round(2).tolist(),
+            highs.round(2).tolist(),
+            lows.round(2).tolist(),
+            closes.round(2).tolist(),
+            volumes.tolist()
+        )
+    ]
+
+def _price_columns(hist, points=None, resolution='line'):
+    """
+    Columns of a daily PriceSeries or an intraday history frame for the
+    binary formats: float32 prices, uint64 volume and dates as int32 days
+    (daily) or int64 milliseconds (intraday). A daily series that isn't
+    downsampled is passed on as the cached buffers themselves
+    """
+    if isinstance(hist, PriceSeries):
+        columns = (hist.days, hist.open, hist.high, hist.low, hist.close, hist.volume)
+    else:
+        # Through datetime64[ms], whatever unit the index is stored in
+        columns = (hist.index.values.astype('datetime64[ms]').astype(np.int64), hist['Open'].to_numpy(dtype=np.float32),
+                   hist['High'].to_numpy(dtype=np.float32), hist['Low'].to_numpy(dtype=np.float32),
+                   hist['Close'].to_numpy(dtype=np.float32), hist['Volume'].to_numpy().astype(np.uint64))
+    
+    dates, opens, highs, lows, closes, volumes = _downsample(*columns, points, resolution)
+    return {
+        'date': dates,
+        'open': opens.astype(np.float32, copy=False),
+        'high': highs.astype(np.float32, copy=False),
+        'low': lows.astype(np.float32, copy=False),
+        'close': closes.astype(np.float32, copy=False),
+        'volume': volumes.astype(np.uint64, copy=False)
+    }
+
+def _history_args():
+    """(period, interval, points, resolution) of a history request, or an error response"""
+    timeframe = request.args.get('timeframe', 'max')  # Default to max
+    period = PERIODS.get(timeframe, '1mo')
+    
+    interval = request.args.get('interval', DEFAULT_INTERVALS.get(period, '1d'))
+    if interval != '1d' and interval not in INTRADAY_INTERVALS:
+        return jsonify({
+            'message': f'Unsupported interval: {interval}'
+        }), 400
+    
+    # Optional downsampling for charts
+    resolution = request.args.get('resolution', 'line')
+    if resolution not in ('line', 'candle'):
+        return jsonify({
+            'message': f'Unsupported resolution: {resolution}'
+        }), 400
+    
+    points = request.args.get('points', type=int)
+    if points is not None and points < 3:
+        return jsonify({
+            'message': 'points must be at least 3'
+        }), 400
+    
+    return period, interval, points, resolution
+
+def _negotiate():
+    """Response mimetype of a history request, or an error response"""
+    mimetype = negotiate(request)
+    if mimetype is None:
+        formats = [name for name, mimetype in FORMAT_NAMES.items() if mimetype in available_formats()]
+        return jsonify({
+            'message': f"Unsupported format, expected one of {', '.join(formats)}"
+        }), 406
+    return mimetype
+
+def _binary_response(body, mimetype):
+    response = Response(body, mimetype=mimetype)
+    response.headers['Vary'] = 'Accept'
+    return response
+
 # Routes
 @stock_bp.route('/<symbol>', methods=['GET'])
 def get_stock_data(symbol):
-    """Get stock data for a specific symbol"""
-    timeframe = request.args.get('timeframe', 'max')  # Default to max
+    """
+    Get stock data for a specific symbol
+    Pass interval=1m|5m|15m|1h for intraday bars (timestamps in UTC), and
+    points=<n> to downsample long histories for charts, with
+    resolution=line (default) or resolution=candle
+    Clients sending Accept: application/vnd.apache.arrow.stream or
+    application/x-msgpack (or format=arrow|msgpack) get the bars as columns
+    """
+    mimetype = _negotiate()
+    if not isinstance(mimetype, str):
+        return mimetype
     
-    # Map timeframe to period
-    periods = {
-        '1d': '1d',
-        '5d': '5d',
-        '1mo': '1mo',
-        '3mo': '3mo',
-        '6mo': '6mo',
-        '1y': '1y',
-        '2y': '2y',
-        '5y': '5y',
-        'max': 'max'
-    }
+    args = _history_args()
+    if not isinstance(args[0], str):
+        return args
+    period, interval, points, resolution = args
     
-    period = periods.get(timeframe, '1mo')
+    cache_key = (symbol.upper(), period, interval, points, resolution)
+    if points and mimetype == JSON:
+        cached = _downsampled_cache.get(cache_key)
+        if cached is not None:
+            response = jsonify(cached)
+            response.headers['Vary'] = 'Accept'
+            return response, 200
     
     try:
         # Get stock data
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period=period)
-        
-        # Format data
-        data = []
-        for date, row in hist.iterrows():
-            data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'open': round(row['Open'], 2),
-                'high': round(row['High'], 2),
-                'low': round(row['Low'], 2),
-                'close': round(row['Close'], 2),
-                'volume': int(row['Volume'])
-            })
+        provider = get_data_provider()
+        if interval in INTRADAY_INTERVALS:
+            hist = get_bars(symbol, interval, period)
+            date_format = '%Y-%m-%d %H:%M'
+        else:
+            hist = get_series(symbol, period)
+            date_format = '%Y-%m-%d'
         
         # Get company info
         try:
-            info = stock.info
+            info = provider.info(symbol)
             company_name = info.get('shortName', symbol)
             sector = info.get('sector', '')
             industry = info.get('industry', '')
@@ -71,17 +223,110 @@ def get_stock_data(symbol):
             sector = ''
             industry = ''
         
-        return jsonify({
+        result = {
             'symbol': symbol,
             'name': company_name,
             'sector': sector,
             'industry': industry,
-            'prices': data
-        }), 200
+            'interval': interval
+        }
+        
+        if mimetype == ARROW:
+            return _binary_response(arrow_stream([(symbol, _price_columns(hist, points, resolution))], metadata=result), mimetype), 200
+        if mimetype == MSGPACK:
+            return _binary_response(msgpack_payload({**result, 'prices': _price_columns(hist, points, resolution)}), mimetype), 200
+        
+        # Format data
+        result['prices'] = _format_prices(hist, points, resolution, date_format)
+        
+        if points:
+            _downsampled_cache.set(cache_key, result)
+        
+        response = jsonify(result)
+        response.headers['Vary'] = 'Accept'
+        return response, 200
     
     except Exception as e:
+        return upstream_error_response('Error fetching stock data', e)
+
+@stock_bp.route('/history', methods=['GET'])
+def get_histories():
+    """
+    Daily histories of several symbols: symbols=AAPL,MSFT plus the
+    timeframe, points and resolution of the single-symbol endpoint, in
+    JSON, Arrow (one record batch per symbol) or MessagePack like it
+    Symbols that fail to load are reported under errors
+    """
+    mimetype = _negotiate()
+    if not isinstance(mimetype, str):
+        return mimetype
+    
+    symbols = list(dict.fromkeys(
+        symbol.strip().upper() for symbol in request.args.get('symbols', '').split(',') if symbol.strip()
+    ))
+    if not 1 <= len(symbols) <= HISTORY_BATCH_MAX_SYMBOLS:
         return jsonify({
-            'message': f'Error fetching stock data: {str(e)}'
+            'message': f'symbols must list 1 to {HISTORY_BATCH_MAX_SYMBOLS} symbols'
+        }), 400
+    
+    args = _history_args()
+    if not isinstance(args[0], str):
+        return args
+    period, interval, points, resolution = args
+    
+    if interval != '1d':
+        return jsonify({
+            'message': 'Batch histories only serve daily bars'
+        }), 400
+    
+    def load(symbol):
+        try:
+            return get_series(symbol, period), None
+        except Exception as e:
+            return None, str(e)
+    
+    with ThreadPoolExecutor(max_workers=min(UPSTREAM_FETCH_WORKERS, len(symbols))) as executor:
+        loaded = list(executor.map(load, symbols))
+    
+    histories = {symbol: series for symbol, (series, _) in zip(symbols, loaded) if series is not None}
+    errors = {symbol: error for symbol, (_, error) in zip(symbols, loaded) if error is not None}
+    if not histories:
+        return upstream_error_response('Error fetching stock data', RuntimeError('; '.join(errors.values())))
+    
+    if mimetype == ARROW:
+        tables = [(symbol, _price_columns(series, points, resolution)) for symbol, series in histories.items()]
+        return _binary_response(arrow_stream(tables, metadata={'interval': interval, 'errors': errors}), mimetype), 200
+    if mimetype == MSGPACK:
+        return _binary_response(msgpack_payload({
+            'interval': interval,
+            'histories': {symbol: _price_columns(series, points, resolution) for symbol, series in histories.items()},
+            'errors': errors
+        }), mimetype), 200
+    
+    response = jsonify({
+        'interval': interval,
+        'histories': {symbol: _format_prices(series, points, resolution) for symbol, series in histories.items()},
+        'errors': errors
+    })
+    response.headers['Vary'] = 'Accept'
+    return response, 200
+
+@stock_bp.route('/<symbol>/indicators', methods=['GET'])
+def get_stock_indicators(symbol):
+    """Get technical indicators for a specific symbol"""
+    period = request.args.get('period', '1y')
+    
+    if period not in PERIOD_DAYS:
+        return jsonify({
+            'message': f'Unsupported period: {period}'
+        }), 400
+    
+    try:
+        return jsonify(get_indicators(symbol, period)), 200
+    
+    except Exception as e:
+        return jsonify({
+            'message': f'Error computing indicators: {str(e)}'
         }), 500
 
 @stock_bp.route('/search', methods=['GET'])
@@ -93,84 +338,85 @@ def search_stocks():
         return jsonify([]), 200
     
     try:
-        # This is a simplified implementation
-        # In a real app, you'd use a more sophisticated search
-        tickers = yf.Tickers(' '.join([query, f"{query}.*"]))
-        results = []
-        
-        for ticker in tickers.tickers:
-            try:
-                info = ticker.info
-                if 'symbol' in info and 'shortName' in info:
-                    results.append({
-                        'symbol': info['symbol'],
-                        'name': info['shortName']
-                    })
-                    # Limit to 10 results
-                    if len(results) >= 10:
-                        break
-            except:
-                pass
-        
-        return jsonify(results), 200
+        results, age = _search_cache.get(query.lower(), lambda: get_data_provider().search(query, limit=10))
+        return mark_stale(jsonify(results), age), 200
     
     except Exception as e:
-        # Fallback to mock data for demo purposes
-        mock_results = [
-            {"symbol": f"{query.upper()}", "name": f"Sample Company for {query}"},
-            {"symbol": f"{query.upper()}A", "name": f"Another Sample for {query}"}
-        ]
-        return jsonify(mock_results), 200
+        return upstream_error_response('Error searching stocks', e)
 
 @stock_bp.route('/popular', methods=['GET'])
 def get_popular_stocks():
     """Get a list of popular stocks"""
     return jsonify(POPULAR_STOCKS), 200
 
+@stock_bp.route('/screener', methods=['GET'])
+def screen_stocks():
+    """
+    Filter and sort the tracked universe
+    Each numeric field takes <field>_min and <field>_max bounds; pass
+    sector=<name>[,<name>...], sort=<field>, order=asc|desc, limit and offset
+    """
+    ranges = {}
+    for field in NUMERIC_FIELDS:
+        low = request.args.get(f'{field}_min')
+        high = request.args.get(f'{field}_max')
+        if low is None and high is None:
+            continue
+        try:
+            ranges[field] = (
+                float(low) if low is not None else None,
+                float(high) if high is not None else None
+            )
+        except ValueError:
+            return jsonify({
+                'message': f'Invalid bound for {field}'
+            }), 400
+    
+    sectors = [sector.strip() for sector in request.args.get('sector', '').split(',') if sector.strip()]
+    sort = request.args.get('sort')
+    order = request.args.get('order', 'desc')
+    limit = request.args.get('limit', 50, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    
+    if sort is not None and sort not in NUMERIC_FIELDS:
+        return jsonify({
+            'message': f"sort must be one of {', '.join(NUMERIC_FIELDS)}"
+        }), 400
+    
+    if order not in ('asc', 'desc'):
+        return jsonify({
+            'message': 'order must be asc or desc'
+        }), 400
+    
+    if not 1 <= limit <= SCREENER_PAGE_MAX or offset < 0:
+        return jsonify({
+            'message': f'limit must be between 1 and {SCREENER_PAGE_MAX} and offset not negative'
+        }), 400
+    
+    try:
+        table, age = get_table()
+        total, results = table.screen(ranges, sectors, sort, order == 'desc', limit, offset)
+        return mark_stale(jsonify({
+            'total': total,
+            'results': results,
+            'asOf': datetime.fromtimestamp(table.built_at).isoformat(timespec='seconds')
+        }), age), 200
+    
+    except TableBuildingError as e:
+        response = jsonify({'message': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(SCREENER_BUILD_RETRY_SECONDS)
+        return response
+    
+    except Exception as e:
+        return upstream_error_response('Error screening stocks', e)
+
 @stock_bp.route('/details/<symbol>', methods=['GET'])
 def get_stock_details(symbol):
     """Get detailed information about a stock"""
     try:
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        
-        # Format data
-        details = {
-            'symbol': symbol,
-            'name': info.get('shortName', symbol),
-            'logo': info.get('logo_url', ''),
-            'sector': info.get('sector', ''),
-            'industry': info.get('industry', ''),
-            'description': info.get('longBusinessSummary', ''),
-            'website': info.get('website', ''),
-            'market_cap': info.get('marketCap', 0),
-            'pe_ratio': info.get('trailingPE', 0),
-            'dividend_yield': info.get('dividendYield', 0) * 100 if info.get('dividendYield') else 0,
-            'fifty_two_week_high': info.get('fiftyTwoWeekHigh', 0),
-            'fifty_two_week_low': info.get('fiftyTwoWeekLow', 0),
-            'average_volume': info.get('averageVolume', 0),
-            'beta': info.get('beta', 0)
-        }
-        
-        return jsonify(details), 200
+        details, age = get_details(symbol)
+        return mark_stale(jsonify(details), age), 200
     
     except Exception as e:
-        # Fallback to mock data for demo purposes
-        mock_details = {
-            'symbol': symbol,
-            'name': f"{symbol} Inc.",
-            'logo': '',
-            'sector': 'Technology',
-            'industry': 'Software',
-            'description': f"This is a sample description for {symbol}.",
-            'website': f"https://www.{symbol.lower()}.com",
-            'market_cap': 1000000000,
-            'pe_ratio': 20.5,
-            'dividend_yield': 1.5,
-            'fifty_two_week_high': 150.0,
-            'fifty_two_week_low': 100.0,
-            'average_volume': 5000000,
-            'beta': 1.2
-        }
-        
-        return jsonify(mock_details), 200
\ No newline at end of file
+        return upstream_error_response('Error fetching stock details', e)
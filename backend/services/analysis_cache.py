@@ -0,0 +1,15 @@
+"""
+Last good analyses, shared by the analysis routes, the scheduler's cache
+warming and background jobs. Served marked stale while they refresh or
+while the upstream is down
+"""
+from config import STALE_MAX_AGE_SECONDS
+from utils.resilience import StaleCache
+
+# Keyed by upper-case symbol
+causal_cache = StaleCache('causal_analysis', fresh_ttl=5 * 60, stale_ttl=STALE_MAX_AGE_SECONDS)
+recommendation_cache = StaleCache('recommendation', fresh_ttl=5 * 60, stale_ttl=STALE_MAX_AGE_SECONDS)
+# Keyed by lower-case sector name
+sector_cache = StaleCache('sector_analysis', fresh_ttl=15 * 60, stale_ttl=STALE_MAX_AGE_SECONDS)
+# Keyed by (symbols, paths)
+risk_cache = StaleCache('risk', fresh_ttl=5 * 60, stale_ttl=STALE_MAX_AGE_SECONDS)
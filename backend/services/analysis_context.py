@@ -0,0 +1,50 @@
+"""
+Market data shared by the analyses of one request
+Analyses that build on each other (the recommendation reads the causal
+analysis, both read the benchmark) take an AnalysisContext, which fetches
+each symbol's daily history and company info at most once and slices
+shorter periods from the longest history it holds. This keeps a request's
+upstream calls deduplicated even with CACHE_ENABLED off
+"""
+import threading
+
+from services.data_provider import get_data_provider
+from services.price_cache import get_series, PERIOD_ORDER
+
+
+class AnalysisContext:
+    """Histories and company info loaded during one request or job"""
+
+    def __init__(self):
+        self._series = {}
+        self._info = {}
+        self._lock = threading.Lock()
+
+    def series(self, symbol, period='1y'):
+        """Daily PriceSeries of symbol over period"""
+        symbol = symbol.upper()
+        with self._lock:
+            entry = self._series.get(symbol)
+
+        if entry is None or PERIOD_ORDER.index(entry[1]) < PERIOD_ORDER.index(period):
+            entry = (get_series(symbol, period), period)
+            with self._lock:
+                self._series[symbol] = entry
+
+        return entry[0].period(period)
+
+    def history(self, symbol, period='1y'):
+        """Daily history frame of symbol over period"""
+        return self.series(symbol, period).to_frame()
+
+    def info(self, symbol):
+        """Company information dict; failures are not remembered"""
+        symbol = symbol.upper()
+        with self._lock:
+            info = self._info.get(symbol)
+
+        if info is None:
+            info = get_data_provider().info(symbol)
+            with self._lock:
+                self._info[symbol] = info
+        return info
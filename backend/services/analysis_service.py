@@ -0,0 +1,52 @@
+"""
+Scoring rules shared by the live analysis routes and the backtester
+Every function accepts scalars or NumPy arrays so the same thresholds
+drive both a single request and a vectorized replay over history
+"""
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+# Trading days per year, used to annualize volatility
+TRADING_DAYS = 252
+
+# Score thresholds for the recommendation
+BUY_THRESHOLD = 0.3
+SELL_THRESHOLD = -0.3
+
+# Confidence is capped so we never claim certainty
+MAX_CONFIDENCE = 0.95
+
+
+def market_trend_impact(correlation):
+    """Impact of the correlation with the overall market"""
+    return np.round(np.asarray(correlation) * 0.8, 2)
+
+
+def volatility_impact(volatility):
+    """Impact of annualized volatility"""
+    volatility = np.asarray(volatility)
+    return np.round(np.minimum(volatility * 2, 1.0) * np.where(volatility > 0.2, 0.5, 0.8), 2)
+
+
+def news_sentiment_impact(sentiment):
+    """Impact of a 0..1 news sentiment score (0.5 is neutral)"""
+    return np.round((np.asarray(sentiment) - 0.5) * 1.6, 2)
+
+
+def score_recommendation(overall_score, buy_threshold=BUY_THRESHOLD, sell_threshold=SELL_THRESHOLD):
+    """
+    Map overall scores to recommendations and confidences
+    Returns (recommendation, confidence) as arrays of the input shape
+    """
+    score = np.asarray(overall_score, dtype=float)
+
+    recommendation = np.where(score > buy_threshold, "BUY",
+                              np.where(score < sell_threshold, "SELL", "HOLD"))
+    confidence = np.where(
+        recommendation == "HOLD",
+        0.5 + (0.5 - np.abs(score)),
+        np.minimum(0.5 + np.abs(score), MAX_CONFIDENCE)
+    )
+
+    return recommendation, confidence
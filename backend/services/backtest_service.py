@@ -0,0 +1,203 @@
+"""
+Backtesting for the BUY/SELL/HOLD recommendation logic
+Replays the factor computation of the causal analysis over rolling
+windows of stored price history, vectorized across dates and symbols
+"""
+import os
+import time
+
+from config import (
+    PRICE_HISTORY_DIR,
+    BENCHMARK_SYMBOL,
+    BACKTEST_WINDOW,
+    BACKTEST_HORIZON,
+    BACKTEST_HOLD_BAND
+)
+from services.data_provider import get_data_provider
+from services.analysis_service import (
+    TRADING_DAYS,
+    BUY_THRESHOLD,
+    SELL_THRESHOLD,
+    market_trend_impact,
+    volatility_impact,
+    news_sentiment_impact,
+    score_recommendation
+)
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+RECOMMENDATIONS = ("BUY", "HOLD", "SELL")
+# Live factors that are random, replayed at a neutral impact of 0 so the
+# score keeps the live denominator and the thresholds keep their meaning
+NEUTRAL_FACTORS = ("Sector Performance", "Analyst Ratings")
+
+
+def _history_path(symbol, directory):
+    """Path of the stored history file for a symbol"""
+    return os.path.join(directory, f"{symbol.upper()}.csv")
+
+
+def save_price_history(symbols, directory=PRICE_HISTORY_DIR, period='max'):
+    """
+    Download daily history for symbols and store it as CSV files
+    This is the only step that calls the data provider
+    """
+    provider = get_data_provider()
+    os.makedirs(directory, exist_ok=True)
+    saved = []
+
+    for symbol in symbols:
+        try:
+            hist = provider.history(symbol, period=period)
+            if hist.empty:
+                continue
+            hist.to_csv(_history_path(symbol, directory))
+            saved.append(symbol)
+        except Exception as e:
+            print(f"Error saving history for {symbol}: {str(e)}")
+
+    return saved
+
+
+def load_price_history(symbols=None, directory=PRICE_HISTORY_DIR):
+    """
+    Load stored closes into a dates x symbols DataFrame
+    If symbols is None, every CSV file in the directory is loaded
+    """
+    if symbols is None:
+        symbols = [name[:-4] for name in sorted(os.listdir(directory)) if name.endswith('.csv')]
+
+    closes = {}
+    for symbol in symbols:
+        path = _history_path(symbol, directory)
+        if not os.path.exists(path):
+            continue
+        hist = pd.read_csv(path, usecols=['Date', 'Close'])
+        dates = pd.to_datetime(hist['Date'], utc=True).dt.tz_localize(None).dt.normalize()
+        closes[symbol.upper()] = pd.Series(hist['Close'].values, index=dates)
+
+    if not closes:
+        return pd.DataFrame()
+
+    frame = pd.DataFrame(closes).sort_index()
+    return frame[~frame.index.duplicated(keep='last')]
+
+
+def compute_factor_scores(closes, market, window=BACKTEST_WINDOW, news_sentiment=0.5):
+    """
+    Compute the overall factor score for every (date, symbol)
+    Averages the same five factors as a live analysis without a recent
+    earnings report: market trend, volatility and news sentiment by the
+    live rules, and NEUTRAL_FACTORS at 0 so the replay is deterministic
+    """
+    market = market.reindex(closes.index)
+    returns = closes.pct_change(fill_method=None)
+    market_returns = market.pct_change(fill_method=None)
+
+    volatility = returns.rolling(window, min_periods=window).std() * np.sqrt(TRADING_DAYS)
+    correlation = returns.rolling(window, min_periods=window).corr(market_returns)
+
+    impacts = np.stack([
+        market_trend_impact(correlation.to_numpy()),
+        volatility_impact(volatility.to_numpy()),
+        np.broadcast_to(news_sentiment_impact(news_sentiment), closes.shape)
+    ] + [np.zeros(closes.shape)] * len(NEUTRAL_FACTORS))
+    scores = impacts.mean(axis=0)
+
+    return pd.DataFrame(scores, index=closes.index, columns=closes.columns)
+
+
+def run_backtest(closes, market, window=BACKTEST_WINDOW, horizon=BACKTEST_HORIZON,
+                 buy_threshold=BUY_THRESHOLD, sell_threshold=SELL_THRESHOLD,
+                 hold_band=BACKTEST_HOLD_BAND, news_sentiment=0.5):
+    """
+    Replay recommendations over history and measure how they played out
+    A BUY is a hit when the forward return over the horizon is positive,
+    a SELL when it is negative and a HOLD when it stays within hold_band
+    """
+    started = time.perf_counter()
+
+    scores = compute_factor_scores(closes, market, window, news_sentiment).to_numpy()
+    prices = closes.to_numpy(dtype=float)
+
+    # Forward returns over the horizon
+    forward = np.full_like(prices, np.nan)
+    if horizon < len(prices):
+        forward[:-horizon] = prices[horizon:] / prices[:-horizon] - 1
+
+    valid = ~np.isnan(scores) & ~np.isnan(forward)
+    recommendation, _ = score_recommendation(np.where(valid, scores, 0.0), buy_threshold, sell_threshold)
+
+    hits = np.select(
+        [recommendation == "BUY", recommendation == "SELL"],
+        [forward > 0, forward < 0],
+        default=np.abs(forward) <= hold_band
+    )
+    position = np.select([recommendation == "BUY", recommendation == "SELL"], [1.0, -1.0], default=0.0)
+    strategy = position * forward
+
+    summary = {}
+    for label in RECOMMENDATIONS:
+        mask = valid & (recommendation == label)
+        count = int(mask.sum())
+        summary[label] = {
+            "count": count,
+            "hitRate": round(float(hits[mask].mean()), 4) if count else None,
+            "meanReturn": round(float(forward[mask].mean()), 4) if count else None,
+            "medianReturn": round(float(np.median(forward[mask])), 4) if count else None
+        }
+
+    per_symbol = {}
+    for i, symbol in enumerate(closes.columns):
+        mask = valid[:, i]
+        count = int(mask.sum())
+        if not count:
+            continue
+        per_symbol[symbol] = {
+            "count": count,
+            "hitRate": round(float(hits[mask, i].mean()), 4),
+            "strategyReturn": round(float(strategy[mask, i].mean()), 4)
+        }
+
+    symbol_days = int(valid.sum())
+    elapsed = time.perf_counter() - started
+
+    return {
+        "symbols": list(closes.columns),
+        "start": closes.index[0].strftime('%Y-%m-%d') if len(closes) else None,
+        "end": closes.index[-1].strftime('%Y-%m-%d') if len(closes) else None,
+        "parameters": {
+            "window": window,
+            "horizon": horizon,
+            "buyThreshold": buy_threshold,
+            "sellThreshold": sell_threshold,
+            "holdBand": hold_band,
+            "newsSentiment": news_sentiment,
+            "neutralFactors": list(NEUTRAL_FACTORS)
+        },
+        "symbolDays": symbol_days,
+        "hitRate": round(float(hits[valid].mean()), 4) if symbol_days else None,
+        "strategyReturn": round(float(strategy[valid].mean()), 4) if symbol_days else None,
+        "recommendations": summary,
+        "bySymbol": per_symbol,
+        "elapsedSeconds": round(elapsed, 4),
+        "symbolDaysPerSecond": round(symbol_days / elapsed) if elapsed > 0 else None
+    }
+
+
+def backtest_from_store(symbols=None, directory=PRICE_HISTORY_DIR, **kwargs):
+    """Run a backtest on the price history stored on disk"""
+    closes = load_price_history(symbols, directory)
+    benchmark = load_price_history([BENCHMARK_SYMBOL], directory)
+
+    if benchmark.empty:
+        raise ValueError(f"No stored history for benchmark {BENCHMARK_SYMBOL} in {directory}")
+
+    closes = closes.drop(columns=[BENCHMARK_SYMBOL.upper()], errors='ignore')
+    if closes.empty:
+        raise ValueError(f"No stored history for the requested symbols in {directory}")
+
+    market = benchmark[BENCHMARK_SYMBOL.upper()]
+    return run_backtest(closes, market, **kwargs)
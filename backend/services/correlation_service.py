@@ -0,0 +1,277 @@
+"""
+Correlation matrix and hierarchical clustering for a symbol universe
+Returns of every symbol are aligned into one matrix and correlated in a
+single pass. The window is cached per (universe, window) with running sums
+and cross products, so new bars update it in O(N^2) instead of a full
+recomputation
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    CORRELATION_REFRESH_SECONDS,
+    CORRELATION_RECOMPUTE_BARS,
+    UPSTREAM_FETCH_WORKERS
+)
+from services.price_cache import get_series
+from utils.cache import TTLCache
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Periods to load for a window, by the trading days they roughly span
+HISTORY_PERIODS = (('6mo', 126), ('1y', 252), ('2y', 504), ('5y', 1260), ('max', None))
+# Recent bars loaded to extend a cached window
+UPDATE_PERIOD = '1mo'
+
+# Windows are rebuilt daily so excluded symbols get another chance
+_windows = TTLCache(maxsize=64, ttl=24 * 60 * 60, name='correlation')
+_build_locks = {}
+_build_locks_lock = threading.Lock()
+
+
+def _history_period(window):
+    """Shortest period with comfortably more than window + 1 sessions"""
+    for period, sessions in HISTORY_PERIODS:
+        if sessions is None or sessions > window + 5:
+            return period
+
+
+def load_closes(symbols, period, errors=None):
+    """
+    Daily closes of symbols aligned on session date, fetched in parallel
+    A symbol that fails to load gets an empty column, and its error is
+    recorded in the errors dict if one is given
+    """
+    def fetch(symbol):
+        try:
+            series = get_series(symbol, period)
+        except Exception as e:
+            print(f"Error fetching history for {symbol}: {str(e)}")
+            if errors is not None:
+                errors[symbol] = str(e)
+            return pd.Series(dtype=float)
+        return pd.Series(series.close.astype(float), index=series.dates)
+
+    with ThreadPoolExecutor(max_workers=max(min(UPSTREAM_FETCH_WORKERS, len(symbols)), 1)) as executor:
+        closes = dict(zip(symbols, executor.map(fetch, symbols)))
+    return pd.DataFrame(closes, columns=symbols).sort_index()
+
+
+def correlation_from_sums(sums, cross, count):
+    """Pearson correlation matrix from column sums and X^T X of count rows"""
+    mean = sums / count
+    cov = (cross - count * np.outer(mean, mean)) / (count - 1)
+    std = np.sqrt(np.clip(np.diag(cov), 0, None))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.outer(std, std)
+    # Constant series correlate with nothing
+    corr = np.nan_to_num(np.clip(corr, -1.0, 1.0))
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+class CorrelationWindow:
+    """
+    Last `window` daily returns of a universe, with running column sums and
+    cross products. Symbols without a close on every session of the window
+    are excluded; those whose history failed to load are listed in failed
+    too and retried on the next update
+    """
+
+    def __init__(self, symbols, window):
+        self.window = window
+        self.lock = threading.Lock()
+        self._build(symbols)
+
+    def _build(self, symbols):
+        errors = {}
+        closes = load_closes(symbols, _history_period(self.window), errors).ffill().iloc[-(self.window + 1):]
+        complete = closes.notna().all().to_numpy() & (len(closes) == self.window + 1)
+
+        self.universe = symbols
+        self.failed = [symbol for symbol in symbols if symbol in errors]
+        self.symbols = [symbol for symbol, keep in zip(symbols, complete) if keep]
+        self.excluded = [symbol for symbol, keep in zip(symbols, complete) if not keep]
+        closes = closes[self.symbols]
+
+        prices = closes.to_numpy()
+        self.returns = prices[1:] / prices[:-1] - 1
+        self.dates = closes.index[1:]
+        # Last two closes, to re-price the latest bar if it changes
+        self.tail = prices[-2:]
+        self._recompute()
+        self.checked_at = time.monotonic()
+
+    def _recompute(self):
+        self.sums = self.returns.sum(axis=0)
+        self.cross = self.returns.T @ self.returns
+        self.updates = 0
+
+    def update(self):
+        """
+        Fold in bars newer than the window. The latest bar is re-priced as
+        it may have been partial; rebuilds when the gap is too long to bridge
+        or some symbols failed to load last time
+        """
+        self.checked_at = time.monotonic()
+        if self.failed:
+            self._build(self.universe)
+            return
+        if not self.symbols:
+            return
+
+        recent = load_closes(self.symbols, UPDATE_PERIOD)
+        recent = recent[recent.index >= self.dates[-1]]
+        if recent.empty:
+            return
+        if recent.index[0] != self.dates[-1]:
+            self._build(self.universe)
+            return
+
+        # Symbols missing from the update keep their cached latest close
+        latest = recent.to_numpy()
+        latest[0] = np.where(np.isnan(latest[0]), self.tail[1], latest[0])
+        prices = pd.DataFrame(np.vstack([self.tail[:1], latest])).ffill().to_numpy()
+        added = prices[1:] / prices[:-1] - 1
+        if len(added) > self.window:
+            self._build(self.universe)
+            return
+
+        # Rows leaving the window: the old latest bar and the oldest ones
+        returns = np.vstack([self.returns[:-1], added])
+        removed = np.vstack([returns[:len(returns) - self.window], self.returns[-1:]])
+
+        self.sums += added.sum(axis=0) - removed.sum(axis=0)
+        self.cross += added.T @ added - removed.T @ removed
+        self.returns = returns[-self.window:]
+        self.dates = self.dates[:-1].append(recent.index)[-self.window:]
+        self.tail = prices[-2:]
+
+        # Bound floating point drift of the running sums
+        self.updates += len(added) - 1
+        if self.updates >= CORRELATION_RECOMPUTE_BARS:
+            self._recompute()
+
+    def correlation(self):
+        return correlation_from_sums(self.sums, self.cross, len(self.returns))
+
+
+def hierarchical_clusters(corr):
+    """
+    Average-linkage agglomerative clustering on the distance
+    sqrt((1 - corr) / 2). Returns the linkage in SciPy's layout, rows of
+    (cluster a, cluster b, distance, size) with merged clusters numbered
+    from n, and the leaf order of the dendrogram
+    """
+    n = len(corr)
+    distance = np.sqrt(np.clip((1 - corr) / 2, 0, None))
+    np.fill_diagonal(distance, np.inf)
+    sizes = np.ones(n)
+    labels = np.arange(n)
+    linkage = []
+
+    for step in range(n - 1):
+        i, j = sorted(divmod(int(np.argmin(distance)), n))
+        linkage.append([int(labels[i]), int(labels[j]), float(distance[i, j]), int(sizes[i] + sizes[j])])
+
+        # Lance-Williams update for average linkage; slot i holds the merge
+        merged = (sizes[i] * distance[i] + sizes[j] * distance[j]) / (sizes[i] + sizes[j])
+        distance[i, :] = merged
+        distance[:, i] = merged
+        distance[i, i] = np.inf
+        distance[j, :] = np.inf
+        distance[:, j] = np.inf
+        sizes[i] += sizes[j]
+        labels[i] = n + step
+
+    order = []
+    stack = [2 * n - 2] if n > 1 else [0] * n
+    while stack:
+        node = stack.pop()
+        if node < n:
+            order.append(node)
+        else:
+            left, right = linkage[node - n][:2]
+            stack.extend((right, left))
+
+    return linkage, order
+
+
+def cut_clusters(linkage, n, threshold):
+    """Flat clusters of the merges at or below a distance threshold, as lists of leaves"""
+    members = {leaf: [leaf] for leaf in range(n)}
+    for step, (a, b, distance, _) in enumerate(linkage):
+        if distance > threshold:
+            break
+        members[n + step] = members.pop(a) + members.pop(b)
+    return sorted(members.values(), key=len, reverse=True)
+
+
+def _window(symbols, window):
+    """Cached correlation window of a universe, built or extended as needed"""
+    key = (tuple(symbols), window)
+    state = _windows.get(key)
+
+    if state is None:
+        with _build_locks_lock:
+            lock = _build_locks.setdefault(key, threading.Lock())
+        with lock:
+            state = _windows.get(key)
+            if state is None:
+                state = CorrelationWindow(list(symbols), window)
+                _windows.set(key, state)
+        with _build_locks_lock:
+            _build_locks.pop(key, None)
+        return state
+
+    if time.monotonic() - state.checked_at >= CORRELATION_REFRESH_SECONDS and state.lock.acquire(blocking=False):
+        try:
+            state.update()
+        except Exception as e:
+            # Serve the window we have; the next request tries again
+            print(f"Error updating correlation window: {str(e)}")
+        finally:
+            state.lock.release()
+    return state
+
+
+def get_correlation(symbols, window, threshold):
+    """
+    Correlation matrix of a universe with its hierarchical clusters
+    Clusters group symbols whose average linkage distance, sqrt((1 - corr) / 2),
+    stays within threshold
+    """
+    symbols = sorted(set(symbols))
+    state = _window(symbols, window)
+
+    with state.lock:
+        corr = state.correlation()
+        included = list(state.symbols)
+        excluded = list(state.excluded)
+        failed = list(state.failed)
+        as_of = state.dates[-1].date().isoformat() if len(state.dates) else None
+
+    linkage, order = hierarchical_clusters(corr)
+    clusters = []
+    for leaves in cut_clusters(linkage, len(included), threshold):
+        block = corr[np.ix_(leaves, leaves)]
+        pairs = len(leaves) * (len(leaves) - 1)
+        clusters.append({
+            "symbols": [included[leaf] for leaf in leaves],
+            "averageCorrelation": round(float((block.sum() - len(leaves)) / pairs), 4) if pairs else 1.0
+        })
+
+    return {
+        "symbols": included,
+        "matrix": np.round(corr, 4).tolist(),
+        "order": order,
+        "linkage": linkage,
+        "clusters": clusters,
+        "window": window,
+        "asOf": as_of,
+        "excluded": excluded,
+        "failed": failed
+    }
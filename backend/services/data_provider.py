@@ -0,0 +1,562 @@
+"""
+Market data providers
+Every upstream call (yfinance and NewsAPI) goes through a provider so the
+API can run against live services or replay recorded fixture files
+
+Fixture layout, relative to REPLAY_FIXTURES_DIR:
+    history/<SYMBOL>_<interval>.csv   full recorded history per interval
+    info/<SYMBOL>.json                yfinance info dict
+    earnings/<SYMBOL>.csv             earnings dates
+    news/<query>.json                 NewsAPI articles
+"""
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+from config import (
+    DATA_PROVIDER,
+    REPLAY_FIXTURES_DIR,
+    NEWS_API_KEY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+    PRICE_INTERVALS,
+    INTERVAL_FETCH_LIMITS,
+    MARKET_OPEN,
+    MARKET_CLOSE
+)
+from utils.lazy import lazy_import
+from utils.metrics import track_upstream
+from utils.resilience import CircuitBreaker
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+requests = lazy_import('requests')
+
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+
+# pd.DateOffset arguments used to slice recorded histories by period
+PERIOD_OFFSETS = {
+    '1d': {'days': 1},
+    '5d': {'days': 5},
+    '1mo': {'months': 1},
+    '3mo': {'months': 3},
+    '6mo': {'months': 6},
+    '1y': {'years': 1},
+    '2y': {'years': 2},
+    '5y': {'years': 5},
+    'max': None
+}
+
+
+class FixtureNotFoundError(LookupError):
+    """Raised when the replay provider has no recording for a request"""
+
+
+class DataProvider:
+    """Interface shared by the live and replay providers"""
+
+    name = None
+    # Whether calls go over the network and need a circuit breaker
+    remote = False
+
+    def history(self, symbol, period='1mo', interval='1d', start=None, end=None):
+        """OHLCV history as a DataFrame indexed by timestamp"""
+        raise NotImplementedError
+
+    def clock(self, symbol, interval='1d'):
+        """
+        Current time for lookback windows over the bars of a symbol, as a
+        naive UTC datetime. Recorded data answers with its last bar
+        """
+        return datetime.utcnow()
+
+    def info(self, symbol):
+        """Company information dict"""
+        raise NotImplementedError
+
+    def earnings_dates(self, symbol):
+        """Earnings dates as a DataFrame indexed by date, newest first"""
+        raise NotImplementedError
+
+    def search(self, query, limit=10):
+        """Symbols matching a query as a list of {'symbol', 'name'}"""
+        raise NotImplementedError
+
+    def has_news(self):
+        """Whether news requests can be served"""
+        raise NotImplementedError
+
+    def news(self, query, days=7, count=5):
+        """Recent news articles about a query, in NewsAPI format"""
+        raise NotImplementedError
+
+
+class LiveDataProvider(DataProvider):
+    """Provider backed by yfinance and NewsAPI"""
+
+    name = 'live'
+    remote = True
+
+    def history(self, symbol, period='1mo', interval='1d', start=None, end=None):
+        import yfinance as yf
+
+        if start is not None:
+            return yf.Ticker(symbol).history(interval=interval, start=start, end=end)
+        return yf.Ticker(symbol).history(period=period, interval=interval)
+
+    def info(self, symbol):
+        import yfinance as yf
+
+        return yf.Ticker(symbol).info
+
+    def earnings_dates(self, symbol):
+        import yfinance as yf
+
+        return yf.Ticker(symbol).earnings_dates
+
+    def search(self, query, limit=10):
+        import yfinance as yf
+
+        # This is a simplified implementation
+        # In a real app, you'd use a more sophisticated search
+        tickers = yf.Tickers(' '.join([query, f"{query}.*"])).tickers
+        if isinstance(tickers, dict):
+            tickers = tickers.values()
+        results = []
+
+        for ticker in tickers:
+            try:
+                info = ticker.info
+                if 'symbol' in info and 'shortName' in info:
+                    results.append({
+                        'symbol': info['symbol'],
+                        'name': info['shortName']
+                    })
+                    if len(results) >= limit:
+                        break
+            except:
+                pass
+
+        return results
+
+    def has_news(self):
+        return bool(NEWS_API_KEY)
+
+    def news(self, query, days=7, count=5):
+        to_date = datetime.now()
+        from_date = to_date - timedelta(days=days)
+
+        params = {
+            'q': query,
+            'from': from_date.strftime('%Y-%m-%d'),
+            'to': to_date.strftime('%Y-%m-%d'),
+            'language': 'en',
+            'sortBy': 'publishedAt',
+            'apiKey': NEWS_API_KEY,
+            'pageSize': count
+        }
+
+        data = requests.get(NEWS_API_URL, params=params).json()
+        if data.get('status') != 'ok':
+            raise RuntimeError(data.get('message', 'NewsAPI request failed'))
+        return data.get('articles', [])
+
+
+def _utc(timestamp):
+    """Timestamp in UTC, treating naive values as UTC"""
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_localize('UTC') if timestamp.tz is None else timestamp
+
+
+def slice_period(frame, period):
+    """
+    Last period of a history frame
+    Periods are relative to the last bar so replays are deterministic
+    """
+    offset = PERIOD_OFFSETS.get(period)
+    if offset is None or frame.empty:
+        return frame
+    return frame[frame.index > frame.index[-1] - pd.DateOffset(**offset)]
+
+
+def _minutes(clock):
+    """Minutes after midnight of an 'HH:MM' time"""
+    hour, minute = clock.split(':')
+    return int(hour) * 60 + int(minute)
+
+
+def _fixture_name(text):
+    """File name safe version of a symbol or query"""
+    return re.sub(r'[^A-Za-z0-9^.=-]+', '_', text).strip('_') or '_'
+
+
+class ReplayDataProvider(DataProvider):
+    """Provider reading recorded fixture files, without network access"""
+
+    name = 'replay'
+
+    def __init__(self, directory=REPLAY_FIXTURES_DIR):
+        self.directory = directory
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _path(self, kind, key, extension):
+        return os.path.join(self.directory, kind, f"{_fixture_name(key)}.{extension}")
+
+    def _read_frame(self, kind, key):
+        """Read a recorded CSV once and keep it in memory"""
+        path = self._path(kind, key, 'csv')
+        with self._lock:
+            frame = self._frames.get(path)
+        if frame is None:
+            if not os.path.exists(path):
+                raise FixtureNotFoundError(f"No {kind} recording for {key}")
+            frame = pd.read_csv(path, index_col=0)
+            frame.index = pd.to_datetime(frame.index, utc=True)
+            with self._lock:
+                self._frames[path] = frame
+        return frame
+
+    def _read_json(self, kind, key):
+        path = self._path(kind, key, 'json')
+        if not os.path.exists(path):
+            raise FixtureNotFoundError(f"No {kind} recording for {key}")
+        with open(path) as f:
+            return json.load(f)
+
+    def history(self, symbol, period='1mo', interval='1d', start=None, end=None):
+        frame = self._read_frame('history', f"{symbol.upper()}_{interval}")
+
+        if start is not None:
+            frame = frame[frame.index >= _utc(start)]
+            return frame[frame.index < _utc(end)] if end is not None else frame
+        return slice_period(frame, period)
+
+    def clock(self, symbol, interval='1d'):
+        # Coarser bars can be resampled from finer recordings, so any
+        # recording of the symbol tells where its data ends, finest first
+        for name in [interval] + [name for name in PRICE_INTERVALS if name != interval]:
+            try:
+                frame = self._read_frame('history', f"{symbol.upper()}_{name}")
+            except FixtureNotFoundError:
+                continue
+            if not frame.empty:
+                return frame.index[-1].tz_convert('UTC').tz_localize(None).to_pydatetime()
+        return super().clock(symbol, interval)
+
+    def info(self, symbol):
+        return self._read_json('info', symbol.upper())
+
+    def earnings_dates(self, symbol):
+        return self._read_frame('earnings', symbol.upper())
+
+    def search(self, query, limit=10):
+        info_dir = os.path.join(self.directory, 'info')
+        if not os.path.isdir(info_dir):
+            return []
+
+        query = query.lower()
+        results = []
+        for name in sorted(os.listdir(info_dir)):
+            if not name.endswith('.json'):
+                continue
+            info = self.info(name[:-5])
+            symbol = info.get('symbol', name[:-5])
+            short_name = info.get('shortName', symbol)
+            if query in symbol.lower() or query in short_name.lower():
+                results.append({'symbol': symbol, 'name': short_name})
+                if len(results) >= limit:
+                    break
+        return results
+
+    def has_news(self):
+        return os.path.isdir(os.path.join(self.directory, 'news'))
+
+    def news(self, query, days=7, count=5):
+        # A query that wasn't recorded had no news
+        try:
+            return self._read_json('news', query)[:count]
+        except FixtureNotFoundError:
+            return []
+
+
+class SyntheticDataProvider(DataProvider):
+    """
+    Provider generating deterministic random-walk data per symbol
+    Used to benchmark and load-test the API without fixtures or network
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, days=10000, end='2024-06-28'):
+        self.days = days
+        self.end = pd.Timestamp(end, tz='America/New_York')
+        # Session calendar shared by every symbol, built on first use
+        self._sessions = None
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _seed(self, symbol):
+        return sum(ord(char) * 31 ** i for i, char in enumerate(symbol.upper())) % (2 ** 32)
+
+    def _frame(self, symbol):
+        symbol = symbol.upper()
+        with self._lock:
+            frame = self._frames.get(symbol)
+        if frame is None:
+            rng = np.random.default_rng(self._seed(symbol))
+            if self._sessions is None:
+                self._sessions = pd.bdate_range(end=self.end, periods=self.days, name='Date')
+            index = self._sessions
+            close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, self.days)))
+            spread = np.abs(rng.normal(0, 0.01, self.days)) * close
+            frame = pd.DataFrame({
+                'Open': close * (1 + rng.normal(0, 0.005, self.days)),
+                'High': close + spread,
+                'Low': close - spread,
+                'Close': close,
+                'Volume': rng.integers(1000000, 50000000, self.days)
+            }, index=index)
+            with self._lock:
+                self._frames[symbol] = frame
+        return frame
+
+    def _intraday(self, symbol, interval, sessions):
+        """
+        Intraday bars of some daily sessions. Each session is a walk of
+        one-minute prices from the day's open to its close, seeded by symbol
+        and day, so every interval aggregates the same minutes
+        """
+        opening, closing = (_minutes(MARKET_OPEN), _minutes(MARKET_CLOSE))
+        length = closing - opening
+        steps = np.empty((len(sessions), length))
+        weights = np.empty((len(sessions), length))
+        for row, day in enumerate(sessions.index):
+            rng = np.random.default_rng([self._seed(symbol), day.toordinal()])
+            steps[row] = rng.normal(0, 0.001, length)
+            weights[row] = rng.random(length)
+
+        # Brownian bridge from the log open to the log close
+        walk = np.cumsum(steps, axis=1)
+        elapsed = np.arange(1, length + 1) / length
+        first = np.log(sessions['Open'].to_numpy())[:, None]
+        last = np.log(sessions['Close'].to_numpy())[:, None]
+        closes = np.exp(first + walk - elapsed * walk[:, -1:] + elapsed * (last - first))
+        opens = np.concatenate([np.exp(first), closes[:, :-1]], axis=1).ravel()
+        closes = closes.ravel()
+        volumes = np.floor(
+            sessions['Volume'].to_numpy()[:, None] * weights / weights.sum(axis=1, keepdims=True)
+        ).astype(np.int64).ravel()
+
+        # Bars start at the open and every interval after it; the last one of a session may be shorter
+        minutes = PRICE_INTERVALS[interval]
+        offsets = np.arange(0, length, minutes)
+        starts = (np.arange(len(sessions))[:, None] * length + offsets).ravel()
+        ends = np.append(starts[1:], len(closes)) - 1
+        index = (
+            np.repeat(sessions.index + pd.Timedelta(minutes=opening), len(offsets))
+            + pd.to_timedelta(np.tile(offsets, len(sessions)), unit='min')
+        )
+        return pd.DataFrame({
+            'Open': opens[starts],
+            'High': np.maximum.reduceat(np.maximum(opens, closes), starts),
+            'Low': np.minimum.reduceat(np.minimum(opens, closes), starts),
+            'Close': closes[ends],
+            'Volume': np.add.reduceat(volumes, starts)
+        }, index=pd.DatetimeIndex(index, name='Datetime'))
+
+    def history(self, symbol, period='1mo', interval='1d', start=None, end=None):
+        frame = self._frame(symbol)
+        intraday = interval in INTERVAL_FETCH_LIMITS
+        if intraday:
+            # Like yfinance, intraday bars only reach so far back
+            frame = frame[frame.index > frame.index[-1] - INTERVAL_FETCH_LIMITS[interval]]
+
+        if start is not None:
+            if intraday:
+                sessions = frame.index
+                frame = self._intraday(symbol, interval, frame[
+                    (sessions >= _utc(start).tz_convert(sessions.tz).normalize())
+                    & (sessions <= (_utc(end).tz_convert(sessions.tz) if end is not None else sessions[-1]))
+                ])
+            frame = frame[frame.index >= _utc(start)]
+            return frame[frame.index < _utc(end)] if end is not None else frame
+
+        frame = slice_period(frame, period)
+        return self._intraday(symbol, interval, frame) if intraday else frame
+
+    def clock(self, symbol, interval='1d'):
+        # End of the last generated session
+        close = self.end.normalize() + pd.Timedelta(minutes=_minutes(MARKET_CLOSE))
+        return close.tz_convert('UTC').tz_localize(None).to_pydatetime()
+
+    def info(self, symbol):
+        rng = np.random.default_rng(self._seed(symbol))
+        close = float(self._frame(symbol)['Close'].iloc[-1])
+        return {
+            'symbol': symbol.upper(),
+            'shortName': f"{symbol.upper()} Synthetic Inc.",
+            'sector': 'Technology',
+            'industry': 'Software',
+            'marketCap': int(close * rng.integers(10 ** 7, 10 ** 10)),
+            'trailingPE': round(float(rng.uniform(5, 60)), 2),
+            'dividendYield': round(float(rng.uniform(0, 0.05)), 4),
+            'fiftyTwoWeekHigh': round(close * 1.2, 2),
+            'fiftyTwoWeekLow': round(close * 0.8, 2),
+            'averageVolume': int(rng.integers(1000000, 50000000)),
+            'beta': round(float(rng.uniform(0.5, 2.0)), 2)
+        }
+
+    def earnings_dates(self, symbol):
+        index = pd.date_range(end=self.end, periods=8, freq='91D', name='Earnings Date')[::-1]
+        return pd.DataFrame({'EPS Estimate': 1.0, 'Reported EPS': 1.1}, index=index)
+
+    def search(self, query, limit=10):
+        return [{'symbol': query.upper(), 'name': f"{query.upper()} Synthetic Inc."}][:limit]
+
+    def has_news(self):
+        return True
+
+    def news(self, query, days=7, count=5):
+        return [
+            {
+                'title': f"{query} shares rise on strong growth",
+                'description': 'Analysts expect gains to continue despite a weak quarter.',
+                'source': {'name': 'Synthetic Wire'},
+                'url': '#',
+                'publishedAt': self.end.isoformat()
+            }
+            for _ in range(count)
+        ]
+
+
+class RecordingDataProvider(LiveDataProvider):
+    """Live provider that writes every response as a replay fixture"""
+
+    name = 'record'
+
+    def __init__(self, directory=REPLAY_FIXTURES_DIR):
+        self.directory = directory
+
+    def _path(self, kind, key, extension):
+        os.makedirs(os.path.join(self.directory, kind), exist_ok=True)
+        return os.path.join(self.directory, kind, f"{_fixture_name(key)}.{extension}")
+
+    def _record_frame(self, kind, key, frame):
+        """Merge a frame into its recording"""
+        path = self._path(kind, key, 'csv')
+        if os.path.exists(path):
+            recorded = pd.read_csv(path, index_col=0)
+            recorded.index = pd.to_datetime(recorded.index, utc=True)
+            frame = frame.copy()
+            frame.index = pd.to_datetime(frame.index, utc=True)
+            frame = pd.concat([recorded, frame])
+            frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+        frame.to_csv(path)
+
+    def history(self, symbol, period='1mo', interval='1d', start=None, end=None):
+        # Daily bars are recorded in full so any period can be replayed
+        full = interval == '1d' and start is None
+        hist = super().history(symbol, 'max' if full else period, interval, start, end)
+        if not hist.empty:
+            self._record_frame('history', f"{symbol.upper()}_{interval}", hist)
+        return slice_period(hist, period) if full else hist
+
+    def info(self, symbol):
+        info = super().info(symbol)
+        with open(self._path('info', symbol.upper(), 'json'), 'w') as f:
+            json.dump(info, f, default=str)
+        return info
+
+    def earnings_dates(self, symbol):
+        earnings = super().earnings_dates(symbol)
+        if earnings is not None and not earnings.empty:
+            self._record_frame('earnings', symbol.upper(), earnings)
+        return earnings
+
+    def news(self, query, days=7, count=5):
+        articles = super().news(query, days, count)
+        with open(self._path('news', query, 'json'), 'w') as f:
+            json.dump(articles, f)
+        return articles
+
+
+# One breaker per upstream, shared by every provider instance
+breakers = {
+    upstream: CircuitBreaker(upstream, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+    for upstream in ('yfinance', 'newsapi')
+}
+
+
+class InstrumentedDataProvider:
+    """
+    Wraps a provider so every call is timed and counted in /metrics
+    Calls of remote providers go through the upstream's circuit breaker
+    """
+
+    OPERATIONS = ('history', 'info', 'earnings_dates', 'search', 'news')
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.name = provider.name
+        self.remote = provider.remote
+
+    def __getattr__(self, attr):
+        value = getattr(self.provider, attr)
+        if attr not in self.OPERATIONS:
+            return value
+
+        upstream = 'newsapi' if attr == 'news' else 'yfinance'
+
+        if not self.remote:
+            def call(*args, **kwargs):
+                with track_upstream(upstream, attr, self.name):
+                    return value(*args, **kwargs)
+            return call
+
+        breaker = breakers[upstream]
+
+        def call(*args, **kwargs):
+            # Fail fast without counting an upstream call while the circuit is open
+            breaker.before_call()
+            try:
+                with track_upstream(upstream, attr, self.name):
+                    result = value(*args, **kwargs)
+            except Exception:
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            return result
+        return call
+
+
+PROVIDERS = {
+    'live': LiveDataProvider,
+    'replay': ReplayDataProvider,
+    'synthetic': SyntheticDataProvider,
+    'record': RecordingDataProvider
+}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_data_provider():
+    """The provider selected by DATA_PROVIDER in config.py"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                if DATA_PROVIDER not in PROVIDERS:
+                    raise ValueError(f"Unknown data provider: {DATA_PROVIDER}")
+                _provider = InstrumentedDataProvider(PROVIDERS[DATA_PROVIDER]())
+    return _provider
+
+
+def set_data_provider(provider):
+    """Replace the active provider, e.g. to benchmark against stubs"""
+    global _provider
+    with _provider_lock:
+        _provider = InstrumentedDataProvider(provider)
@@ -0,0 +1,39 @@
+"""
+Company details per symbol
+Details change rarely, so the last good copy is served (marked stale)
+while it refreshes or while the upstream is down
+"""
+from config import STALE_MAX_AGE_SECONDS
+from services.data_provider import get_data_provider
+from utils.resilience import StaleCache
+
+_details_cache = StaleCache('stock_details', fresh_ttl=60 * 60, stale_ttl=STALE_MAX_AGE_SECONDS, maxsize=4096)
+
+
+def load_details(symbol):
+    """Company details for a symbol"""
+    info = get_data_provider().info(symbol)
+    
+    # Format data
+    return {
+        'symbol': symbol,
+        'name': info.get('shortName', symbol),
+        'logo': info.get('logo_url', ''),
+        'sector': info.get('sector', ''),
+        'industry': info.get('industry', ''),
+        'description': info.get('longBusinessSummary', ''),
+        'website': info.get('website', ''),
+        'market_cap': info.get('marketCap', 0),
+        'pe_ratio': info.get('trailingPE', 0),
+        'dividend_yield': info.get('dividendYield', 0) * 100 if info.get('dividendYield') else 0,
+        'fifty_two_week_high': info.get('fiftyTwoWeekHigh', 0),
+        'fifty_two_week_low': info.get('fiftyTwoWeekLow', 0),
+        'average_volume': info.get('averageVolume', 0),
+        'beta': info.get('beta', 0)
+    }
+
+
+def get_details(symbol):
+    """Cached details of a symbol as (details, age), age None when fresh"""
+    symbol = symbol.upper()
+    return _details_cache.get(symbol, lambda: load_details(symbol))
@@ -0,0 +1,263 @@
+"""
+Earnings calendar store and event study
+Earnings dates of tracked symbols are fetched by the scheduler and kept
+in earnings_events; the price reaction to every stored event is computed
+for all symbols in one vectorized pass, so the causal analysis reads a
+precomputed impact instead of asking the provider on every request
+"""
+import threading
+from datetime import datetime
+
+from config import (
+    BENCHMARK_SYMBOL,
+    EARNINGS_REFRESH_SECONDS,
+    EARNINGS_WINDOW,
+    EARNINGS_STUDY_PERIOD
+)
+from database import db
+from models.models import EarningsEvent, EarningsCoverage
+from services.data_provider import get_data_provider
+from services.price_cache import get_history
+from services.scheduler import get_scheduler, trigger
+from services.universe import tracked_symbols
+from utils.cache import TTLCache
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Reports at or after this hour (exchange time) move the next session
+AFTER_CLOSE_HOUR = 16
+
+# Latest past event per symbol as computed by event_study, or False when
+# the symbol has no past event inside the loaded history
+_impacts = TTLCache(maxsize=4096, ttl=EARNINGS_REFRESH_SECONDS or None, name='earnings_impact')
+
+# Symbols asked for by requests, refreshed by the scheduler
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _to_utc(index):
+    """Naive UTC timestamps of a DatetimeIndex"""
+    return index.tz_convert('UTC').tz_localize(None) if index.tz is not None else index
+
+
+def _optional(value):
+    return None if pd.isna(value) else float(value)
+
+
+def refresh_calendar(symbols, max_age=EARNINGS_REFRESH_SECONDS):
+    """
+    Fetch the earnings calendar of every symbol not fetched within max_age
+    seconds, replacing its stored events. Returns the refreshed symbols
+    """
+    provider = get_data_provider()
+    now = datetime.utcnow()
+    fetched = {
+        coverage.symbol: coverage.fetched_at
+        for coverage in EarningsCoverage.query.filter(EarningsCoverage.symbol.in_(list(symbols)))
+    }
+
+    refreshed = []
+    for symbol in symbols:
+        fetched_at = fetched.get(symbol)
+        if fetched_at is not None and (now - fetched_at).total_seconds() < max_age:
+            continue
+
+        try:
+            earnings = provider.earnings_dates(symbol)
+        except Exception as e:
+            print(f"Error fetching earnings dates for {symbol}: {str(e)}")
+            continue
+
+        events = []
+        if earnings is not None and not earnings.empty:
+            columns = earnings.columns
+            for date, row in zip(_to_utc(earnings.index), earnings.itertuples(index=False)):
+                row = dict(zip(columns, row))
+                events.append({
+                    'symbol': symbol,
+                    'date': date.to_pydatetime(),
+                    'eps_estimate': _optional(row.get('EPS Estimate')),
+                    'reported_eps': _optional(row.get('Reported EPS')),
+                    'surprise_pct': _optional(row.get('Surprise(%)'))
+                })
+            # The calendar can list a date twice (e.g. a revised time)
+            events = list({event['date']: event for event in events}.values())
+
+        try:
+            EarningsEvent.query.filter_by(symbol=symbol).delete(synchronize_session=False)
+            if events:
+                db.session.bulk_insert_mappings(EarningsEvent, events)
+            db.session.merge(EarningsCoverage(symbol=symbol, fetched_at=now))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error storing earnings dates for {symbol}: {str(e)}")
+            continue
+
+        _impacts.pop(symbol)
+        refreshed.append(symbol)
+
+    return refreshed
+
+
+def load_events(symbols):
+    """Stored events of symbols as (symbols, dates) arrays, dates in UTC"""
+    rows = db.session.query(EarningsEvent.symbol, EarningsEvent.date).filter(
+        EarningsEvent.symbol.in_(list(symbols))
+    ).all()
+    return (
+        np.array([row[0] for row in rows], dtype=object),
+        pd.DatetimeIndex([row[1] for row in rows])
+    )
+
+
+def event_study(closes, market, event_symbols, event_dates, window=EARNINGS_WINDOW):
+    """
+    Price reaction to many earnings events at once
+    closes is a frame of daily closes (one column per symbol) and market
+    the benchmark closes, both indexed by session date. For each event the
+    reaction session is the first session on or after its date, or the
+    next one for reports after the close. pre_return covers `pre` sessions
+    up to the last close before the report, post_return the close before
+    the report to `post` sessions later (fewer for a recent report), and
+    abnormal_return is post_return in excess of the benchmark.
+    Events with too little history, or not yet reported, are dropped
+    """
+    pre, post = window
+    sessions = closes.index
+    prices = closes.to_numpy(dtype=float)
+    benchmark = market.reindex(sessions).ffill().to_numpy(dtype=float)
+    last = len(sessions) - 1
+
+    # Reports from the close onwards move the next session
+    eastern = pd.DatetimeIndex(event_dates).tz_localize('UTC').tz_convert('America/New_York')
+    reaction_dates = eastern.tz_localize(None).normalize() + pd.to_timedelta(
+        (eastern.hour >= AFTER_CLOSE_HOUR).astype(int), unit='D'
+    )
+
+    columns = closes.columns.get_indexer(event_symbols)
+    reaction = sessions.searchsorted(reaction_dates)
+    base = reaction - 1
+    start = base - pre
+    valid = (columns >= 0) & (start >= 0) & (reaction <= last)
+
+    columns, reaction, base, start = columns[valid], reaction[valid], base[valid], start[valid]
+    end = np.minimum(reaction + post - 1, last)
+
+    base_price = prices[base, columns]
+    pre_return = base_price / prices[start, columns] - 1
+    post_return = prices[end, columns] / base_price - 1
+    market_return = benchmark[end] / benchmark[base] - 1
+
+    study = pd.DataFrame({
+        'symbol': np.asarray(event_symbols)[valid],
+        'date': reaction_dates[valid],
+        'pre_return': pre_return,
+        'post_return': post_return,
+        'market_return': market_return,
+        'abnormal_return': post_return - market_return,
+        'sessions': end - base,
+        'days_since': (sessions[last] - sessions[reaction]).days
+    })
+    return study.dropna(subset=['pre_return', 'post_return'])
+
+
+def _closes(histories):
+    """Daily closes of several symbols aligned on session date"""
+    return pd.DataFrame({
+        symbol: pd.Series(hist['Close'].to_numpy(), index=_to_utc(hist.index).normalize())
+        for symbol, hist in histories.items()
+        if not hist.empty
+    }).sort_index().ffill()
+
+
+def _latest(study, symbols):
+    """Latest event per symbol from an event study, False where there is none"""
+    latest = {symbol: False for symbol in symbols}
+    for row in study.sort_values('date').groupby('symbol').tail(1).itertuples(index=False):
+        latest[row.symbol] = {
+            'date': row.date.date().isoformat(),
+            'pre_return': float(row.pre_return),
+            'post_return': float(row.post_return),
+            'market_return': float(row.market_return),
+            'abnormal_return': float(row.abnormal_return),
+            'days_since': int(row.days_since)
+        }
+    return latest
+
+
+def compute_impacts(symbols, period=EARNINGS_STUDY_PERIOD):
+    """Run the event study for symbols with a stored calendar and cache the results"""
+    event_symbols, event_dates = load_events(symbols)
+    symbols = sorted(set(event_symbols))
+    if not symbols:
+        return {}
+
+    histories = {}
+    for symbol in symbols + [BENCHMARK_SYMBOL]:
+        try:
+            histories[symbol] = get_history(symbol, period)
+        except Exception as e:
+            print(f"Error fetching history for {symbol}: {str(e)}")
+    if BENCHMARK_SYMBOL not in histories:
+        return {}
+
+    closes = _closes(histories)
+    study = event_study(closes.drop(columns=[BENCHMARK_SYMBOL]), closes[BENCHMARK_SYMBOL], event_symbols, event_dates)
+    latest = _latest(study, symbols)
+    for symbol, impact in latest.items():
+        _impacts.set(symbol, impact)
+    return latest
+
+
+def get_earnings_impact(symbol, hist, market_hist):
+    """
+    Reaction to the latest past earnings report of a symbol, or None
+    Served from the background event study; on a miss it is computed from
+    the stored calendar and the given histories. A symbol without a stored
+    calendar is queued for the scheduler and None is returned
+    """
+    impact = _impacts.get(symbol)
+    if impact is not None:
+        return impact or None
+
+    event_symbols, event_dates = load_events([symbol])
+    if not len(event_symbols):
+        covered = db.session.get(EarningsCoverage, symbol) is not None
+        if not covered:
+            request_refresh(symbol)
+        return None
+
+    closes = _closes({symbol: hist, BENCHMARK_SYMBOL: market_hist})
+    study = event_study(closes[[symbol]], closes[BENCHMARK_SYMBOL], event_symbols, event_dates)
+    impact = _latest(study, [symbol])[symbol]
+    _impacts.set(symbol, impact)
+    return impact or None
+
+
+def request_refresh(symbol):
+    """Queue a symbol for the scheduler's next earnings pass"""
+    if get_scheduler() is None:
+        return
+    with _pending_lock:
+        _pending.add(symbol)
+    trigger('earnings_requested')
+
+
+def refresh_earnings(symbols=None):
+    """Refresh calendars and impacts of symbols, by default the tracked universe"""
+    symbols = tracked_symbols() if symbols is None else symbols
+    refresh_calendar(symbols)
+    compute_impacts(symbols)
+
+
+def refresh_requested():
+    """Refresh the symbols queued by requests"""
+    with _pending_lock:
+        pending = sorted(_pending)
+        _pending.clear()
+    if pending:
+        refresh_earnings(pending)
@@ -0,0 +1,373 @@
+"""
+Technical indicators computed incrementally
+Each indicator keeps a small NumPy state so appending a bar is O(1);
+the full history is only replayed once per symbol, the first time it is seen
+"""
+import copy
+import math
+import threading
+
+from config import BENCHMARK_SYMBOL
+from services.price_cache import get_series
+from utils.cache import TTLCache
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+# Approximate trading days per period, used to slice the output
+PERIOD_DAYS = {
+    '1mo': 21,
+    '3mo': 63,
+    '6mo': 126,
+    '1y': 252,
+    '2y': 504,
+    '5y': 1260,
+    'max': None
+}
+
+# Indicator state per symbol, seeded from the full history
+_indicator_cache = TTLCache(maxsize=500, ttl=24 * 60 * 60, name='indicators')
+_market_cache = TTLCache(maxsize=4, ttl=24 * 60 * 60, name='indicator_market')
+_symbol_locks = {}
+_locks_guard = threading.Lock()
+
+NAN = float('nan')
+
+
+class RollingWindow:
+    """Fixed-size ring buffer keeping a running sum and sum of squares"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = np.zeros(size)
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value):
+        i = self.count % self.size
+        if self.count >= self.size:
+            old = self.values[i]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values[i] = value
+        self.total += value
+        self.total_sq += value * value
+        self.count += 1
+
+    @property
+    def full(self):
+        return self.count >= self.size
+
+    def mean(self):
+        return self.total / self.size
+
+    def std(self):
+        mean = self.mean()
+        return math.sqrt(max(self.total_sq / self.size - mean * mean, 0.0))
+
+
+class SMA:
+    """Simple moving average"""
+
+    def __init__(self, period):
+        self.window = RollingWindow(period)
+
+    def update(self, value):
+        self.window.push(value)
+        return self.window.mean() if self.window.full else NAN
+
+
+class EMA:
+    """Exponential moving average, seeded with the SMA of the first bars"""
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.seed = SMA(period)
+        self.value = NAN
+
+    def update(self, value):
+        if math.isnan(self.value):
+            self.value = self.seed.update(value)
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class RSI:
+    """Relative strength index with Wilder smoothing"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.previous = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, close):
+        if self.previous is None:
+            self.previous = close
+            return NAN
+
+        change = close - self.previous
+        self.previous = close
+        gain = max(change, 0.0)
+        loss = max(-change, 0.0)
+        self.count += 1
+
+        if self.count <= self.period:
+            # Plain average over the first period
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.count < self.period:
+                return NAN
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        if self.avg_loss == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+
+class MACD:
+    """Moving average convergence divergence"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def update(self, close):
+        fast = self.fast.update(close)
+        slow = self.slow.update(close)
+        if math.isnan(slow):
+            return NAN, NAN, NAN
+
+        macd = fast - slow
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+
+class BollingerBands:
+    """Bollinger bands around a simple moving average"""
+
+    def __init__(self, period=20, width=2.0):
+        self.window = RollingWindow(period)
+        self.width = width
+
+    def update(self, close):
+        self.window.push(close)
+        if not self.window.full:
+            return NAN, NAN, NAN
+
+        middle = self.window.mean()
+        band = self.width * self.window.std()
+        return middle - band, middle, middle + band
+
+
+class RollingBeta:
+    """Rolling beta of daily returns against the market"""
+
+    def __init__(self, period=60):
+        self.period = period
+        self.x = RollingWindow(period)
+        self.y = RollingWindow(period)
+        self.xy = RollingWindow(period)
+        self.previous = None
+
+    def update(self, close, market_close):
+        if market_close is None or math.isnan(market_close):
+            return NAN
+
+        if self.previous is None:
+            self.previous = (close, market_close)
+            return NAN
+
+        stock_return = close / self.previous[0] - 1
+        market_return = market_close / self.previous[1] - 1
+        self.previous = (close, market_close)
+
+        self.x.push(market_return)
+        self.y.push(stock_return)
+        self.xy.push(market_return * stock_return)
+        if not self.x.full:
+            return NAN
+
+        n = self.period
+        covariance = self.xy.total / n - (self.x.total / n) * (self.y.total / n)
+        variance = self.x.total_sq / n - (self.x.total / n) ** 2
+        return covariance / variance if variance > 0 else NAN
+
+
+class ATR:
+    """Average true range with Wilder smoothing"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.previous_close = None
+        self.count = 0
+        self.value = 0.0
+
+    def update(self, high, low, close):
+        if self.previous_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.previous_close), abs(low - self.previous_close))
+        self.previous_close = close
+        self.count += 1
+
+        if self.count <= self.period:
+            self.value += true_range / self.period
+            return self.value if self.count == self.period else NAN
+
+        self.value = (self.value * (self.period - 1) + true_range) / self.period
+        return self.value
+
+
+class IndicatorSet:
+    """All indicators for one symbol, with their output series"""
+
+    COLUMNS = (
+        'sma_20', 'sma_50', 'ema_12', 'ema_26', 'rsi_14',
+        'macd', 'macd_signal', 'macd_histogram',
+        'bollinger_lower', 'bollinger_middle', 'bollinger_upper',
+        'beta_60', 'atr_14'
+    )
+
+    def __init__(self):
+        self.sma_20 = SMA(20)
+        self.sma_50 = SMA(50)
+        self.ema_12 = EMA(12)
+        self.ema_26 = EMA(26)
+        self.rsi = RSI(14)
+        self.macd = MACD(12, 26, 9)
+        self.bollinger = BollingerBands(20, 2.0)
+        self.beta = RollingBeta(60)
+        self.atr = ATR(14)
+        self.last_date = None
+        self.dates = []
+        self.outputs = {column: [] for column in self.COLUMNS}
+
+    def _step(self, high, low, close, market_close):
+        """Advance every indicator by one bar and return the values"""
+        macd, signal, histogram = self.macd.update(close)
+        lower, middle, upper = self.bollinger.update(close)
+        return (
+            self.sma_20.update(close),
+            self.sma_50.update(close),
+            self.ema_12.update(close),
+            self.ema_26.update(close),
+            self.rsi.update(close),
+            macd, signal, histogram,
+            lower, middle, upper,
+            self.beta.update(close, market_close),
+            self.atr.update(high, low, close)
+        )
+
+    def append(self, date, high, low, close, market_close=None):
+        """Append a completed bar"""
+        values = self._step(high, low, close, market_close)
+        self.dates.append(date)
+        for column, value in zip(self.COLUMNS, values):
+            self.outputs[column].append(value)
+        self.last_date = date
+
+    def preview(self, high, low, close, market_close=None):
+        """Indicator values for a provisional bar, without changing the state"""
+        return copy.deepcopy(self._state())._step(high, low, close, market_close)
+
+    def _state(self):
+        """Shallow view of the indicator state without the output series"""
+        state = copy.copy(self)
+        state.dates = None
+        state.outputs = None
+        return state
+
+
+def _bars(series):
+    """Convert a PriceSeries into (date, high, low, close) tuples"""
+    return list(zip(series.dates.strftime('%Y-%m-%d'), series.high.astype(float).tolist(),
+                    series.low.astype(float).tolist(), series.close.astype(float).tolist()))
+
+
+def refresh_market_closes(period):
+    """Reload the benchmark closes of a period into the cache"""
+    series = get_series(BENCHMARK_SYMBOL, period)
+    closes = dict(zip(series.dates.strftime('%Y-%m-%d'), series.close.astype(float).tolist()))
+    _market_cache.set(period, closes, ttl=15 * 60)
+    return closes
+
+
+def _market_closes(period):
+    """Benchmark closes by date"""
+    closes = _market_cache.get(period)
+    if closes is None:
+        closes = refresh_market_closes(period)
+    return closes
+
+
+def _clean(value):
+    """Round for JSON and turn NaN into None"""
+    return None if math.isnan(value) else round(float(value), 4)
+
+
+def _symbol_lock(symbol):
+    """Lock serializing updates of one symbol's indicator state"""
+    with _locks_guard:
+        return _symbol_locks.setdefault(symbol, threading.Lock())
+
+
+def get_indicators(symbol, period='1y'):
+    """
+    Get indicator series for a symbol
+    The first call replays the full history; later calls only fetch recent
+    bars and append the ones newer than the stored state
+    """
+    symbol = symbol.upper()
+
+    with _symbol_lock(symbol):
+        indicators = _indicator_cache.get(symbol)
+        bars = []
+
+        if indicators is not None:
+            series = get_series(symbol, '1mo')
+            market = _market_closes('1mo')
+            bars = [bar for bar in _bars(series) if bar[0] > indicators.last_date]
+            if len(bars) == len(series):
+                # The stored state is too old to continue from, start over
+                indicators = None
+
+        if indicators is None:
+            market = _market_closes('max')
+            bars = _bars(get_series(symbol, 'max'))
+            if not bars:
+                raise ValueError(f"No price history for {symbol}")
+            indicators = IndicatorSet()
+
+        # The newest bar may still be trading, so it is only previewed
+        latest = bars[-1] if bars else None
+        for date, high, low, close in bars[:-1]:
+            indicators.append(date, high, low, close, market.get(date))
+        _indicator_cache.set(symbol, indicators)
+
+        total = len(indicators.dates) + (1 if latest else 0)
+        days = PERIOD_DAYS.get(period, PERIOD_DAYS['1y'])
+        start = max(total - days, 0) if days else 0
+
+        dates = indicators.dates[start:]
+        columns = {column: values[start:] for column, values in indicators.outputs.items()}
+        if latest is not None:
+            date, high, low, close = latest
+            dates.append(date)
+            for column, value in zip(IndicatorSet.COLUMNS, indicators.preview(high, low, close, market.get(date))):
+                columns[column].append(value)
+
+    return {
+        'symbol': symbol,
+        'period': period,
+        'dates': dates,
+        'indicators': {column: [_clean(value) for value in values]
+                       for column, values in columns.items()}
+    }
@@ -0,0 +1,246 @@
+"""
+Background jobs for long-running analyses
+Routes enqueue work and return a job id straight away; a small thread pool
+runs the jobs with bounded concurrency, and every state change is written
+to the jobs table so any server process can answer polls and streams
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import update, delete
+
+from config import JOB_WORKERS, JOB_QUEUE_LIMIT, JOB_RETENTION_DAYS
+from database import db
+from models.models import Job
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Seconds between progress writes, so chatty jobs don't flood the database
+PROGRESS_INTERVAL = 0.5
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when too many jobs are already queued in this process"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job whose cancellation was requested"""
+
+
+class JobKind:
+    """A registered job: validate(params) normalizes parameters at enqueue"""
+
+    def __init__(self, handler, validate=None):
+        self.handler = handler
+        self.validate = validate
+
+
+_kinds = {}
+_app = None
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(JOB_QUEUE_LIMIT)
+
+
+def register_job(kind, validate=None):
+    """
+    Register a job handler, called as handler(params, progress) where
+    progress(fraction, message=None) reports how far along the job is
+    """
+    def decorator(handler):
+        _kinds[kind] = JobKind(handler, validate)
+        return handler
+    return decorator
+
+
+def job_kinds():
+    return sorted(_kinds)
+
+
+def _utcnow():
+    return datetime.utcnow()
+
+
+def _worker_id():
+    """host:pid of this process, recorded on the jobs it runs"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _get_pool():
+    """Thread pool, started on first use so each forked server worker gets its own"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+    return _pool
+
+
+class JobProgress:
+    """Progress callback handed to a running job"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.reported_at = 0.0
+
+    def __call__(self, fraction, message=None):
+        now = time.monotonic()
+        if now - self.reported_at < PROGRESS_INTERVAL and fraction < 1:
+            return
+        self.reported_at = now
+
+        values = {'progress': round(min(max(float(fraction), 0.0), 1.0), 4)}
+        if message is not None:
+            values['message'] = message[:255]
+
+        # A job cancelled meanwhile is no longer running
+        updated = db.session.execute(
+            update(Job).where(Job.id == self.job_id, Job.status == RUNNING).values(**values)
+        ).rowcount
+        db.session.commit()
+        if not updated:
+            raise JobCancelled()
+
+
+def _finish(job_id, status, **values):
+    db.session.execute(
+        update(Job).where(Job.id == job_id, Job.status == RUNNING)
+        .values(status=status, finished_at=_utcnow(), **values)
+    )
+    db.session.commit()
+
+
+def _run(job_id):
+    try:
+        with _app.app_context():
+            try:
+                claimed = db.session.execute(
+                    update(Job).where(Job.id == job_id, Job.status == QUEUED)
+                    .values(status=RUNNING, started_at=_utcnow(), worker=_worker_id())
+                ).rowcount
+                db.session.commit()
+                if not claimed:
+                    return
+
+                job = db.session.get(Job, job_id)
+                result = _kinds[job.kind].handler(dict(job.params or {}), JobProgress(job_id))
+                _finish(job_id, SUCCEEDED, progress=1.0, result=result)
+            except JobCancelled:
+                db.session.rollback()
+            except Exception as e:
+                print(f"Job {job_id} failed: {str(e)}")
+                db.session.rollback()
+                _finish(job_id, FAILED, error=str(e))
+            finally:
+                db.session.remove()
+    finally:
+        _slots.release()
+
+
+def enqueue(kind, params, user_id):
+    """
+    Record a job and queue it in this process
+    Raises KeyError for an unknown kind, ValueError for invalid params and
+    JobQueueFullError when JOB_QUEUE_LIMIT jobs are already waiting
+    """
+    job_kind = _kinds[kind]
+    params = job_kind.validate(params or {}) if job_kind.validate else (params or {})
+
+    if not _slots.acquire(blocking=False):
+        raise JobQueueFullError('Too many jobs in progress, try again later')
+
+    try:
+        pool = _get_pool()
+        job = Job(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            kind=kind,
+            params=params,
+            status=QUEUED,
+            progress=0.0,
+            worker=_worker_id(),
+            created_at=_utcnow()
+        )
+        db.session.add(job)
+        db.session.commit()
+        pool.submit(_run, job.id)
+    except Exception:
+        db.session.rollback()
+        _slots.release()
+        raise
+
+    return job
+
+
+def cancel(job):
+    """Cancel a queued or running job; a running job stops at its next progress report"""
+    cancelled = db.session.execute(
+        update(Job).where(Job.id == job.id, Job.status.in_(ACTIVE_STATUSES))
+        .values(status=CANCELLED, finished_at=_utcnow())
+    ).rowcount
+    db.session.commit()
+    return bool(cancelled)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def fail_orphaned_jobs():
+    """
+    Fail active jobs whose process on this host has exited. Called before
+    this process runs any job, so jobs under its own (reused) pid are
+    orphans too
+    """
+    host = socket.gethostname()
+    orphaned = []
+    for job in Job.query.filter(Job.status.in_(ACTIVE_STATUSES), Job.worker.like(f"{host}:%")):
+        pid = job.worker.rsplit(':', 1)[1]
+        if pid.isdigit() and (int(pid) == os.getpid() or not _alive(int(pid))):
+            orphaned.append(job.id)
+
+    if orphaned:
+        db.session.execute(
+            update(Job).where(Job.id.in_(orphaned), Job.status.in_(ACTIVE_STATUSES))
+            .values(status=FAILED, error='Interrupted by a server restart', finished_at=_utcnow())
+        )
+    db.session.commit()
+    return len(orphaned)
+
+
+def prune_jobs(retention_days=JOB_RETENTION_DAYS):
+    """Delete finished jobs older than retention_days"""
+    pruned = db.session.execute(
+        delete(Job).where(
+            Job.status.notin_(ACTIVE_STATUSES),
+            Job.finished_at < _utcnow() - timedelta(days=retention_days)
+        )
+    ).rowcount
+    db.session.commit()
+    return pruned
+
+
+def init_jobs(app):
+    """Remember the app for job threads and fail jobs lost in a restart"""
+    global _app
+    first = _app is None
+    _app = app
+
+    if first:
+        with app.app_context():
+            fail_orphaned_jobs()
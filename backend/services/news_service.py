@@ -1,58 +1,40 @@
-import requests
 import os
 import json
 from datetime import datetime, timedelta
 import random
 
-# News API key (optional)
-# You can get a free API key from https://newsapi.org/
-NEWS_API_KEY = os.environ.get('NEWS_API_KEY', '')
+from config import MOCK_FALLBACK
+from services.data_provider import get_data_provider
+
+def _format_articles(articles):
+    """Format NewsAPI articles for the frontend"""
+    formatted_articles = []
+    for i, article in enumerate(articles):
+        formatted_articles.append({
+            'id': i,
+            'title': article.get('title', ''),
+            'source': (article.get('source') or {}).get('name', ''),
+            'url': article.get('url', ''),
+            'publishedAt': article.get('publishedAt', ''),
+            'summary': article.get('description', '')
+        })
+    return formatted_articles
 
 def get_stock_news(symbol, count=5):
     """
     Get news articles for a stock
-    If NEWS_API_KEY is provided, uses NewsAPI
-    Otherwise, falls back to mock data
+    If the data provider serves news (live with NEWS_API_KEY, or replay),
+    uses it; otherwise falls back to mock data
     """
-    if NEWS_API_KEY:
+    provider = get_data_provider()
+    if provider.has_news():
         try:
-            # Calculate date for last 7 days
-            to_date = datetime.now()
-            from_date = to_date - timedelta(days=7)
-            
-            # Format dates for API
-            from_str = from_date.strftime('%Y-%m-%d')
-            to_str = to_date.strftime('%Y-%m-%d')
-            
-            # Make API request
-            url = f"https://newsapi.org/v2/everything"
-            params = {
-                'q': f"{symbol} OR {get_company_name(symbol)}",
-                'from': from_str,
-                'to': to_str,
-                'language': 'en',
-                'sortBy': 'publishedAt',
-                'apiKey': NEWS_API_KEY,
-                'pageSize': count
-            }
+            # Articles from the last 7 days
+            articles = provider.news(f"{symbol} OR {get_company_name(symbol)}", days=7, count=count)
             
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            if data.get('status') == 'ok' and data.get('articles'):
-                articles = data['articles']
-                
+            if articles:
                 # Format articles
-                formatted_articles = []
-                for i, article in enumerate(articles):
-                    formatted_articles.append({
-                        'id': i,
-                        'title': article.get('title', ''),
-                        'source': article.get('source', {}).get('name', ''),
-                        'url': article.get('url', ''),
-                        'publishedAt': article.get('publishedAt', ''),
-                        'summary': article.get('description', '')
-                    })
+                formatted_articles = _format_articles(articles)
                 
                 # Calculate simple sentiment (for demo purposes)
                 sentiment = calculate_sentiment(formatted_articles)
@@ -64,6 +46,8 @@ def get_stock_news(symbol, count=5):
         
         except Exception as e:
             print(f"Error fetching news: {str(e)}")
+            if not MOCK_FALLBACK:
+                raise
             # Fall back to mock data
     
     # Mock data if API call fails or no key provided
@@ -71,50 +55,23 @@ def get_stock_news(symbol, count=5):
 
 def get_market_news(count=5):
     """Get general market news"""
-    if NEWS_API_KEY:
+    provider = get_data_provider()
+    if provider.has_news():
         try:
-            # Calculate date for last 3 days
-            to_date = datetime.now()
-            from_date = to_date - timedelta(days=3)
-            
-            # Format dates for API
-            from_str = from_date.strftime('%Y-%m-%d')
-            to_str = to_date.strftime('%Y-%m-%d')
-            
-            # Make API request
-            url = f"https://newsapi.org/v2/everything"
-            params = {
-                'q': 'stock market OR investing OR "wall street" OR "financial markets"',
-                'from': from_str,
-                'to': to_str,
-                'language': 'en',
-                'sortBy': 'publishedAt',
-                'apiKey': NEWS_API_KEY,
-                'pageSize': count
-            }
-            
-            response = requests.get(url, params=params)
-            data = response.json()
+            # Articles from the last 3 days
+            articles = provider.news(
+                'stock market OR investing OR "wall street" OR "financial markets"',
+                days=3,
+                count=count
+            )
             
-            if data.get('status') == 'ok' and data.get('articles'):
-                articles = data['articles']
-                
-                # Format articles
-                formatted_articles = []
-                for i, article in enumerate(articles):
-                    formatted_articles.append({
-                        'id': i,
-                        'title': article.get('title', ''),
-                        'source': article.get('source', {}).get('name', ''),
-                        'url': article.get('url', ''),
-                        'publishedAt': article.get('publishedAt', ''),
-                        'summary': article.get('description', '')
-                    })
-                
-                return formatted_articles
+            if articles:
+                return _format_articles(articles)
         
         except Exception as e:
             print(f"Error fetching market news: {str(e)}")
+            if not MOCK_FALLBACK:
+                raise
             # Fall back to mock data
     
     # Mock data if API call fails or no key provided
@@ -122,50 +79,23 @@ def get_market_news(count=5):
 
 def get_sector_news(sector, count=5):
     """Get news for a specific sector"""
-    if NEWS_API_KEY:
+    provider = get_data_provider()
+    if provider.has_news():
         try:
-            # Calculate date for last 5 days
-            to_date = datetime.now()
-            from_date = to_date - timedelta(days=5)
-            
-            # Format dates for API
-            from_str = from_date.strftime('%Y-%m-%d')
-            to_str = to_date.strftime('%Y-%m-%d')
-            
-            # Make API request
-            url = f"https://newsapi.org/v2/everything"
-            params = {
-                'q': f"{sector} sector OR {sector} stocks OR {sector} industry",
-                'from': from_str,
-                'to': to_str,
-                'language': 'en',
-                'sortBy': 'publishedAt',
-                'apiKey': NEWS_API_KEY,
-                'pageSize': count
-            }
+            # Articles from the last 5 days
+            articles = provider.news(
+                f"{sector} sector OR {sector} stocks OR {sector} industry",
+                days=5,
+                count=count
+            )
             
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            if data.get('status') == 'ok' and data.get('articles'):
-                articles = data['articles']
-                
-                # Format articles
-                formatted_articles = []
-                for i, article in enumerate(articles):
-                    formatted_articles.append({
-                        'id': i,
-                        'title': article.get('title', ''),
-                        'source': article.get('source', {}).get('name', ''),
-                        'url': article.get('url', ''),
-                        'publishedAt': article.get('publishedAt', ''),
-                        'summary': article.get('description', '')
-                    })
-                
-                return formatted_articles
+            if articles:
+                return _format_articles(articles)
         
         except Exception as e:
             print(f"Error fetching sector news: {str(e)}")
+            if not MOCK_FALLBACK:
+                raise
             # Fall back to mock data
     
     # Mock data if API call fails or no key provided
@@ -0,0 +1,113 @@
+"""
+Full-text search over saved analyses
+On SQLite an FTS5 table mirrors symbol, name and notes of saved_analyses
+and is kept in sync by triggers; other databases fall back to a LIKE scan
+"""
+import re
+from sqlalchemy import text, or_
+
+from database import db
+from models.models import SavedAnalysis
+
+FTS_TABLE = 'saved_analyses_fts'
+
+FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        symbol, name, notes,
+        content='saved_analyses', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS saved_analyses_fts_insert AFTER INSERT ON saved_analyses BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, symbol, name, notes) VALUES (new.id, new.symbol, new.name, new.notes);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS saved_analyses_fts_delete AFTER DELETE ON saved_analyses BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, symbol, name, notes) VALUES ('delete', old.id, old.symbol, old.name, old.notes);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS saved_analyses_fts_update AFTER UPDATE OF symbol, name, notes ON saved_analyses BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, symbol, name, notes) VALUES ('delete', old.id, old.symbol, old.name, old.notes);
+        INSERT INTO {FTS_TABLE}(rowid, symbol, name, notes) VALUES (new.id, new.symbol, new.name, new.notes);
+    END
+    """
+]
+
+# Column weights for ranking: symbol, name, notes
+BM25_WEIGHTS = (5.0, 2.0, 1.0)
+
+_fts_enabled = False
+
+
+def init_note_search(app):
+    """Create the FTS5 table and triggers, indexing existing rows once"""
+    global _fts_enabled
+
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            return
+
+        with db.engine.begin() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': FTS_TABLE}
+            ).first()
+            for statement in FTS_SCHEMA:
+                connection.execute(text(statement))
+            if not exists:
+                connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+    _fts_enabled = True
+
+
+def fts_query(query):
+    """
+    Turn user input into an FTS5 query: every word must match, as a prefix
+    Words are quoted so punctuation cannot form FTS5 syntax
+    """
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_notes(user_id, query, limit, offset=0):
+    """
+    A user's analyses matching query, best match first
+    Returns a list of (analysis, snippet) pairs
+    """
+    if _fts_enabled:
+        match = fts_query(query)
+        if not match:
+            return []
+
+        rows = db.session.execute(
+            text(
+                f"SELECT {FTS_TABLE}.rowid, snippet({FTS_TABLE}, 2, '<mark>', '</mark>', '...', 16) "
+                f"FROM {FTS_TABLE} JOIN saved_analyses ON saved_analyses.id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH :match AND saved_analyses.user_id = :user_id "
+                f"ORDER BY bm25({FTS_TABLE}, {', '.join(str(weight) for weight in BM25_WEIGHTS)}) "
+                "LIMIT :limit OFFSET :offset"
+            ),
+            {'match': match, 'user_id': user_id, 'limit': limit, 'offset': offset}
+        ).all()
+
+        analyses = {
+            analysis.id: analysis
+            for analysis in SavedAnalysis.query.filter(SavedAnalysis.id.in_([row[0] for row in rows]))
+        }
+        return [(analyses[analysis_id], snippet) for analysis_id, snippet in rows if analysis_id in analyses]
+
+    # Without FTS5, match every word anywhere and rank by recency
+    analyses = SavedAnalysis.query.filter_by(user_id=user_id)
+    for term in re.findall(r'\w+', query):
+        pattern = f"%{term}%"
+        analyses = analyses.filter(or_(
+            SavedAnalysis.symbol.ilike(pattern),
+            SavedAnalysis.name.ilike(pattern),
+            SavedAnalysis.notes.ilike(pattern)
+        ))
+    analyses = analyses.order_by(SavedAnalysis.timestamp.desc(), SavedAnalysis.id.desc())
+    return [(analysis, None) for analysis in analyses.limit(limit).offset(offset)]
@@ -0,0 +1,70 @@
+"""
+Daily price history cache
+One PriceSeries per symbol covers the longest period asked for so far;
+shorter periods are sliced from it without copying. Once the series is
+PRICE_CACHE_REFRESH_SECONDS old only the last month is fetched again and
+merged in, so the latest bar stays current without downloading the full
+history again
+"""
+import time
+
+from config import CACHE_ENABLED, PRICE_CACHE_SYMBOLS, PRICE_CACHE_MIN_PERIOD, PRICE_CACHE_REFRESH_SECONDS
+from services.data_provider import get_data_provider, PERIOD_OFFSETS
+from services.price_series import PriceSeries
+from utils.cache import TTLCache
+
+# Periods from shortest to longest
+PERIOD_ORDER = tuple(PERIOD_OFFSETS)
+# Recent bars fetched to bring a cached series up to date
+UPDATE_PERIOD = '1mo'
+
+# (series, period it covers, monotonic time of the last fetch) per symbol
+_series_cache = TTLCache(maxsize=PRICE_CACHE_SYMBOLS, ttl=24 * 60 * 60, name='price_series')
+
+
+def _longest(*periods):
+    return max(periods, key=PERIOD_ORDER.index)
+
+
+def _load(symbol, period):
+    return PriceSeries.from_frame(get_data_provider().history(symbol, period=period))
+
+
+def get_series(symbol, period='1y'):
+    """
+    Daily PriceSeries of symbol over period, straight from the provider
+    when CACHE_ENABLED is off. Raises ValueError for an unknown period and the provider's exception
+    when nothing is cached
+    """
+    if period not in PERIOD_OFFSETS:
+        raise ValueError(f"Unsupported period: {period}")
+
+    symbol = symbol.upper()
+    if not CACHE_ENABLED:
+        return _load(symbol, period)
+
+    entry = _series_cache.get(symbol)
+
+    if entry is None or PERIOD_ORDER.index(entry[1]) < PERIOD_ORDER.index(period):
+        covered = _longest(period, PRICE_CACHE_MIN_PERIOD, entry[1] if entry else PRICE_CACHE_MIN_PERIOD)
+        entry = (_load(symbol, covered), covered, time.monotonic())
+        _series_cache.set(symbol, entry)
+
+    elif time.monotonic() - entry[2] >= PRICE_CACHE_REFRESH_SECONDS:
+        series, covered, _ = entry
+        try:
+            recent = _load(symbol, UPDATE_PERIOD)
+            # A series too old to bridge is loaded again in full
+            series = series.merge(recent) if series.covers(recent) else _load(symbol, covered)
+            entry = (series, covered, time.monotonic())
+            _series_cache.set(symbol, entry)
+        except Exception as e:
+            # Serve the bars we have; the next call tries again
+            print(f"Error updating price history for {symbol}: {str(e)}")
+
+    return entry[0].period(period)
+
+
+def get_history(symbol, period='1y'):
+    """Daily history frame of symbol over period, built from the cached series"""
+    return get_series(symbol, period).to_frame()
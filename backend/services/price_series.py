@@ -0,0 +1,98 @@
+"""
+Compact daily price series
+A history is held as six contiguous arrays: int32 session days since the
+epoch, float32 open/high/low/close and uint64 volume, about 28 bytes per
+session against several hundred for a DataFrame. Period slices are views
+of the same buffers, so one cached full history serves every period
+float32 keeps about seven significant digits, i.e. cents below $100,000
+"""
+from services.data_provider import PERIOD_OFFSETS
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+
+
+class PriceSeries:
+    """Immutable daily OHLCV arrays of one symbol, oldest session first"""
+
+    __slots__ = ('days', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, days, open, high, low, close, volume):
+        self.days = days
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        # Slices share the cached buffers, so nobody may write to them
+        for name in self.__slots__:
+            getattr(self, name).flags.writeable = False
+
+    @classmethod
+    def from_frame(cls, hist):
+        """Series of a daily history frame, keyed by the session's local date"""
+        index = hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+        days = index.normalize().to_numpy(dtype='datetime64[D]').astype(np.int32)
+        prices = {
+            column: hist[column.capitalize()].to_numpy(dtype=np.float32)
+            for column in PRICE_COLUMNS
+        }
+        volume = hist['Volume'].fillna(0).to_numpy().astype(np.uint64)
+        return cls(days, volume=volume, **prices)
+
+    def __len__(self):
+        return len(self.days)
+
+    def __getitem__(self, index):
+        """Rows of a slice, as views"""
+        if not isinstance(index, slice):
+            raise TypeError('PriceSeries only supports slicing')
+        return PriceSeries(*(getattr(self, name)[index] for name in self.__slots__))
+
+    @property
+    def dates(self):
+        """Session dates as a naive DatetimeIndex"""
+        return pd.DatetimeIndex(self.days.astype('datetime64[D]'), name='Date')
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def period(self, period):
+        """
+        Last period of the series, like slice_period on a frame: sessions
+        after the last one minus the period's offset
+        """
+        offset = PERIOD_OFFSETS.get(period)
+        if offset is None or not len(self):
+            return self
+        last = pd.Timestamp(int(self.days[-1]), unit='D')
+        cutoff = (last - pd.DateOffset(**offset)).to_datetime64().astype('datetime64[D]').astype(np.int32)
+        return self[int(np.searchsorted(self.days, cutoff, side='right')):]
+
+    def covers(self, other):
+        """Whether other starts inside this series, so merging leaves no gap"""
+        return not len(self) or not len(other) or other.days[0] <= self.days[-1]
+
+    def merge(self, newer):
+        """New series with the sessions of newer replacing and extending ours"""
+        if not len(newer):
+            return self
+        keep = int(np.searchsorted(self.days, newer.days[0]))
+        return PriceSeries(*(
+            np.concatenate([getattr(self, name)[:keep], getattr(newer, name)])
+            for name in self.__slots__
+        ))
+
+    def to_frame(self):
+        """History frame in the provider's layout, with float64 prices"""
+        return pd.DataFrame({
+            'Open': self.open.astype(float),
+            'High': self.high.astype(float),
+            'Low': self.low.astype(float),
+            'Close': self.close.astype(float),
+            'Volume': self.volume.astype(np.int64)
+        }, index=self.dates)
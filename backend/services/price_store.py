@@ -0,0 +1,240 @@
+"""
+Tiered local store for intraday price bars
+Bars are kept at the finest interval that was fetched; coarser intervals
+are resampled locally and old intraday bars are retired to daily aggregates
+"""
+from datetime import datetime, timedelta
+
+from config import (
+    PRICE_INTERVALS,
+    INTERVAL_FETCH_LIMITS,
+    INTRADAY_RETENTION,
+    INTRADAY_REFRESH_SECONDS,
+    MARKET_TIMEZONE,
+    MARKET_OPEN
+)
+from database import db
+from models.models import PriceBar, PriceCoverage
+from services.data_provider import get_data_provider
+from utils.lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+INTRADAY_INTERVALS = ('1m', '5m', '15m', '1h')
+
+# Calendar lookback per period; 1d and 5d are trimmed to trading sessions
+PERIOD_LOOKBACK = {
+    '1d': timedelta(days=5),
+    '5d': timedelta(days=10),
+    '1mo': timedelta(days=31),
+    '3mo': timedelta(days=92),
+    '6mo': timedelta(days=183),
+    '1y': timedelta(days=365),
+    '2y': timedelta(days=730),
+    '5y': timedelta(days=1826),
+    'max': timedelta(days=36500)
+}
+PERIOD_SESSIONS = {'1d': 1, '5d': 5}
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def _utcnow():
+    return datetime.utcnow().replace(second=0, microsecond=0)
+
+
+def resample_bars(bars, interval):
+    """
+    Aggregate a bar frame indexed by UTC timestamp into a coarser interval
+    Bins start at the session open like the exchange's own bars (09:30,
+    10:30, ... for 1h) rather than on the hour; 1d bins are exchange days
+    """
+    local = bars.tz_localize('UTC').tz_convert(MARKET_TIMEZONE)
+    if interval == '1d':
+        resampled = local.resample('1D')
+    else:
+        hour, minute = MARKET_OPEN.split(':')
+        resampled = local.resample(
+            f"{PRICE_INTERVALS[interval]}min", origin='start_day', offset=f"{hour}h{minute}min"
+        )
+    resampled = resampled.agg(AGGREGATION).dropna(subset=['Close'])
+    return resampled.tz_convert('UTC').tz_localize(None)
+
+
+def _fetch(symbol, interval, start, end):
+    """Download bars as a frame indexed by naive UTC timestamps"""
+    hist = get_data_provider().history(
+        symbol,
+        interval=interval,
+        start=pd.Timestamp(start, tz='UTC'),
+        end=pd.Timestamp(end + timedelta(minutes=1), tz='UTC')
+    )
+    if hist.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS)
+
+    index = hist.index
+    index = index.tz_convert('UTC').tz_localize(None) if index.tz is not None else index
+    frame = hist[BAR_COLUMNS].copy()
+    frame.index = index
+    return frame[(frame.index >= start) & (frame.index <= end)]
+
+
+def _store(symbol, interval, bars, start, end, replace=True):
+    """Store bars covering [start, end], replacing stored ones unless replace is False"""
+    if replace:
+        PriceBar.query.filter(
+            PriceBar.symbol == symbol,
+            PriceBar.interval == interval,
+            PriceBar.timestamp >= start,
+            PriceBar.timestamp <= end
+        ).delete(synchronize_session=False)
+
+    db.session.bulk_insert_mappings(PriceBar, [
+        {
+            'symbol': symbol,
+            'interval': interval,
+            'timestamp': timestamp.to_pydatetime(),
+            'open': float(row.Open),
+            'high': float(row.High),
+            'low': float(row.Low),
+            'close': float(row.Close),
+            'volume': int(row.Volume)
+        }
+        for timestamp, row in zip(bars.index, bars.itertuples(index=False))
+    ])
+
+    coverage = db.session.get(PriceCoverage, (symbol, interval))
+    if coverage is None:
+        db.session.add(PriceCoverage(symbol=symbol, interval=interval, start=start, end=end, fetched_at=_utcnow()))
+    else:
+        coverage.start = min(coverage.start, start)
+        coverage.end = max(coverage.end, end)
+        coverage.fetched_at = _utcnow()
+
+    db.session.commit()
+
+
+def _load(symbol, interval, start, end):
+    """Read stored bars of [start, end] into a frame"""
+    rows = db.session.query(
+        PriceBar.timestamp, PriceBar.open, PriceBar.high, PriceBar.low, PriceBar.close, PriceBar.volume
+    ).filter(
+        PriceBar.symbol == symbol,
+        PriceBar.interval == interval,
+        PriceBar.timestamp >= start,
+        PriceBar.timestamp <= end
+    ).order_by(PriceBar.timestamp).all()
+
+    frame = pd.DataFrame(rows, columns=['Timestamp'] + BAR_COLUMNS)
+    return frame.set_index(pd.DatetimeIndex(frame.pop('Timestamp')))
+
+
+def _source_interval(symbol, interval, start):
+    """Finest stored interval that can be resampled to interval and covers start"""
+    minutes = PRICE_INTERVALS[interval]
+    candidates = [name for name in INTRADAY_INTERVALS if PRICE_INTERVALS[name] <= minutes]
+
+    for name in candidates:
+        coverage = db.session.get(PriceCoverage, (symbol, name))
+        if coverage is not None and coverage.start <= start:
+            return coverage
+    return None
+
+
+def get_bars(symbol, interval, period='1d'):
+    """
+    Get bars for symbol at interval over period, indexed by UTC timestamp
+    Only the part newer than the stored coverage is downloaded
+    """
+    if interval not in INTRADAY_INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval}")
+
+    symbol = symbol.upper()
+    # Windows end at the provider's clock, so replayed data isn't filtered
+    # out by the wall clock; freshness is still judged by the wall clock
+    now = get_data_provider().clock(symbol, interval).replace(second=0, microsecond=0)
+    start = now - PERIOD_LOOKBACK.get(period, PERIOD_LOOKBACK['1d'])
+
+    # yfinance only serves recent intraday bars
+    start = max(start, now - INTERVAL_FETCH_LIMITS[interval] + timedelta(minutes=1))
+
+    coverage = _source_interval(symbol, interval, start)
+    if coverage is None:
+        source = interval
+        _store(symbol, source, _fetch(symbol, source, start, now), start, now)
+    else:
+        source = coverage.interval
+        if (_utcnow() - coverage.fetched_at).total_seconds() > INTRADAY_REFRESH_SECONDS:
+            # Re-fetch from the last stored bar, which may have been partial
+            tail_start = coverage.end - timedelta(minutes=PRICE_INTERVALS[source])
+            tail_start = max(tail_start, now - INTERVAL_FETCH_LIMITS[source] + timedelta(minutes=1))
+            _store(symbol, source, _fetch(symbol, source, tail_start, now), tail_start, now)
+
+    bars = _load(symbol, source, start, now)
+    if source != interval:
+        bars = resample_bars(bars, interval)
+
+    sessions = PERIOD_SESSIONS.get(period)
+    if sessions and not bars.empty:
+        days = bars.index.normalize().unique()[-sessions:]
+        bars = bars[bars.index.normalize().isin(days)]
+
+    return bars
+
+
+def _aggregate_daily(symbol, interval, cutoff):
+    """
+    Store daily aggregates of the bars before cutoff
+    Days already aggregated from a finer interval, which is retired
+    sooner, are kept as they are
+    """
+    coverage = db.session.get(PriceCoverage, (symbol, interval))
+    old = _load(symbol, interval, coverage.start, cutoff - timedelta(microseconds=1))
+    if old.empty:
+        return
+
+    daily = resample_bars(old, '1d')
+    first, last = daily.index[0].to_pydatetime(), daily.index[-1].to_pydatetime()
+    known = {row.timestamp for row in db.session.query(PriceBar.timestamp).filter(
+        PriceBar.symbol == symbol,
+        PriceBar.interval == '1d',
+        PriceBar.timestamp >= first,
+        PriceBar.timestamp <= last
+    )}
+    daily = daily[~daily.index.isin(list(known))]
+    if not daily.empty:
+        _store(symbol, '1d', daily, first, last, replace=False)
+
+
+def retire_intraday(now=None):
+    """
+    Aggregate intraday bars older than their retention into daily bars
+    and delete them, bounding the size of the store
+    Returns the number of intraday bars removed
+    """
+    now = now or _utcnow()
+    removed = 0
+
+    for interval in INTRADAY_INTERVALS:
+        cutoff = (now - INTRADAY_RETENTION[interval]).replace(hour=0, minute=0)
+        symbols = [row.symbol for row in PriceCoverage.query.filter(
+            PriceCoverage.interval == interval,
+            PriceCoverage.start < cutoff
+        ).all()]
+
+        for symbol in symbols:
+            _aggregate_daily(symbol, interval, cutoff)
+            removed += PriceBar.query.filter(
+                PriceBar.symbol == symbol,
+                PriceBar.interval == interval,
+                PriceBar.timestamp < cutoff
+            ).delete(synchronize_session=False)
+
+            coverage = db.session.get(PriceCoverage, (symbol, interval))
+            coverage.start = cutoff
+            if coverage.end < cutoff:
+                db.session.delete(coverage)
+            db.session.commit()
+
+    return removed
@@ -0,0 +1,197 @@
+"""
+Risk engine: covariance, VaR/CVaR and Monte Carlo price targets
+Daily returns of a symbol or portfolio are aligned into one matrix; VaR is
+computed historically, parametrically and from correlated Monte Carlo
+paths. Large simulations can be split across a process pool
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+from config import (
+    RISK_WINDOW,
+    RISK_HORIZON,
+    RISK_CONFIDENCE_LEVELS,
+    RISK_MC_PATHS,
+    RISK_TARGET_PERCENTILES,
+    RISK_WORKERS,
+    RISK_PARALLEL_MIN_PATHS
+)
+from services.analysis_service import TRADING_DAYS
+from services.correlation_service import load_closes
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+# Fixed seed so repeated requests give the same targets
+SEED = 20240628
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Process pool, started on first use so each forked server worker gets its own"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=RISK_WORKERS)
+    return _pool
+
+
+def _history_period(window):
+    return '1y' if window < 250 else '2y' if window < 500 else '5y'
+
+
+def load_returns(symbols, window=RISK_WINDOW):
+    """
+    Aligned daily returns of symbols over the last window sessions, and the
+    latest closes. Raises ValueError for symbols without enough history
+    """
+    closes = load_closes(symbols, _history_period(window)).ffill().iloc[-(window + 1):]
+    missing = [symbol for symbol in symbols if closes[symbol].isna().any()]
+    if missing or len(closes) < 2:
+        raise ValueError(f"Not enough price history for {', '.join(missing or symbols)}")
+
+    prices = closes.to_numpy(dtype=float)
+    return prices[1:] / prices[:-1] - 1, prices[-1]
+
+
+def _factor(cov):
+    """Matrix L with L @ L.T == cov, also for singular covariance"""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(cov)
+        return vectors * np.sqrt(np.clip(values, 0, None))
+
+
+def _simulate_chunk(drift, factor, horizon, paths, seed):
+    """Correlated log returns over horizon sessions, shape (paths, n)"""
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((paths, len(drift))) @ factor.T
+    return drift * horizon + shocks * np.sqrt(horizon)
+
+
+def simulate_log_returns(drift, cov, horizon, paths, seed=SEED):
+    """
+    Monte Carlo log returns over horizon sessions for correlated assets
+    drift is the daily log drift and cov the daily log return covariance.
+    Runs in the process pool when RISK_WORKERS is set and paths is large
+    """
+    drift = np.asarray(drift, dtype=float)
+    factor = _factor(np.atleast_2d(cov))
+
+    if RISK_WORKERS <= 0 or paths < RISK_PARALLEL_MIN_PATHS:
+        return _simulate_chunk(drift, factor, horizon, paths, seed)
+
+    # Independent streams per chunk keep the result reproducible
+    chunks = np.array_split(np.arange(paths), RISK_WORKERS)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    futures = [
+        _get_pool().submit(_simulate_chunk, drift, factor, horizon, len(chunk), chunk_seed)
+        for chunk, chunk_seed in zip(chunks, seeds)
+    ]
+    return np.vstack([future.result() for future in futures])
+
+
+def historical_var(returns, level):
+    """VaR and CVaR (as positive loss fractions) of a sample of returns"""
+    cutoff = np.quantile(returns, 1 - level)
+    tail = returns[returns <= cutoff]
+    return float(-cutoff), float(-tail.mean())
+
+
+def parametric_var(mean, std, level):
+    """Normal VaR and CVaR (as positive loss fractions)"""
+    normal = NormalDist()
+    z = normal.inv_cdf(1 - level)
+    return float(-(mean + z * std)), float(-(mean - std * normal.pdf(z) / (1 - level)))
+
+
+def score_drift(score, horizon=RISK_HORIZON):
+    """
+    Daily log drift of every simulated target: the median moves by
+    score * 20% over horizon sessions, like the earlier rule of thumb, and
+    not at all for a neutral score. The noisy historical mean return is
+    never extrapolated
+    """
+    return float(np.log1p(score * 0.2) / horizon)
+
+
+def price_target(closes, score=0.0, horizon=RISK_HORIZON, paths=RISK_MC_PATHS):
+    """
+    Percentiles of the simulated price after horizon sessions
+    Volatility comes from the daily log returns of closes and the drift
+    from score_drift
+    """
+    closes = np.asarray(closes, dtype=float)
+    variance = np.diff(np.log(closes)).var(ddof=1)
+    drift = score_drift(score, horizon)
+
+    simulated = simulate_log_returns([drift], [[variance]], horizon, paths)[:, 0]
+    percentiles = np.percentile(closes[-1] * np.exp(simulated), RISK_TARGET_PERCENTILES)
+    return {f"p{level}": round(float(value), 2) for level, value in zip(RISK_TARGET_PERCENTILES, percentiles)}
+
+
+def portfolio_risk(symbols, weights=None, window=RISK_WINDOW, horizon=RISK_HORIZON, paths=RISK_MC_PATHS):
+    """
+    Volatility, risk contributions, VaR/CVaR and simulated outcomes of a
+    portfolio (equal weights unless given). VaR figures are losses as
+    fractions of the portfolio value: one-day historical and parametric,
+    and over horizon sessions from the Monte Carlo paths, which also give
+    price target percentiles per symbol. Paths use the neutral score_drift,
+    so targets agree with price_target for a zero score
+    """
+    returns, last_prices = load_returns(symbols, window)
+    weights = np.full(len(symbols), 1 / len(symbols)) if weights is None else np.asarray(weights, dtype=float)
+    weights = weights / weights.sum()
+
+    cov = np.atleast_2d(np.cov(returns, rowvar=False))
+    portfolio_returns = returns @ weights
+    variance = float(weights @ cov @ weights)
+    daily_std = np.sqrt(variance)
+    contributions = weights * (cov @ weights) / variance if variance > 0 else weights
+
+    # Simulate each asset, then revalue the portfolio on every path
+    log_returns = np.log1p(returns)
+    simulated = simulate_log_returns(
+        np.full(len(symbols), score_drift(0.0, horizon)), np.atleast_2d(np.cov(log_returns, rowvar=False)),
+        horizon, paths
+    )
+    outcomes = np.exp(simulated) @ weights - 1
+
+    # Method keys carry their horizon, one day or horizon sessions
+    monte_carlo = f"monteCarlo{horizon}d"
+    var = {'historical1d': {}, 'parametric1d': {}, monte_carlo: {}}
+    cvar = {'historical1d': {}, 'parametric1d': {}, monte_carlo: {}}
+    for level in RISK_CONFIDENCE_LEVELS:
+        key = f"{level * 100:g}"
+        var['historical1d'][key], cvar['historical1d'][key] = historical_var(portfolio_returns, level)
+        var['parametric1d'][key], cvar['parametric1d'][key] = parametric_var(portfolio_returns.mean(), daily_std, level)
+        var[monte_carlo][key], cvar[monte_carlo][key] = historical_var(outcomes, level)
+
+    percentiles = np.percentile(outcomes, RISK_TARGET_PERCENTILES)
+    targets = np.percentile(last_prices * np.exp(simulated), RISK_TARGET_PERCENTILES, axis=0)
+    return {
+        "symbols": list(symbols),
+        "weights": [round(float(weight), 4) for weight in weights],
+        "window": len(returns),
+        "horizon": horizon,
+        "paths": paths,
+        "volatility": round(float(daily_std * np.sqrt(TRADING_DAYS)), 4),
+        "riskContributions": {
+            symbol: round(float(contribution), 4) for symbol, contribution in zip(symbols, contributions)
+        },
+        "var": {method: {key: round(value, 4) for key, value in levels.items()} for method, levels in var.items()},
+        "cvar": {method: {key: round(value, 4) for key, value in levels.items()} for method, levels in cvar.items()},
+        "returnPercentiles": {
+            f"p{level}": round(float(value), 4) for level, value in zip(RISK_TARGET_PERCENTILES, percentiles)
+        },
+        "lastPrices": {symbol: round(float(price), 2) for symbol, price in zip(symbols, last_prices)},
+        "priceTargets": {
+            symbol: {f"p{level}": round(float(value), 2) for level, value in zip(RISK_TARGET_PERCENTILES, targets[:, i])}
+            for i, symbol in enumerate(symbols)
+        }
+    }
@@ -0,0 +1,191 @@
+"""
+Bulk import and export of saved analyses
+Imports are written in one transaction with executemany batches; exports
+stream rows from a server-side cursor so memory stays flat
+"""
+import csv
+import io
+import json
+from sqlalchemy import select, insert, update, bindparam
+
+from config import IMPORT_MAX_ROWS
+from database import db
+from models.models import SavedAnalysis
+
+# Fields an import may set, besides the symbol
+IMPORT_FIELDS = ('name', 'recommendation', 'notes', 'factors')
+EXPORT_COLUMNS = ('id', 'symbol', 'name', 'recommendation', 'notes', 'factors', 'timestamp')
+
+# Rows fetched per round trip while exporting
+EXPORT_BATCH_SIZE = 500
+# Symbols per IN (...) lookup, below SQLite's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def parse_import(body, content_type):
+    """
+    Parse an import body into a list of row dicts
+    Accepts a JSON array (or {"analyses": [...]}), NDJSON, or CSV with a
+    header row as produced by the export
+    """
+    content_type = (content_type or '').split(';')[0].strip().lower()
+
+    if content_type == 'text/csv':
+        rows = list(csv.DictReader(io.StringIO(body)))
+        for row in rows:
+            # CSV exports carry factors as JSON text
+            if row.get('factors'):
+                try:
+                    row['factors'] = json.loads(row['factors'])
+                except ValueError:
+                    raise ValueError(f"Invalid factors JSON for {row.get('symbol')}")
+            else:
+                row.pop('factors', None)
+    elif content_type in ('application/x-ndjson', 'application/ndjson'):
+        try:
+            rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+        except ValueError as e:
+            raise ValueError(f"Invalid NDJSON: {str(e)}")
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON: {str(e)}")
+        if isinstance(rows, dict):
+            rows = rows.get('analyses')
+
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError('Expected a list of analyses')
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise ValueError(f"At most {IMPORT_MAX_ROWS} analyses can be imported at once")
+
+    for i, row in enumerate(rows):
+        if not row.get('symbol'):
+            raise ValueError(f"Row {i + 1} is missing a symbol")
+        row['symbol'] = str(row['symbol']).upper()
+
+    return rows
+
+
+def _existing_ids(user_id, symbols):
+    """Id of the saved analysis save_analysis would update, per symbol"""
+    existing = {}
+    symbols = list(symbols)
+    for start in range(0, len(symbols), LOOKUP_CHUNK_SIZE):
+        chunk = symbols[start:start + LOOKUP_CHUNK_SIZE]
+        result = db.session.execute(
+            select(SavedAnalysis.id, SavedAnalysis.symbol)
+            .where(SavedAnalysis.user_id == user_id, SavedAnalysis.symbol.in_(chunk))
+            .order_by(SavedAnalysis.id)
+        )
+        for analysis_id, symbol in result:
+            existing.setdefault(symbol, analysis_id)
+    return existing
+
+
+def import_analyses(user_id, rows, mode='upsert'):
+    """
+    Write parsed rows for a user in one transaction
+    mode=upsert updates the user's analysis for each symbol like
+    save_analysis does (the last row per symbol wins); mode=append
+    inserts every row. Returns (created, updated)
+    """
+    table = SavedAnalysis.__table__
+
+    if mode == 'append':
+        inserts, updates = rows, []
+    else:
+        latest = {}
+        for row in rows:
+            latest[row['symbol']] = row
+        existing = _existing_ids(user_id, latest)
+        inserts = [row for symbol, row in latest.items() if symbol not in existing]
+        updates = [dict(row, _id=existing[symbol]) for symbol, row in latest.items() if symbol in existing]
+
+    try:
+        if inserts:
+            db.session.execute(insert(table), [
+                {
+                    'user_id': user_id,
+                    'symbol': row['symbol'],
+                    'name': row.get('name') or row['symbol'],
+                    'recommendation': row.get('recommendation') or 'HOLD',
+                    'notes': row.get('notes') or '',
+                    'factors': row.get('factors') or []
+                }
+                for row in inserts
+            ])
+
+        # Only fields present in a row change, so batch rows by field set
+        batches = {}
+        for row in updates:
+            fields = tuple(field for field in IMPORT_FIELDS if field in row)
+            batches.setdefault(fields, []).append(row)
+
+        for fields, batch in batches.items():
+            if not fields:
+                continue
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam('_id'))
+                # Bind names must not clash with column names
+                .values({field: bindparam(f"_{field}") for field in fields})
+            )
+            db.session.execute(statement, [
+                dict({f"_{field}": row[field] for field in fields}, _id=row['_id'])
+                for row in batch
+            ])
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(inserts), len(updates)
+
+
+def export_rows(user_id, symbol=None):
+    """Yield a user's analyses as dicts, newest first, from a server-side cursor"""
+    statement = (
+        select(*(SavedAnalysis.__table__.c[column] for column in EXPORT_COLUMNS))
+        .where(SavedAnalysis.user_id == user_id)
+        .order_by(SavedAnalysis.timestamp.desc(), SavedAnalysis.id.desc())
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if symbol:
+        statement = statement.where(SavedAnalysis.symbol == symbol.upper())
+
+    for row in db.session.execute(statement):
+        row = dict(row._mapping)
+        row['timestamp'] = row['timestamp'].isoformat() if row['timestamp'] else None
+        yield row
+
+
+def iter_ndjson(rows):
+    """Encode rows as NDJSON lines, flushed in chunks rather than per row"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row) + '\n')
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield ''.join(lines)
+            lines = []
+
+    yield ''.join(lines)
+
+
+def iter_csv(rows):
+    """Encode rows as CSV, factors as JSON text"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+
+    for i, row in enumerate(rows, start=1):
+        row['factors'] = json.dumps(row['factors']) if row['factors'] is not None else ''
+        writer.writerow(row)
+        # Flush in chunks rather than per row
+        if i % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
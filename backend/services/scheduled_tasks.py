@@ -0,0 +1,152 @@
+"""
+Tasks of the built-in scheduler
+Before the open the caches behind the popular and saved symbols are warmed,
+during the session benchmark and sector figures are kept fresh, and
+expired cache entries, old jobs and retired intraday bars are cleaned up.
+Fetches are spread over SCHEDULER_FETCH_WORKERS threads so warming never
+competes with user requests for the upstream
+"""
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+from config import (
+    POPULAR_STOCKS,
+    SECTOR_ETFS,
+    EARNINGS_REFRESH_SECONDS,
+    SCHEDULER_ENABLED,
+    SCHEDULER_FETCH_WORKERS,
+    SCHEDULER_JITTER_SECONDS,
+    WARM_CACHE_AT,
+    BENCHMARK_REFRESH_SECONDS,
+    CACHE_PRUNE_SECONDS,
+    MAINTENANCE_AT
+)
+from database import db
+from models.models import SavedAnalysis
+from services.analysis_cache import causal_cache, recommendation_cache, sector_cache
+from services.stock_analysis import get_causal_factors, get_investment_recommendation, get_sector_analysis
+from services.analysis_context import AnalysisContext
+from services.details_service import _details_cache, load_details
+from services.earnings_service import refresh_earnings, refresh_requested, refresh_calendar
+from services.indicator_service import refresh_market_closes
+from services.job_queue import prune_jobs
+from services.price_store import retire_intraday
+from services.scheduler import ScheduledTask, get_scheduler, start_scheduler
+from services.screener_service import build_table
+from services.universe import tracked_symbols
+from utils.cache import prune_caches
+
+# Periods of benchmark closes the indicators read
+MARKET_PERIODS = ('1mo', 'max')
+
+
+def _for_each(symbols, func, label):
+    """Call func(symbol) on a few threads, each in an app context; errors are logged"""
+    app = current_app._get_current_object()
+
+    def run(symbol):
+        with app.app_context():
+            try:
+                func(symbol)
+                return True
+            except Exception as e:
+                print(f"Error warming {label} for {symbol}: {str(e)}")
+                return False
+            finally:
+                db.session.remove()
+
+    with ThreadPoolExecutor(max_workers=max(min(SCHEDULER_FETCH_WORKERS, len(symbols)), 1)) as executor:
+        return sum(executor.map(run, symbols))
+
+
+def _analyze(symbol, context):
+    causal = causal_cache.refresh(symbol, lambda: get_causal_factors(symbol, context))
+    recommendation_cache.refresh(symbol, lambda: get_investment_recommendation(symbol, causal, context))
+
+
+def warm_caches():
+    """
+    Load details of the tracked universe and the analyses of popular and
+    saved symbols, then rebuild the screener table from the warm details
+    """
+    symbols = tracked_symbols()
+    viewed = sorted(
+        {stock['symbol'] for stock in POPULAR_STOCKS}
+        | {row[0] for row in db.session.query(SavedAnalysis.symbol).distinct()}
+    )
+
+    _for_each(symbols, lambda symbol: _details_cache.refresh(symbol, lambda: load_details(symbol)), 'details')
+    context = AnalysisContext()
+    _for_each(viewed, lambda symbol: _analyze(symbol, context), 'analysis')
+    build_table()
+
+
+def refresh_benchmarks():
+    """Reload the benchmark closes and every sector analysis"""
+    for period in MARKET_PERIODS:
+        refresh_market_closes(period)
+    context = AnalysisContext()
+    _for_each(
+        list(SECTOR_ETFS),
+        lambda sector: sector_cache.refresh(sector, lambda: get_sector_analysis(sector, context)),
+        'sector analysis'
+    )
+
+
+def maintenance():
+    """Delete old finished jobs and retire old intraday bars"""
+    prune_jobs()
+    retire_intraday()
+
+
+def build_tasks(in_app=True):
+    """
+    Scheduled tasks of a server process, or with in_app=False those of a
+    standalone scheduler, which has no request caches to warm and only
+    keeps the database side up to date
+    """
+    tasks = [
+        ScheduledTask('maintenance', maintenance, at=MAINTENANCE_AT, jitter=SCHEDULER_JITTER_SECONDS,
+                      shared=True, min_gap=12 * 60 * 60)
+    ]
+
+    if not in_app:
+        if EARNINGS_REFRESH_SECONDS > 0:
+            tasks.append(ScheduledTask(
+                'earnings_calendar', lambda: refresh_calendar(tracked_symbols()),
+                every=EARNINGS_REFRESH_SECONDS, startup=True, jitter=SCHEDULER_JITTER_SECONDS
+            ))
+        return tasks
+
+    tasks += [
+        # Screens are answered from the table only, so build it right away
+        ScheduledTask('screener', build_table, startup=True),
+        ScheduledTask('warm_caches', warm_caches, at=WARM_CACHE_AT, weekdays=True, startup=True,
+                      jitter=SCHEDULER_JITTER_SECONDS),
+        ScheduledTask('refresh_benchmarks', refresh_benchmarks, every=BENCHMARK_REFRESH_SECONDS,
+                      market_hours=True, jitter=60),
+        ScheduledTask('prune_caches', prune_caches, every=CACHE_PRUNE_SECONDS, jitter=60)
+    ]
+    if EARNINGS_REFRESH_SECONDS > 0:
+        # Stored calendars younger than the interval are not fetched again,
+        # so processes after the first only recompute their impacts
+        tasks += [
+            ScheduledTask('earnings', refresh_earnings, every=EARNINGS_REFRESH_SECONDS, startup=True,
+                          jitter=SCHEDULER_JITTER_SECONDS),
+            ScheduledTask('earnings_requested', refresh_requested)
+        ]
+    return tasks
+
+
+def init_scheduler(app):
+    """
+    Start the scheduler with the first request rather than at import, so
+    workers forked from a preloading master each get their own
+    """
+    if not SCHEDULER_ENABLED:
+        return
+
+    @app.before_request
+    def start():
+        if get_scheduler() is None:
+            start_scheduler(app, build_tasks())
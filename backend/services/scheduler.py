@@ -0,0 +1,261 @@
+"""
+Built-in scheduler for cache warming and maintenance
+Tasks run on an interval or daily at a time of day in exchange time, with
+random jitter so server processes don't all fire at once, on a small
+thread pool that never runs the same task twice at a time. Shared tasks
+only touch the database, so one process runs them per period
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from config import (
+    SCHEDULER_WORKERS,
+    SCHEDULER_LOCK_DIR,
+    MARKET_TIMEZONE,
+    MARKET_OPEN,
+    MARKET_CLOSE
+)
+from database import db
+from utils.metrics import scheduled_runs
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process runs shared tasks
+    fcntl = None
+
+# Longest the scheduler sleeps before looking at its tasks again
+MAX_SLEEP_SECONDS = 60
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def _clock(text):
+    hour, minute = text.split(':')
+    return int(hour), int(minute)
+
+
+def market_now(now=None):
+    """Current time (or epoch seconds now) in exchange time"""
+    return datetime.fromtimestamp(time.time() if now is None else now, ZoneInfo(MARKET_TIMEZONE))
+
+
+def is_market_open(now=None):
+    """Whether now falls in a weekday session; exchange holidays are not known"""
+    local = market_now(now)
+    return local.weekday() < 5 and _clock(MARKET_OPEN) <= (local.hour, local.minute) < _clock(MARKET_CLOSE)
+
+
+def next_daily(at, now, weekdays=False):
+    """Epoch seconds of the next at ('HH:MM' exchange time) after now"""
+    local = market_now(now)
+    hour, minute = _clock(at)
+    candidate = local.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    while candidate.timestamp() <= now or (weekdays and candidate.weekday() >= 5):
+        candidate = (candidate + timedelta(days=1)).replace(hour=hour, minute=minute)
+    return candidate.timestamp()
+
+
+class ScheduledTask:
+    """
+    A task run every `every` seconds, or daily `at` 'HH:MM' exchange time
+    (weekdays only if weekdays), or only when triggered if neither is set
+    market_hours holds interval runs until the exchange is open; startup
+    also runs the task shortly after the scheduler starts. A shared task
+    is skipped when another process ran it within min_gap seconds
+    """
+
+    def __init__(self, name, func, every=None, at=None, weekdays=False, market_hours=False,
+                 startup=False, jitter=0, shared=False, min_gap=None):
+        self.name = name
+        self.func = func
+        self.every = every
+        self.at = at
+        self.weekdays = weekdays
+        self.market_hours = market_hours
+        self.startup = startup
+        self.jitter = jitter
+        self.shared = shared
+        self.min_gap = min_gap if min_gap is not None else (every or 60 * 60) / 2
+        self.next_run = None
+        self.running = False
+        self.triggered = False
+        self.last_run = None
+        self.last_error = None
+
+    def schedule(self, now, first=False):
+        """Set the next run after now"""
+        if first and self.startup:
+            base = now
+        elif self.at is not None:
+            base = next_daily(self.at, now, self.weekdays)
+        elif self.every:
+            base = now + self.every
+            if self.market_hours and not is_market_open(base):
+                base = next_daily(MARKET_OPEN, base, weekdays=True)
+        else:
+            self.next_run = None
+            return
+        self.next_run = base + random.uniform(0, self.jitter)
+
+
+class Scheduler:
+    """Runs tasks in the background of one process"""
+
+    def __init__(self, app, tasks, workers=SCHEDULER_WORKERS):
+        self.app = app
+        self.tasks = {task.name: task for task in tasks}
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pool = None
+        self._thread = None
+
+    def start(self):
+        """Run the scheduler loop on a daemon thread"""
+        self._thread = threading.Thread(target=self.run_forever, daemon=True, name='scheduler')
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self, name):
+        """Run a task as soon as a worker is free"""
+        with self._lock:
+            task = self.tasks[name]
+            if task.running:
+                task.triggered = True
+            else:
+                task.next_run = time.time()
+        self._wake.set()
+
+    def run_forever(self):
+        """Dispatch due tasks until stopped"""
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scheduled')
+        now = time.time()
+        with self._lock:
+            for task in self.tasks.values():
+                task.schedule(now, first=True)
+
+        while not self._stop.is_set():
+            now = time.time()
+            with self._lock:
+                due = [
+                    task for task in self.tasks.values()
+                    if task.next_run is not None and task.next_run <= now and not task.running
+                ]
+                for task in due:
+                    task.running = True
+                    task.next_run = None
+                upcoming = [task.next_run for task in self.tasks.values() if task.next_run is not None]
+
+            for task in due:
+                self._pool.submit(self._run, task)
+
+            timeout = min([MAX_SLEEP_SECONDS] + [max(run - now, 0) for run in upcoming])
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+        self._pool.shutdown(wait=False)
+
+    def _run(self, task):
+        try:
+            self.run_task(task)
+        finally:
+            with self._lock:
+                task.running = False
+                task.schedule(time.time())
+                if task.triggered:
+                    task.triggered = False
+                    task.next_run = time.time()
+            self._wake.set()
+
+    def run_task(self, task):
+        """Run one task now in an app context; returns False if another process had it"""
+        started = time.monotonic()
+        with self.app.app_context():
+            try:
+                if task.shared:
+                    ran = _run_shared(task)
+                else:
+                    task.func()
+                    ran = True
+                outcome = 'success' if ran else 'skipped'
+                task.last_error = None
+            except Exception as e:
+                print(f"Scheduled task {task.name} failed: {str(e)}")
+                db.session.rollback()
+                outcome = 'error'
+                ran = True
+                task.last_error = str(e)
+            finally:
+                db.session.remove()
+
+        if ran:
+            task.last_run = time.time()
+        scheduled_runs.inc(task=task.name, outcome=outcome)
+        if outcome != 'skipped':
+            print(f"Scheduled task {task.name} finished ({outcome}) in {time.monotonic() - started:.1f}s")
+        return ran
+
+
+def _run_shared(task):
+    """
+    Run a shared task under an exclusive lock on its lock file, which holds
+    the time of its last run, unless another process holds it or ran it
+    within min_gap seconds
+    """
+    if fcntl is None:
+        task.func()
+        return True
+
+    os.makedirs(SCHEDULER_LOCK_DIR, exist_ok=True)
+    with open(os.path.join(SCHEDULER_LOCK_DIR, f"{task.name}.lock"), 'a+') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+
+        try:
+            lock_file.seek(0)
+            last_run = float(lock_file.read().strip() or 0)
+            if time.time() - last_run < task.min_gap:
+                return False
+
+            task.func()
+            lock_file.seek(0)
+            lock_file.truncate()
+            lock_file.write(str(time.time()))
+            return True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_scheduler():
+    """The scheduler running in this process, or None"""
+    return _scheduler
+
+
+def start_scheduler(app, tasks):
+    """Start the scheduler once per process"""
+    global _scheduler
+
+    with _scheduler_lock:
+        if _scheduler is not None:
+            return _scheduler
+        _scheduler = Scheduler(app, tasks)
+        _scheduler.start()
+    return _scheduler
+
+
+def trigger(name):
+    """Trigger a task of the running scheduler; a no-op without one"""
+    if _scheduler is not None and name in _scheduler.tasks:
+        _scheduler.trigger(name)
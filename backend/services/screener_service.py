@@ -0,0 +1,170 @@
+"""
+Stock screener over the tracked universe
+The universe is held as a columnar table, one NumPy array per field,
+built from the cached company details and price history. Filters are
+evaluated as vectorized masks and sorting is a single argsort, so a screen
+never waits on the upstream
+"""
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import STALE_MAX_AGE_SECONDS, SCREENER_REFRESH_SECONDS, UPSTREAM_FETCH_WORKERS
+from services.analysis_service import TRADING_DAYS
+from services.correlation_service import load_closes
+from services.details_service import get_details
+from services.universe import tracked_symbols
+from utils.lazy import lazy_import
+from utils.resilience import StaleCache
+
+np = lazy_import('numpy')
+
+# Fields copied from the company details
+DETAIL_FIELDS = (
+    'market_cap',
+    'pe_ratio',
+    'dividend_yield',
+    'beta',
+    'fifty_two_week_high',
+    'fifty_two_week_low',
+    'average_volume'
+)
+# Details report 0 when yfinance has no value for these
+ZERO_IS_MISSING = ('market_cap', 'pe_ratio', 'beta', 'fifty_two_week_high', 'fifty_two_week_low', 'average_volume')
+# Fields computed from price history
+METRIC_FIELDS = ('price', 'volatility', 'momentum_1m', 'momentum_3m', 'momentum_12m', 'from_high')
+NUMERIC_FIELDS = DETAIL_FIELDS + METRIC_FIELDS
+TEXT_FIELDS = ('symbol', 'name', 'sector', 'industry')
+
+# Sessions per momentum horizon, and of the volatility lookback
+MOMENTUM_SESSIONS = {'momentum_1m': 21, 'momentum_3m': 63, 'momentum_12m': 252}
+VOLATILITY_SESSIONS = 126
+
+class TableBuildingError(RuntimeError):
+    """Raised while the first screener table is still being built"""
+
+
+_table_cache = StaleCache('screener', fresh_ttl=SCREENER_REFRESH_SECONDS, stale_ttl=STALE_MAX_AGE_SECONDS, maxsize=1)
+
+
+def _trailing_return(prices, sessions):
+    """Return over the last `sessions` sessions per column, NaN if too short"""
+    if len(prices) <= sessions:
+        return np.full(prices.shape[1], np.nan)
+    return prices[-1] / prices[-1 - sessions] - 1
+
+
+def price_metrics(closes):
+    """Price, annualized volatility and momentum per column of a closes matrix"""
+    prices = closes.to_numpy(dtype=float)
+    returns = prices[1:] / prices[:-1] - 1
+    recent = returns[-VOLATILITY_SESSIONS:]
+
+    with np.errstate(invalid='ignore'):
+        observed = np.sum(~np.isnan(recent), axis=0)
+        volatility = np.nanstd(recent, axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+    volatility[observed < VOLATILITY_SESSIONS // 2] = np.nan
+
+    metrics = {
+        'price': prices[-1] if len(prices) else np.full(prices.shape[1], np.nan),
+        'volatility': volatility
+    }
+    for field, sessions in MOMENTUM_SESSIONS.items():
+        metrics[field] = _trailing_return(prices, sessions)
+    return metrics
+
+
+class ScreenerTable:
+    """Columnar snapshot of the tracked universe"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.size = len(columns['symbol'])
+        self.sectors = np.array([sector.lower() for sector in columns['sector']], dtype=object)
+        self.built_at = time.time()
+
+    @classmethod
+    def build(cls, symbols):
+        """Load details and history of symbols and compute the metric columns"""
+        def details(symbol):
+            try:
+                return get_details(symbol)[0]
+            except Exception as e:
+                print(f"Error fetching details for {symbol}: {str(e)}")
+                return {}
+
+        with ThreadPoolExecutor(max_workers=max(min(UPSTREAM_FETCH_WORKERS, len(symbols)), 1)) as executor:
+            rows = list(executor.map(details, symbols))
+        # Symbols that miss a session keep their last close
+        closes = load_closes(symbols, '2y').ffill()
+
+        columns = {
+            'symbol': np.array(symbols, dtype=object),
+            'name': np.array([row.get('name') or symbol for symbol, row in zip(symbols, rows)], dtype=object),
+            'sector': np.array([row.get('sector') or '' for row in rows], dtype=object),
+            'industry': np.array([row.get('industry') or '' for row in rows], dtype=object)
+        }
+        for field in DETAIL_FIELDS:
+            values = np.array([row.get(field) for row in rows], dtype=float)
+            if field in ZERO_IS_MISSING:
+                values[values == 0] = np.nan
+            columns[field] = values
+
+        columns.update(price_metrics(closes))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns['from_high'] = columns['price'] / columns['fifty_two_week_high'] - 1
+        return cls(columns)
+
+    def screen(self, ranges=None, sectors=None, sort=None, descending=True, limit=50, offset=0):
+        """
+        Rows matching every (low, high) range per field and any of sectors
+        Rows with a missing value fail that field's range. Returns
+        (total matches, page of row dicts); sort puts missing values last
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for field, (low, high) in (ranges or {}).items():
+            column = self.columns[field]
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+        if sectors:
+            mask &= np.isin(self.sectors, [sector.lower() for sector in sectors])
+
+        matches = np.flatnonzero(mask)
+        if sort:
+            keys = self.columns[sort][matches]
+            # Negating keeps NaN last for a descending sort too
+            matches = matches[np.argsort(-keys if descending else keys, kind='stable')]
+        page = matches[offset:offset + limit]
+
+        values = {field: self.columns[field][page].tolist() for field in TEXT_FIELDS + NUMERIC_FIELDS}
+        rows = [
+            {
+                field: (None if math.isnan(value) else round(value, 4)) if field in NUMERIC_FIELDS else value
+                for field, value in zip(values, row)
+            }
+            for row in zip(*values.values())
+        ]
+        return len(matches), rows
+
+
+def _load_table():
+    return ScreenerTable.build(tracked_symbols())
+
+
+def build_table():
+    """Build the screener table now and cache it"""
+    return _table_cache.refresh('table', _load_table)
+
+
+def get_table():
+    """
+    Screener table as (table, age); rebuilt in the background once stale
+    A request never waits for a build: without a table one is started on
+    a single background thread and TableBuildingError is raised
+    """
+    table, age = _table_cache.get('table', _load_table, wait=False)
+    if table is None:
+        raise TableBuildingError('The screener table is being built')
+    return table, age
@@ -0,0 +1,243 @@
+"""
+Stock and sector analyses served by the analysis routes, warmed by the
+scheduler and run by background jobs
+"""
+from config import BENCHMARK_SYMBOL, EARNINGS_RECENT_DAYS, SECTOR_ETFS
+from services.news_service import get_stock_news
+from services.earnings_service import get_earnings_impact
+from services.analysis_context import AnalysisContext
+from services.risk_service import price_target
+from services.analysis_service import (
+    TRADING_DAYS,
+    market_trend_impact,
+    volatility_impact,
+    news_sentiment_impact,
+    score_recommendation
+)
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+def get_causal_factors(symbol, context=None):
+    """
+    Analyze causal factors affecting a stock
+    This is a simplified implementation for demo purposes
+    In a real application, you would use more sophisticated analysis
+    """
+    context = context or AnalysisContext()
+    
+    # Get stock data
+    hist = context.history(symbol, '6mo')
+    
+    # Calculate simple metrics
+    returns = hist['Close'].pct_change().dropna()
+    volatility = returns.std() * np.sqrt(TRADING_DAYS)  # Annualized volatility
+    
+    # Get market data (S&P 500)
+    market_hist = context.history(BENCHMARK_SYMBOL, '6mo')
+    market_returns = market_hist['Close'].pct_change().dropna()
+    
+    # Calculate correlation with market
+    correlation = returns.corr(market_returns)
+    
+    # Get news sentiment (from our service)
+    news = get_stock_news(symbol)
+    news_sentiment = 0.5  # Neutral by default
+    
+    # Reaction to the latest earnings report, precomputed in the background
+    try:
+        earnings = get_earnings_impact(symbol, hist, market_hist)
+    except Exception as e:
+        print(f"Error reading earnings impact for {symbol}: {str(e)}")
+        earnings = None
+    had_recent_earnings = earnings is not None and earnings['days_since'] < EARNINGS_RECENT_DAYS
+    
+    # Create factors
+    factors = [
+        {
+            "name": "Market Trend",
+            "impact": float(market_trend_impact(correlation)),
+            "description": f"Stock has a {abs(correlation):.2f} correlation with the overall market"
+        },
+        {
+            "name": "Volatility",
+            "impact": float(volatility_impact(volatility)),
+            "description": f"Stock has {volatility:.2f} annualized volatility"
+        }
+    ]
+    
+    # Add earnings factor if recent
+    if had_recent_earnings:
+        # Move since the close before the report, net of the market
+        earnings_impact = earnings['abnormal_return']
+        
+        factors.append({
+            "name": "Earnings Report",
+            "impact": round(min(abs(earnings_impact) * 2, 1.0) * (0.9 if earnings_impact > 0 else -0.9), 2),
+            "description": f"Recent earnings report {'exceeded' if earnings_impact > 0 else 'missed'} expectations"
+        })
+    
+    # Add sector performance factor
+    try:
+        info = context.info(symbol)
+    except:
+        info = {}
+    
+    try:
+        sector = info.get('sector')
+        if sector:
+            # This is simplified - in a real app, you'd compare with sector ETFs
+            sector_impact = np.random.uniform(0.3, 0.7) * (1 if np.random.random() > 0.5 else -1)
+            
+            factors.append({
+                "name": "Sector Performance",
+                "impact": round(sector_impact, 2),
+                "description": f"{sector} sector is showing {'strong' if sector_impact > 0 else 'weak'} performance"
+            })
+    except:
+        pass
+    
+    # Add news sentiment factor
+    factors.append({
+        "name": "News Sentiment",
+        "impact": float(news_sentiment_impact(news_sentiment)),
+        "description": f"Recent news sentiment is {'positive' if news_sentiment > 0.5 else 'negative' if news_sentiment < 0.5 else 'neutral'}"
+    })
+    
+    # Add analyst ratings factor (simplified)
+    analyst_impact = np.random.uniform(0.4, 0.8) * (1 if np.random.random() > 0.4 else -1)
+    factors.append({
+        "name": "Analyst Ratings",
+        "impact": round(analyst_impact, 2),
+        "description": f"Recent analyst ratings are {'generally positive' if analyst_impact > 0 else 'generally negative'}"
+    })
+    
+    return {
+        "symbol": symbol,
+        "name": info.get('shortName', symbol),
+        "factors": factors,
+        "sentiment": {
+            "news": round(news_sentiment, 2),
+            "social": round(0.4 + np.random.random() * 0.3, 2),  # Random for demo
+            "overall": round((news_sentiment * 0.6) + (0.4 + np.random.random() * 0.3) * 0.4, 2)
+        }
+    }
+
+
+def get_investment_recommendation(symbol, causal_analysis=None, context=None):
+    """
+    Generate investment recommendation based on causal analysis
+    This is a simplified implementation for demo purposes
+    """
+    context = context or AnalysisContext()
+    if not causal_analysis:
+        causal_analysis = get_causal_factors(symbol, context)
+    
+    # Calculate overall score from factors
+    factor_scores = [factor["impact"] for factor in causal_analysis["factors"]]
+    overall_score = sum(factor_scores) / len(factor_scores)
+    
+    # Determine recommendation
+    recommendation, confidence = score_recommendation(overall_score)
+    recommendation = str(recommendation)
+    confidence = float(confidence)
+    
+    if recommendation == "BUY":
+        reasoning = "Based on positive market conditions, favorable news sentiment, and strong analyst ratings."
+    elif recommendation == "SELL":
+        reasoning = "Based on negative market conditions, unfavorable news sentiment, and weak analyst ratings."
+    else:
+        reasoning = "Based on mixed signals and moderate market conditions."
+    
+    # Add specific reasoning from factors
+    positive_factors = [f["name"] for f in causal_analysis["factors"] if f["impact"] > 0.4]
+    negative_factors = [f["name"] for f in causal_analysis["factors"] if f["impact"] < -0.4]
+    
+    if positive_factors:
+        reasoning += f" Positive factors include {', '.join(positive_factors)}."
+    
+    if negative_factors:
+        reasoning += f" Negative factors include {', '.join(negative_factors)}."
+    
+    # Get stock data for price targets
+    closes = context.series(symbol, '6mo').close
+    
+    # Price targets from Monte Carlo paths, tilted by the overall score
+    percentiles = price_target(closes, overall_score)
+    
+    price_target_range = {
+        "low": percentiles["p10"],
+        "median": percentiles["p50"],
+        "high": percentiles["p90"],
+        "percentiles": percentiles
+    }
+    
+    return {
+        "symbol": symbol,
+        "name": causal_analysis["name"],
+        "recommendation": recommendation,
+        "confidence": round(confidence, 2),
+        "reasoning": reasoning,
+        "priceTarget": price_target_range,
+        "timeHorizon": "Medium-term (3-6 months)"
+    }
+
+
+def get_sector_analysis(sector, context=None):
+    """Analyze a sector through its ETF"""
+    context = context or AnalysisContext()
+    # This is a simplified implementation
+    # In a real app, you'd analyze sector ETFs and component stocks
+    
+    etf = SECTOR_ETFS.get(sector.lower(), 'SPY')
+    
+    # Get ETF data
+    hist = context.history(etf, '6mo')
+    
+    # Calculate performance
+    start_price = hist['Close'].iloc[0]
+    end_price = hist['Close'].iloc[-1]
+    performance = ((end_price - start_price) / start_price) * 100
+    
+    # Calculate volatility
+    returns = hist['Close'].pct_change().dropna()
+    volatility = returns.std() * np.sqrt(TRADING_DAYS)
+    
+    # Get market comparison
+    market_hist = context.history(BENCHMARK_SYMBOL, '6mo')
+    market_start = market_hist['Close'].iloc[0]
+    market_end = market_hist['Close'].iloc[-1]
+    market_performance = ((market_end - market_start) / market_start) * 100
+    
+    # Generate outlook
+    relative_performance = performance - market_performance
+    
+    if relative_performance > 5:
+        outlook = "Strong outperformance compared to the overall market"
+    elif relative_performance > 0:
+        outlook = "Slight outperformance compared to the overall market"
+    elif relative_performance > -5:
+        outlook = "Comparable performance to the overall market"
+    else:
+        outlook = "Underperformance compared to the overall market"
+    
+    # Mock stocks in sector
+    stocks = [
+        {"symbol": "AAPL", "name": "Apple Inc.", "performance": 12.5, "recommendation": "BUY"},
+        {"symbol": "MSFT", "name": "Microsoft Corporation", "performance": 15.2, "recommendation": "BUY"},
+        {"symbol": "GOOGL", "name": "Alphabet Inc.", "performance": 8.7, "recommendation": "HOLD"},
+        {"symbol": "AMZN", "name": "Amazon.com, Inc.", "performance": 10.1, "recommendation": "BUY"},
+        {"symbol": "META", "name": "Meta Platforms, Inc.", "performance": 6.3, "recommendation": "HOLD"}
+    ]
+    
+    return {
+        "sector": sector.capitalize(),
+        "etf": etf,
+        "performance": round(float(performance), 2),
+        "volatility": round(float(volatility), 2),
+        "marketPerformance": round(float(market_performance), 2),
+        "relativePerformance": round(float(relative_performance), 2),
+        "outlook": outlook,
+        "topStocks": stocks
+    }
@@ -0,0 +1,19 @@
+"""
+The tracked symbol universe
+Background jobs and the screener cover every symbol users are likely to ask
+about: popular stocks, the sample sector universes, saved analyses and
+symbols whose earnings calendar was requested
+"""
+from config import POPULAR_STOCKS, SECTOR_UNIVERSES
+from database import db
+from models.models import SavedAnalysis, EarningsCoverage
+
+
+def tracked_symbols():
+    """Sorted symbols of the tracked universe"""
+    symbols = {stock['symbol'] for stock in POPULAR_STOCKS}
+    for universe in SECTOR_UNIVERSES.values():
+        symbols.update(universe)
+    symbols.update(row[0] for row in db.session.query(SavedAnalysis.symbol).distinct())
+    symbols.update(row[0] for row in db.session.query(EarningsCoverage.symbol))
+    return sorted(symbols)
@@ -0,0 +1,34 @@
+"""
+Behavioral tests of the API and services
+
+The app runs against the synthetic data provider and a scratch database,
+like the benchmarks. Run from the backend directory:
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+# Importable as a package however pytest is started
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.support import configure_environment, get_app, login
+
+# Test modules import services, which read config on import
+configure_environment()
+
+
+@pytest.fixture(scope='session')
+def app():
+    return get_app()
+
+
+@pytest.fixture(scope='session')
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def auth_headers(client):
+    return login(client)
@@ -0,0 +1,58 @@
+"""
+Tests of the saved analysis routes
+"""
+from datetime import datetime
+
+from benchmarks.support import login
+
+
+def test_saved_analyses_page_through_ties(app, client):
+    from database import db
+    from models.models import SavedAnalysis, User
+
+    headers = login(client, 'pages@example.com', 'pages-password')
+    for symbol in ('AAPL', 'MSFT', 'GOOG', 'AMZN', 'NVDA'):
+        client.post('/api/analysis/save', headers=headers, json={'symbol': symbol})
+    with app.app_context():
+        user_id = User.query.filter_by(email='pages@example.com').one().id
+        # Older rows sharing one timestamp
+        db.session.add_all(
+            SavedAnalysis(user_id=user_id, symbol=symbol, timestamp=datetime(2024, 1, 2, 3, 4, 5))
+            for symbol in ('META', 'TSLA', 'NFLX')
+        )
+        db.session.commit()
+
+    everything = client.get('/api/analysis/saved?summary=true', headers=headers).get_json()
+    pages, cursor = [], None
+    for _ in range(len(everything)):
+        url = '/api/analysis/saved?summary=true&limit=2' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=headers)
+        pages.extend(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+
+    assert len(everything) == 8
+    assert [analysis['id'] for analysis in pages] == [analysis['id'] for analysis in everything]
+    assert pages[-1]['symbol'] == 'META'
+
+
+def test_malformed_cursor_is_rejected(client, auth_headers):
+    response = client.get('/api/analysis/saved?limit=2&cursor=bm90LWEtY3Vyc29y', headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_portfolio_risk_merges_symbol_case(app, client):
+    from database import db
+    from models.models import SavedAnalysis, User
+
+    headers = login(client, 'risk@example.com', 'risk-password')
+    with app.app_context():
+        user_id = User.query.filter_by(email='risk@example.com').one().id
+        db.session.add_all(SavedAnalysis(user_id=user_id, symbol=symbol) for symbol in ('aapl', 'AAPL', 'MSFT'))
+        db.session.commit()
+
+    report = client.get('/api/analysis/risk/portfolio?paths=1000', headers=headers).get_json()
+    assert report['symbols'] == ['AAPL', 'MSFT']
+    assert report['weights'] == [0.5, 0.5]
+    assert set(report['var']) == {'historical1d', 'parametric1d', f"monteCarlo{report['horizon']}d"}
@@ -0,0 +1,54 @@
+"""
+Tests of authentication
+"""
+from benchmarks.support import login
+
+
+def test_token_of_deleted_user_is_rejected(app, client):
+    from database import db
+    from models.models import User
+
+    headers = login(client, 'deleted@example.com', 'deleted-password')
+    with app.app_context():
+        db.session.delete(User.query.filter_by(email='deleted@example.com').one())
+        db.session.commit()
+
+    response = client.post('/api/analysis/save', headers=headers, json={'symbol': 'AAPL'})
+    assert response.status_code == 404
+    assert client.get('/api/auth/me', headers=headers).status_code == 404
+
+
+def test_refreshed_token_keeps_the_user(client):
+    login(client, 'refresh@example.com', 'refresh-password')
+    tokens = client.post('/api/auth/login', json={
+        'email': 'refresh@example.com', 'password': 'refresh-password'
+    }).get_json()
+
+    refreshed = client.post('/api/auth/refresh', headers={'Authorization': f"Bearer {tokens['refresh_token']}"})
+    headers = {'Authorization': f"Bearer {refreshed.get_json()['access_token']}"}
+    assert client.get('/api/auth/me', headers=headers).get_json()['email'] == 'refresh@example.com'
+
+
+def test_timed_out_hash_keeps_its_slot(monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    import pytest
+    from utils import hashing
+
+    release = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(hashing, 'PASSWORD_HASH_WORKERS', 1)
+    monkeypatch.setattr(hashing, 'PASSWORD_HASH_TIMEOUT', 0.05)
+    monkeypatch.setattr(hashing, '_slots', threading.BoundedSemaphore(1))
+    monkeypatch.setattr(hashing, '_get_pool', lambda: pool)
+
+    with pytest.raises(hashing.HashingTimeoutError):
+        hashing._run(release.wait)
+    # The hash is still running, so the queue is still full
+    with pytest.raises(hashing.HashingBusyError) as busy:
+        hashing._run(lambda: True)
+    assert not isinstance(busy.value, hashing.HashingTimeoutError)
+
+    release.set()
+    pool.submit(lambda: None).result()
+    assert hashing._run(lambda: True) is True
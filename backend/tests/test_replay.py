@@ -0,0 +1,30 @@
+"""
+Tests of the replay data provider
+"""
+import pandas as pd
+
+
+def _record(directory, symbol, interval, hist):
+    path = directory / 'history'
+    path.mkdir(exist_ok=True)
+    hist.to_csv(path / f"{symbol}_{interval}.csv")
+
+
+def test_clock_falls_back_to_finer_recordings(tmp_path):
+    from services.data_provider import ReplayDataProvider, SyntheticDataProvider
+
+    _record(tmp_path, 'RPLY', '5m', SyntheticDataProvider().history('RPLY', period='5d', interval='5m'))
+    provider = ReplayDataProvider(str(tmp_path))
+
+    # No 1h recording: the 5m one ends at the last bar's start
+    assert provider.clock('RPLY', '1h') == pd.Timestamp('2024-06-28 19:55').to_pydatetime()
+
+
+def test_missing_news_recording_means_no_news(tmp_path):
+    from services.data_provider import ReplayDataProvider
+
+    provider = ReplayDataProvider(str(tmp_path))
+    assert not provider.has_news()
+    (tmp_path / 'news').mkdir()
+    assert provider.has_news()
+    assert provider.news('AAPL') == []
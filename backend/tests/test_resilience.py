@@ -0,0 +1,51 @@
+"""
+Tests of the stale-while-revalidate cache
+"""
+import time
+from datetime import datetime
+
+from utils.resilience import StaleCache
+
+PLACEHOLDER = {'factors': []}
+
+
+def _wait_for_refresh(cache, key, loader, old, timeout=10):
+    """Value served once a background refresh has replaced old"""
+    deadline = time.monotonic() + timeout
+    value, _ = cache.get(key, loader)
+    while value == old and time.monotonic() < deadline:
+        time.sleep(0.05)
+        value, _ = cache.get(key, loader)
+    return value
+
+
+def test_stale_value_served_while_refreshing():
+    cache = StaleCache('test_stale', fresh_ttl=0, stale_ttl=60)
+    assert cache.get('key', lambda: 1) == (1, None)
+
+    value, age = cache.get('key', lambda: 2)
+    assert value == 1 and age is not None
+    assert _wait_for_refresh(cache, 'key', lambda: 2, 1) == 2
+
+
+def test_background_refresh_reads_the_database(app):
+    from database import db
+    from models.models import EarningsEvent
+    from services.stock_analysis import get_causal_factors
+
+    cache = StaleCache('test_causal', fresh_ttl=0, stale_ttl=60)
+
+    def loader():
+        return get_causal_factors('ERNS')
+
+    with app.app_context():
+        # A report a week before the synthetic history ends
+        db.session.add(EarningsEvent(symbol='ERNS', date=datetime(2024, 6, 20, 12)))
+        db.session.commit()
+
+        cache.get('ERNS', lambda: PLACEHOLDER)
+        # Stale: served as is, refreshed on a background thread
+        assert cache.get('ERNS', loader)[0] == PLACEHOLDER
+        refreshed = _wait_for_refresh(cache, 'ERNS', loader, PLACEHOLDER)
+
+    assert 'Earnings Report' in [factor['name'] for factor in refreshed['factors']]
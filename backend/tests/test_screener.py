@@ -0,0 +1,24 @@
+"""
+Tests of the stock screener
+"""
+import time
+
+
+def test_screener_never_blocks_on_a_cold_table(client):
+    started = time.monotonic()
+    first = client.get('/api/stocks/screener?limit=5')
+    second = client.get('/api/stocks/screener?limit=5')
+    assert time.monotonic() - started < 1
+
+    # Both wait for the one build started by the first request
+    for response in (first, second):
+        assert response.status_code == 503
+        assert response.headers['Retry-After']
+
+    deadline = time.monotonic() + 30
+    response = first
+    while response.status_code == 503 and time.monotonic() < deadline:
+        time.sleep(0.1)
+        response = client.get('/api/stocks/screener?limit=5')
+    assert response.status_code == 200
+    assert len(response.get_json()['results']) == 5
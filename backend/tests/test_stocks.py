@@ -0,0 +1,61 @@
+"""
+Tests of the stock history routes and the intraday price store
+"""
+import pandas as pd
+import pytest
+
+INTRADAY_URL = '/api/stocks/AAPL?timeframe=5d&interval=15m'
+
+
+def test_intraday_history(client):
+    prices = client.get(INTRADAY_URL).get_json()['prices']
+    # Five sessions of 26 bars, up to the end of the synthetic history
+    assert len(prices) == 5 * 26
+    assert prices[0]['date'] == '2024-06-24 13:30'
+    assert prices[-1]['date'] == '2024-06-28 19:45'
+
+
+def test_intraday_arrow_matches_json(client):
+    pa = pytest.importorskip('pyarrow')
+    prices = client.get(INTRADAY_URL).get_json()['prices']
+    response = client.get(INTRADAY_URL, headers={'Accept': 'application/vnd.apache.arrow.stream'})
+    table = pa.ipc.open_stream(response.data).read_all()
+
+    assert table.schema.field('date').type == pa.timestamp('ms', tz='UTC')
+    dates = table.column('date').to_pandas().dt.strftime('%Y-%m-%d %H:%M').tolist()
+    assert dates == [price['date'] for price in prices]
+    assert table.column('close').to_pylist() == pytest.approx([price['close'] for price in prices], abs=0.01)
+
+
+def test_resampled_bars_match_native(app):
+    from services.data_provider import get_data_provider
+    from services.price_store import get_bars, BAR_COLUMNS
+
+    with app.app_context():
+        get_bars('RSMP', '5m', '5d')
+        # Resampled from the stored 5m bars
+        hourly = get_bars('RSMP', '1h', '5d')
+
+    native = get_data_provider().history('RSMP', period='5d', interval='1h')[BAR_COLUMNS]
+    native.index = native.index.tz_convert('UTC').tz_localize(None)
+    assert hourly.index.strftime('%H:%M')[0] == '13:30'
+    pd.testing.assert_frame_equal(hourly, native, check_dtype=False, check_names=False, check_index_type=False)
+
+
+def test_retired_bars_are_kept_as_daily_aggregates(app):
+    from datetime import datetime
+    from models.models import PriceBar
+    from services.price_store import get_bars, retire_intraday, resample_bars
+
+    with app.app_context():
+        bars = get_bars('RTRE', '15m', '1mo')
+        retire_intraday(now=datetime(2024, 9, 1))
+
+        assert PriceBar.query.filter_by(symbol='RTRE', interval='15m').count() == 0
+        daily = PriceBar.query.filter_by(symbol='RTRE', interval='1d').order_by(PriceBar.timestamp).all()
+
+    expected = resample_bars(bars, '1d')
+    assert len(daily) == len(set(bars.index.date)) > 5
+    assert [bar.close for bar in daily] == pytest.approx(expected['Close'].tolist())
+    assert [bar.volume for bar in daily] == expected['Volume'].astype(int).tolist()
+    assert [bar.high for bar in daily] == pytest.approx(bars['High'].groupby(bars.index.date).max().tolist())
@@ -0,0 +1,57 @@
+"""
+Authenticated user helpers
+Tokens carry the user id in the uid claim so protected routes can filter
+by user_id without looking the user up by email first
+"""
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from config import USER_CACHE_TTL
+from database import db
+from models.models import User
+from utils.cache import TTLCache
+
+USER_ID_CLAIM = 'uid'
+
+# User records by id, and ids by email for tokens issued without a uid claim
+_user_cache = TTLCache(maxsize=4096, ttl=USER_CACHE_TTL, name='users')
+_user_id_cache = TTLCache(maxsize=4096, ttl=USER_CACHE_TTL, name='user_ids')
+
+
+def user_claims(user_id):
+    """Additional JWT claims for the user with user_id"""
+    return {USER_ID_CLAIM: user_id}
+
+
+def current_user_id():
+    """
+    Id of the user of the current request's JWT, or None if unknown
+    A user deleted since the token was issued is unknown once they drop
+    out of the user cache
+    """
+    user_id = get_jwt().get(USER_ID_CLAIM)
+    if user_id is not None:
+        return user_id if get_cached_user(user_id) is not None else None
+
+    # Token issued before the uid claim existed
+    email = get_jwt_identity()
+    user_id = _user_id_cache.get(email)
+    if user_id is None:
+        user = User.query.filter_by(email=email).first()
+        if not user:
+            return None
+        user_id = user.id
+        _user_id_cache.set(email, user_id)
+    return user_id
+
+
+def get_cached_user(user_id):
+    """User record as a dict, cached for USER_CACHE_TTL seconds"""
+    user = _user_cache.get(user_id)
+    if user is None:
+        record = db.session.get(User, user_id)
+        if not record:
+            return None
+        user = record.to_dict()
+        _user_cache.set(user_id, user)
+    return user
+
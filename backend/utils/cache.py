@@ -0,0 +1,106 @@
+"""
+In-memory caches shared by the services
+"""
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from utils.metrics import record_cache
+
+_MISSING = object()
+
+# Every live cache, so maintenance can prune them all
+_caches = weakref.WeakSet()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after ttl seconds
+    A ttl of None keeps entries until they are evicted by size; named
+    caches report their hit/miss rates to /metrics
+    """
+
+    def __init__(self, maxsize=256, ttl=None, name=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        _caches.add(self)
+
+    def get(self, key, default=None):
+        """Get a cached value, or default if missing or expired"""
+        value = self._get(key, _MISSING)
+        if self.name:
+            record_cache(self.name, value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def _get(self, key, default):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def get_or_set(self, key, factory):
+        """Get a cached value, or store and return factory() if missing or expired"""
+        with self._lock:
+            value = self._get(key, _MISSING)
+            if self.name:
+                record_cache(self.name, value is not _MISSING)
+            if value is _MISSING:
+                value = factory()
+                self.set(key, value)
+            return value
+
+    def set(self, key, value, ttl=_MISSING):
+        """Store a value, evicting the least recently used entry if full"""
+        ttl = self.ttl if ttl is _MISSING else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove a key and return its value"""
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def prune(self):
+        """Drop expired entries and return how many were removed"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._data.items()
+                       if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._data[key]
+            return len(expired)
+
+    def __contains__(self, key):
+        return self._get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+def prune_caches():
+    """Drop expired entries from every cache; returns how many were removed"""
+    return sum(cache.prune() for cache in list(_caches))
@@ -0,0 +1,71 @@
+"""
+Downsampling of price series for charts
+"""
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+def lttb_indices(y, threshold, x=None):
+    """
+    Largest-Triangle-Three-Buckets
+    Returns the indices of the points to keep so the line keeps its shape;
+    the first and last points are always kept
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+    # Bucket boundaries for the points between the first and the last one
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Pick the point forming the largest triangle with the previous
+        # selected point and the next bucket's average
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs(
+            (x[previous] - avg_x) * (bucket_y - y[previous])
+            - (x[previous] - bucket_x) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return selected
+
+
+def ohlc_buckets(opens, highs, lows, closes, volumes, threshold):
+    """
+    Aggregate bars into at most threshold candles
+    Returns (starts, open, high, low, close, volume) where starts are the
+    index of the first bar of each candle
+    """
+    n = len(closes)
+    if threshold >= n or threshold < 1:
+        return np.arange(n), opens, highs, lows, closes, volumes
+
+    starts = np.unique(np.linspace(0, n, threshold, endpoint=False).astype(int))
+    ends = np.append(starts[1:], n) - 1
+
+    return (
+        starts,
+        np.asarray(opens)[starts],
+        np.maximum.reduceat(np.asarray(highs), starts),
+        np.minimum.reduceat(np.asarray(lows), starts),
+        np.asarray(closes)[ends],
+        np.add.reduceat(np.asarray(volumes), starts)
+    )
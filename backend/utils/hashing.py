@@ -0,0 +1,64 @@
+"""
+Password hashing off the request threads
+Hashes run in a small process pool so a burst of logins cannot pin every
+worker thread on CPU; at most PASSWORD_HASH_QUEUE_LIMIT hashes may be
+running or waiting, further requests are rejected straight away
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_TIMEOUT
+
+
+class HashingBusyError(RuntimeError):
+    """Raised when too many password hashes are already queued"""
+
+
+class HashingTimeoutError(HashingBusyError):
+    """Raised when a hash does not finish within PASSWORD_HASH_TIMEOUT"""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_QUEUE_LIMIT)
+
+
+def _get_pool():
+    """Process pool, started on first use so each forked server worker gets its own"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+    return _pool
+
+
+def _run(func, *args):
+    if PASSWORD_HASH_WORKERS <= 0:
+        return func(*args)
+
+    if not _slots.acquire(blocking=False):
+        raise HashingBusyError('Too many authentication requests in progress')
+    try:
+        future = _get_pool().submit(func, *args)
+    except Exception:
+        _slots.release()
+        raise
+    # The slot is held until the hash actually finishes, not until we stop
+    # waiting for it, so timed out hashes still count against the limit
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FutureTimeoutError:
+        raise HashingTimeoutError('Password hash timed out')
+
+
+def hash_password(password):
+    """Hash a password for storage"""
+    return _run(generate_password_hash, password)
+
+
+def verify_password(password_hash, password):
+    """Check a password against its stored hash"""
+    return _run(check_password_hash, password_hash, password)
@@ -0,0 +1,53 @@
+"""
+Deferred imports for heavy modules
+numpy, pandas and the HTTP client take most of the startup time but are
+only needed once market data is served, so modules bind them lazily:
+
+    np = lazy_import('numpy')
+
+The real module is imported on first attribute access
+"""
+import importlib
+import sys
+import threading
+import types
+
+_lazy_modules = {}
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in that imports the real module on first attribute access"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._lazy_lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        # Only called for attributes not copied over yet
+        if attr.startswith('_lazy'):
+            raise AttributeError(attr)
+        return getattr(self._lazy_load(), attr)
+
+    def _lazy_load(self):
+        with self._lazy_lock:
+            module = importlib.import_module(self.__name__)
+            # Later lookups hit the stand-in's own dict directly
+            if '__file__' not in self.__dict__:
+                self.__dict__.update(module.__dict__)
+        return module
+
+
+def lazy_import(name):
+    """Module bound lazily, or the module itself if it is already imported"""
+    if name in sys.modules:
+        return sys.modules[name]
+    if name not in _lazy_modules:
+        _lazy_modules[name] = LazyModule(name)
+    return _lazy_modules[name]
+
+
+def preload():
+    """Import every lazily bound module now, e.g. before forking workers"""
+    for module in list(_lazy_modules.values()):
+        module._lazy_load()
+    return sorted(_lazy_modules)
@@ -0,0 +1,246 @@
+"""
+Request, upstream, database and cache metrics
+Exposed in Prometheus text format at /metrics, with one structured
+timing log line per request
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import REQUEST_LOGGING
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+request_logger = logging.getLogger('stock_advisor.requests')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' '))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, '') for name in self.labels), 0)
+
+    def expose(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in items]
+
+
+class Histogram:
+    """Histogram of observed values with labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def expose(self):
+        lines = []
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        names = self.labels + ('le',)
+        for key, (counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (bound,))} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, key + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    'http_requests_total', 'HTTP requests handled', ('method', 'endpoint', 'status')))
+http_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ('method', 'endpoint')))
+upstream_calls = registry.register(Counter(
+    'upstream_calls_total', 'Calls to market data and news upstreams', ('upstream', 'provider', 'operation', 'outcome')))
+upstream_duration = registry.register(Histogram(
+    'upstream_call_duration_seconds', 'Upstream call latency', ('upstream', 'provider', 'operation')))
+db_queries = registry.register(Counter(
+    'db_queries_total', 'Database statements executed', ('operation',)))
+db_duration = registry.register(Histogram(
+    'db_query_duration_seconds', 'Database statement latency', ('operation',)))
+cache_requests = registry.register(Counter(
+    'cache_requests_total', 'Cache lookups', ('cache', 'result')))
+stale_responses = registry.register(Counter(
+    'stale_responses_total', 'Stale cached values served while revalidating', ('cache',)))
+rate_limited = registry.register(Counter(
+    'rate_limited_total', 'Requests rejected by rate limits', ('limiter',)))
+circuit_transitions = registry.register(Counter(
+    'circuit_breaker_transitions_total', 'Circuit breaker state changes', ('circuit', 'state')))
+scheduled_runs = registry.register(Counter(
+    'scheduled_task_runs_total', 'Scheduled background task runs', ('task', 'outcome')))
+
+
+def _add_request_time(kind, seconds):
+    """Accumulate time spent in a dependency for the current request log"""
+    if has_request_context():
+        timings = g.setdefault('metrics_timings', {})
+        count, total = timings.get(kind, (0, 0.0))
+        timings[kind] = (count + 1, total + seconds)
+
+
+@contextmanager
+def track_upstream(upstream, operation, provider='live'):
+    """Time an upstream call and count its outcome"""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'success'
+    finally:
+        elapsed = time.perf_counter() - started
+        upstream_duration.observe(elapsed, upstream=upstream, provider=provider, operation=operation)
+        upstream_calls.inc(upstream=upstream, provider=provider, operation=operation, outcome=outcome)
+        _add_request_time('upstream', elapsed)
+
+
+def record_cache(cache, hit):
+    """Count a cache hit or miss"""
+    cache_requests.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+# The start time is kept on the statement's execution context, which is
+# dropped with it when the statement fails and after_cursor_execute never runs
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'metrics_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+    db_queries.inc(operation=operation)
+    db_duration.observe(elapsed, operation=operation)
+    _add_request_time('db', elapsed)
+
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+
+    elapsed = time.perf_counter() - started
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    http_requests.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    http_duration.observe(elapsed, method=request.method, endpoint=endpoint)
+
+    if REQUEST_LOGGING:
+        timings = g.get('metrics_timings', {})
+        request_logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'db_queries': timings.get('db', (0, 0.0))[0],
+            'db_ms': round(timings.get('db', (0, 0.0))[1] * 1000, 2),
+            'upstream_calls': timings.get('upstream', (0, 0.0))[0],
+            'upstream_ms': round(timings.get('upstream', (0, 0.0))[1] * 1000, 2)
+        }))
+
+    return response
+
+
+def metrics_view():
+    """Prometheus scrape endpoint"""
+    return Response(registry.expose(), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    """Install request timing hooks and the /metrics route"""
+    if REQUEST_LOGGING and not request_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        request_logger.addHandler(handler)
+        request_logger.setLevel(logging.INFO)
+        request_logger.propagate = False
+
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
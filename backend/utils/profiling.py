@@ -0,0 +1,126 @@
+"""
+On-demand request profiling
+A request runs under cProfile when an admin asks for it (X-Profile: 1
+header or ?profile=1) or when it is picked by PROFILE_SAMPLE_RATE; the
+stats are saved under PROFILE_DIR and can be downloaded from /api/profiles
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from flask import g, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+from config import PROFILE_ADMIN_EMAILS, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_MAX_FILES
+
+PROFILE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+def is_admin(email):
+    """Whether a user may request profiles"""
+    return bool(email) and email in PROFILE_ADMIN_EMAILS
+
+
+def current_user_is_admin():
+    """Check the optional JWT of the current request against the admin list"""
+    try:
+        verify_jwt_in_request(optional=True)
+        return is_admin(get_jwt_identity())
+    except Exception:
+        return False
+
+
+def _profile_requested():
+    flag = request.headers.get('X-Profile') or request.args.get('profile')
+    return flag in ('1', 'true', 'True')
+
+
+def _start_profiler():
+    if request.path.startswith('/api/profiles'):
+        return
+
+    if _profile_requested():
+        if not current_user_is_admin():
+            return
+    elif not (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE):
+        return
+
+    g.profiler = cProfile.Profile()
+    g.profiler.enable()
+
+
+def _stop_profiler(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+
+    profiler.disable()
+    endpoint = request.url_rule.rule if request.url_rule else request.path
+    profile_id = save_profile(profiler, f"{request.method} {endpoint}")
+    response.headers['X-Profile-Id'] = profile_id
+    return response
+
+
+def _prune_profiles():
+    """Keep only the newest PROFILE_MAX_FILES profiles"""
+    files = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith('.prof')),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in files[:max(len(files) - PROFILE_MAX_FILES, 0)]:
+        os.remove(entry.path)
+
+
+def save_profile(profiler, label):
+    """Write profiler stats to PROFILE_DIR and return the profile id"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', label).strip('-').lower()[:60]
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(profile_path(profile_id))
+    _prune_profiles()
+    return profile_id
+
+
+def profile_path(profile_id):
+    """Path of a stored profile, or None for an invalid id"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    return os.path.join(PROFILE_DIR, f"{profile_id}.prof")
+
+
+def list_profiles():
+    """Stored profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+
+    entries = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith('.prof')),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True
+    )
+    return [
+        {
+            'id': entry.name[:-5],
+            'size': entry.stat().st_size,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(entry.stat().st_mtime))
+        }
+        for entry in entries
+    ]
+
+
+def format_stats(stats_source, sort='cumulative', limit=40):
+    """Render profile stats as text"""
+    stream = io.StringIO()
+    stats = pstats.Stats(stats_source, stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def init_profiling(app):
+    """Install the profiling hooks"""
+    app.before_request(_start_profiler)
+    app.after_request(_stop_profiler)
@@ -0,0 +1,68 @@
+"""
+Token bucket rate limiting
+Each key (client IP, account) gets a bucket of capacity tokens refilled
+evenly over period seconds; a request spends one token
+"""
+import math
+import threading
+import time
+from flask import request, jsonify
+
+from config import RATE_LIMIT_ENABLED
+from utils.cache import TTLCache
+from utils.metrics import rate_limited
+
+
+class RateLimiter:
+    """Token buckets per key for one limit"""
+
+    def __init__(self, name, capacity, period, maxsize=100000):
+        self.name = name
+        self.capacity = capacity
+        self.rate = capacity / period
+        # An idle bucket is full again after period seconds, so drop it then
+        self._buckets = TTLCache(maxsize=maxsize, ttl=period)
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """Spend a token for key; returns seconds to wait, 0 when allowed"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get_or_set(key, lambda: (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets.set(key, (tokens - 1, now))
+                return 0
+            self._buckets.set(key, (tokens, now))
+            return (1 - tokens) / self.rate
+
+
+def check_rate_limits(*limits):
+    """
+    Spend a token from each (limiter, key) pair
+    Returns a 429 response when any bucket is empty, otherwise None
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+
+    retry_after = 0
+    for limiter, key in limits:
+        if key is None:
+            continue
+        wait = limiter.acquire(key)
+        if wait:
+            rate_limited.inc(limiter=limiter.name)
+            retry_after = max(retry_after, wait)
+
+    if not retry_after:
+        return None
+
+    response = jsonify({'message': 'Too many requests, please try again later'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+
+def client_ip():
+    """Address of the client making the current request"""
+    return request.remote_addr or 'unknown'
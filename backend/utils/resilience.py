@@ -0,0 +1,174 @@
+"""
+Upstream failure handling
+A circuit breaker per upstream fails calls fast while the upstream is
+down, and StaleCache serves the last good value of an expensive result
+while it is refreshed in the background
+"""
+import threading
+import time
+from flask import current_app, has_app_context, jsonify
+
+from config import CACHE_ENABLED
+from utils.cache import TTLCache
+from utils.metrics import circuit_transitions, stale_responses
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is unavailable, retry in {int(retry_after) + 1}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures; while open every
+    call fails immediately. After reset_timeout seconds a single trial
+    call is let through and its outcome closes or re-opens the circuit
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        self.state = state
+        circuit_transitions.inc(circuit=self.name, state=state)
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+
+            retry_after = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == OPEN and retry_after <= 0:
+                # Let this call through as the trial
+                self._transition(HALF_OPEN)
+                return
+            raise CircuitOpenError(self.name, max(retry_after, 0))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                if self.state != OPEN:
+                    self._transition(OPEN)
+
+
+class StaleCache:
+    """
+    Stale-while-revalidate cache
+    Values younger than fresh_ttl are served as is. Older values, up to
+    stale_ttl, are served marked stale while one background thread per key
+    reloads them, so an upstream outage only shows up as growing staleness
+    """
+
+    def __init__(self, name, fresh_ttl, stale_ttl, maxsize=256):
+        self.name = name
+        self.fresh_ttl = fresh_ttl
+        self._entries = TTLCache(maxsize=maxsize, ttl=stale_ttl, name=name)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, wait=True):
+        """
+        Return (value, age) where age is None for a fresh value and the
+        value's age in seconds when it is stale
+        Raises the loader's exception when there is nothing to serve; with
+        wait=False a miss starts one background load instead and returns
+        (None, None)
+        """
+        if not CACHE_ENABLED:
+            return loader(), None
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, loaded_at = entry
+            age = time.monotonic() - loaded_at
+            if age < self.fresh_ttl:
+                return value, None
+            self._refresh_in_background(key, loader)
+            stale_responses.inc(cache=self.name)
+            return value, age
+
+        if not wait:
+            self._refresh_in_background(key, loader)
+            return None, None
+        return self._load(key, loader), None
+
+    def refresh(self, key, loader):
+        """Reload a value now, e.g. to warm the cache ahead of requests"""
+        return self._load(key, loader)
+
+    def _load(self, key, loader):
+        value = loader()
+        self._entries.set(key, (value, time.monotonic()))
+        return value
+
+    def _refresh_in_background(self, key, loader):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        # Loaders read the database, so the thread gets the caller's app
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def refresh():
+            try:
+                if app is None:
+                    self._load(key, loader)
+                else:
+                    with app.app_context():
+                        self._load(key, loader)
+            except Exception as e:
+                print(f"Background refresh of {self.name} {key} failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def clear(self):
+        self._entries.clear()
+
+
+def mark_stale(response, age):
+    """Flag a response built from a stale cached value"""
+    if age is not None:
+        response.headers['X-Data-Stale'] = 'true'
+        response.headers['Age'] = str(int(age))
+    return response
+
+
+def upstream_error_response(message, error):
+    """
+    Error response for a failed upstream-backed request
+    An open circuit is reported as 503 with Retry-After, anything else as 500
+    """
+    response = jsonify({'message': f'{message}: {str(error)}'})
+    if isinstance(error, CircuitOpenError):
+        response.status_code = 503
+        response.headers['Retry-After'] = str(int(error.retry_after) + 1)
+    else:
+        response.status_code = 500
+    return response
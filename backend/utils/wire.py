@@ -0,0 +1,113 @@
+"""
+Binary wire formats for columnar price data
+Clients can ask for Apache Arrow IPC streams or MessagePack instead of
+JSON. Both are written straight from the NumPy column buffers, without a
+Python object per bar. pyarrow and msgpack are optional; a format whose
+library is not installed is simply not offered
+
+Columns are passed as {name: array}. A 'date' column of int32 is encoded
+as days since the epoch (Arrow date32), one of int64 as milliseconds since
+the epoch in UTC (Arrow timestamp). In MessagePack every array becomes
+{'dtype': <NumPy dtype string>, 'data': <little-endian bytes>}, so a
+browser can wrap the bytes in a Float32Array or similar without parsing
+"""
+import importlib.util
+import json
+
+from utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+JSON = 'application/json'
+ARROW = 'application/vnd.apache.arrow.stream'
+MSGPACK = 'application/x-msgpack'
+
+# Names accepted by ?format= in place of an Accept header
+FORMAT_NAMES = {'json': JSON, 'arrow': ARROW, 'msgpack': MSGPACK}
+_LIBRARIES = {ARROW: 'pyarrow', MSGPACK: 'msgpack'}
+
+_available = None
+
+
+def available_formats():
+    """Mimetypes that can be produced here, JSON first"""
+    global _available
+    if _available is None:
+        _available = [JSON] + [
+            mimetype for mimetype, library in _LIBRARIES.items()
+            if importlib.util.find_spec(library) is not None
+        ]
+    return _available
+
+
+def negotiate(request):
+    """
+    Mimetype for the response: ?format=json|arrow|msgpack if given, else the
+    best match of the Accept header, else JSON. Returns None when ?format
+    names a format that isn't available
+    """
+    name = request.args.get('format')
+    if name:
+        mimetype = FORMAT_NAMES.get(name)
+        return mimetype if mimetype in available_formats() else None
+    return request.accept_mimetypes.best_match(available_formats(), default=JSON) or JSON
+
+
+def _little_endian(array):
+    return np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+
+
+def _arrow_array(pa, name, values):
+    values = _little_endian(values)
+    array = pa.array(values)
+    if name == 'date':
+        # Same buffer, reinterpreted
+        return array.view(pa.date32() if values.dtype == np.int32 else pa.timestamp('ms', tz='UTC'))
+    return array
+
+
+def arrow_stream(tables, key='symbol', metadata=None):
+    """
+    Arrow IPC stream with one record batch per (name, columns) in tables
+    Each batch starts with a dictionary-encoded key column holding its name;
+    metadata values are stored JSON-encoded in the schema
+    """
+    import pyarrow as pa
+
+    names = pa.array([name for name, _ in tables], pa.string())
+    # Narrowest indices that can address every name
+    index_type = np.int8 if len(tables) < 2 ** 7 else np.int16 if len(tables) < 2 ** 15 else np.int32
+    batches = []
+    for i, (_, columns) in enumerate(tables):
+        length = len(next(iter(columns.values())))
+        arrays = [pa.DictionaryArray.from_arrays(pa.array(np.full(length, i, dtype=index_type)), names)]
+        arrays += [_arrow_array(pa, name, values) for name, values in columns.items()]
+        batches.append(pa.RecordBatch.from_arrays(arrays, [key] + list(columns)))
+
+    if batches:
+        schema = batches[0].schema
+    else:
+        schema = pa.schema([(key, pa.dictionary(pa.int8(), pa.string()))])
+    schema = schema.with_metadata({name: json.dumps(value) for name, value in (metadata or {}).items()})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+    return sink.getvalue().to_pybytes()
+
+
+def _pack_array(value):
+    if isinstance(value, np.ndarray):
+        value = _little_endian(value)
+        return {'dtype': value.dtype.str, 'data': memoryview(value).cast('B')}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def msgpack_payload(value):
+    """MessagePack of a JSON-like value in which NumPy arrays are packed as raw bytes"""
+    import msgpack
+
+    return msgpack.packb(value, default=_pack_array, use_bin_type=True)
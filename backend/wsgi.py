@@ -0,0 +1,18 @@
+"""
+WSGI entry point
+
+    gunicorn --preload -w 4 -b 0.0.0.0:5002 wsgi:app
+
+With --preload the app and the heavy modules are loaded once in the
+master process and shared by the forked workers
+"""
+from app import create_app
+from config import PRELOAD
+from services.data_provider import get_data_provider
+from utils.lazy import preload
+
+app = create_app()
+
+if PRELOAD:
+    preload()
+    get_data_provider()
@@ -68,9 +68,12 @@ export const authAPI = {
 // Stock API
 export const stockAPI = {
   getStockData: (symbol, timeframe = '1mo') => api.get(`/stocks/${symbol}?timeframe=${timeframe}`),
+  getStockHistories: (symbols, timeframe = '1mo') =>
+    api.get('/stocks/history', { params: { symbols: symbols.join(','), timeframe } }),
   searchStocks: (query) => api.get(`/stocks/search?q=${query}`),
   getPopularStocks: () => api.get('/stocks/popular'),
-  getStockDetails: (symbol) => api.get(`/stocks/details/${symbol}`)
+  getStockDetails: (symbol) => api.get(`/stocks/details/${symbol}`),
+  screenStocks: (params) => api.get('/stocks/screener', { params })
 };
 
 // Analysis API
@@ -78,14 +81,28 @@ export const analysisAPI = {
   getCausalAnalysis: (symbol) => api.get(`/analysis/causal/${symbol}`),
   getRecommendation: (symbol) => api.get(`/analysis/recommendation/${symbol}`),
   getSectorAnalysis: (sector) => api.get(`/analysis/sector/${sector}`),
+  getCorrelation: (params) => api.get('/analysis/correlation', { params }),
+  getRisk: (symbol, params) => api.get(`/analysis/risk/${symbol}`, { params }),
+  getPortfolioRisk: (params) => api.get('/analysis/risk/portfolio', { params }),
   saveAnalysis: (data) => api.post('/analysis/save', data),
-  getSavedAnalyses: () => api.get('/analysis/saved'),
+  getSavedAnalyses: (params) => api.get('/analysis/saved', { params }),
   deleteSavedAnalysis: (id) => api.delete(`/analysis/saved/${id}`),
-  getStockNotes: (symbol) => api.get(`/analysis/notes/stock/${symbol}`),
+  getStockNotes: (symbol, params) => api.get(`/analysis/notes/stock/${symbol}`, { params }),
   updateNote: (id, data) => api.put(`/analysis/notes/${id}`, data),
+  searchNotes: (q, params) => api.get('/analysis/notes/search', { params: { q, ...params } }),
 
 };
 
+// Job API
+export const jobAPI = {
+  createJob: (kind, params) => api.post('/jobs', { kind, params }),
+  getJobs: (params) => api.get('/jobs', { params }),
+  getJob: (id) => api.get(`/jobs/${id}`),
+  cancelJob: (id) => api.delete(`/jobs/${id}`),
+  // EventSource cannot send the Authorization header, so stream with fetch
+  jobEventsUrl: (id) => `${api.defaults.baseURL}/jobs/${id}/events`
+};
+
 // News API
 export const newsAPI = {
   getStockNews: (symbol) => api.get(`/news/${symbol}`),
@@ -1,10 +1,15 @@
 """
 Stock Trend Causality + AI Investment Advisor Launcher
 This script sets up and runs the application with proper configuration.
+
+    python run.py                     # development server
+    python run.py scheduler           # standalone scheduler
+    python run.py run-task <name>     # run one scheduled task now
 """
 import os
 import sys
 import json
+import argparse
 from dotenv import load_dotenv
 
 # Load environment variables from .env file if it exists
@@ -27,10 +32,49 @@ if 'JWT_SECRET_KEY' not in os.environ:
 sys.path.append(os.path.abspath('backend'))
 
 # Import and run the Flask app
-from backend.app import app
+from backend.app import create_app
 
-if __name__ == '__main__':
+app = create_app()
+
+def serve(args):
     port = int(os.environ.get('PORT', 5002))
     print(f"Starting Stock Advisor API on port {port}...")
     print(f"Access the API at http://localhost:{port}")
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=True)
+
+
+def run_scheduler(args):
+    """Standalone scheduler for the database side of the scheduled tasks"""
+    from services.scheduler import Scheduler
+    from services.scheduled_tasks import build_tasks
+
+    scheduler = Scheduler(app, build_tasks(in_app=False))
+    print(f"Starting scheduler with tasks: {', '.join(scheduler.tasks)}")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+def run_task(args):
+    """Run one scheduled task now and exit"""
+    from services.scheduler import Scheduler
+    from services.scheduled_tasks import build_tasks
+
+    scheduler = Scheduler(app, build_tasks())
+    if args.name not in scheduler.tasks:
+        print(f"Unknown task {args.name}, expected one of: {', '.join(scheduler.tasks)}")
+        sys.exit(2)
+    scheduler.run_task(scheduler.tasks[args.name])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stock Advisor API')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('serve', help='Run the development server (default)')
+    commands.add_parser('scheduler', help='Run the scheduled maintenance tasks in the foreground')
+    task_parser = commands.add_parser('run-task', help='Run one scheduled task now, e.g. warm_caches')
+    task_parser.add_argument('name')
+
+    args = parser.parse_args()
+    {'scheduler': run_scheduler, 'run-task': run_task}.get(args.command, serve)(args)